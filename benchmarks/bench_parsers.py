@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for the fetchers' parsing and extraction code.
+
+Every benchmark runs against a checked-in payload in fixtures/, so no
+network access is needed and numbers are comparable between commits.
+The payloads are synthetic: generated to the structure and size of each
+real feed or page (markup, nesting, entry counts), with filler text. Use
+them to compare commits, not to predict time on a live page; to time
+real pages, save them under the same names in a directory and pass
+--fixtures DIR (files missing there fall back to fixtures/):
+
+    fixtures/hn_rss.xml               Hacker News front page RSS
+    fixtures/article_large.html       news article page (~200KB, <article>)
+    fixtures/article_nested_divs.html blog page with no <article>/<main>
+    fixtures/techmeme.html            Techmeme front page
+    fixtures/arxiv_rss.xml            rss.arxiv.org feed, 450 entries
+    fixtures/githubawesome_rss.xml    githubawesome.com feed with roundups
+    fixtures/youtube_channel.xml      YouTube channel Atom feed
+    fixtures/xkcd_atom.xml            xkcd Atom feed
+    fixtures/transcript.vtt           auto-caption VTT transcript
+
+Usage:
+    python benchmarks/bench_parsers.py                      # print table
+    python benchmarks/bench_parsers.py --json before.json   # save results
+    python benchmarks/bench_parsers.py --compare before.json --json after.json
+    python benchmarks/bench_parsers.py -k article           # name filter
+    python benchmarks/bench_parsers.py --html-parser html.parser --json slow.json
+    python benchmarks/bench_parsers.py --fixtures ~/captured  # real pages
+
+HTML is parsed with lxml when it is installed (see scripts/_html.py);
+--html-parser forces a backend, so the two can be compared with --compare.
+
+For each benchmark it reports the median and best time per call,
+throughput (calls/s and MB/s of input), peak traced memory for one call,
+memory blocks still held by the result, and gen-0 GC collections during
+one call (a proxy for allocation churn).
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import feedparser
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+# Directory of captured payloads that replace same-named fixtures (--fixtures)
+CAPTURED = None
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import _html  # noqa: E402
+import fetch_arxiv  # noqa: E402
+import fetch_github_trending  # noqa: E402
+import fetch_hackernews  # noqa: E402
+import fetch_techmeme  # noqa: E402
+import fetch_xkcd  # noqa: E402
+import fetch_youtube  # noqa: E402
+
+
+def _fixture(name):
+    if CAPTURED and (CAPTURED / name).exists():
+        return CAPTURED / name
+    return FIXTURES / name
+
+
+def _read(name, mode="r"):
+    with open(_fixture(name), mode) as f:
+        return f.read()
+
+
+def _most_paragraphs_div(soup):
+    """The fallback <div> choice before _best_div(), kept as its baseline."""
+    divs = soup.find_all("div")
+    return max(divs, key=lambda d: len(d.find_all("p"))) if divs else None
+
+
+def _deep_divs(depth=1500):
+    """A page with no <article>/<main> and a paragraph at every div level."""
+    return ("<html><body>" + ("<div><p>" + "x" * 40 + "</p>") * depth
+            + "</div>" * depth + "</body></html>")
+
+
+def _benchmarks(tmp_dir):
+    """Return [(name, input_bytes, fn)]; fixtures are loaded up front.
+
+    Benchmarks that keep state on disk put it in tmp_dir.
+    """
+    hn_rss = _read("hn_rss.xml", "rb")
+    article = _read("article_large.html")
+    nested = _read("article_nested_divs.html")
+    techmeme = _read("techmeme.html")
+    nested_soup = _html.parse(nested)
+    fetch_hackernews._strip_noise(nested_soup)
+    deep = _deep_divs()
+    deep_soup = _html.parse(deep)
+    arxiv_rss = _read("arxiv_rss.xml", "rb")
+    arxiv_feed = feedparser.parse(arxiv_rss)
+    abstracts = [e.get("summary", "") for e in arxiv_feed.entries]
+    blog_rss = _read("githubawesome_rss.xml", "rb")
+    blog_feed = feedparser.parse(blog_rss)
+    blog_state = os.path.join(tmp_dir, ".state.db")
+    yt_atom = _read("youtube_channel.xml", "rb")
+    xkcd_atom = _read("xkcd_atom.xml", "rb")
+    vtt = _read("transcript.vtt")
+
+    cutoff = datetime(2026, 10, 15, tzinfo=timezone.utc)
+    channel = {"name": "Mehul Mohan", "id": "UCJUmE61LxhbhudzUugHL2wQ"}
+
+    def size(x):
+        return len(x.encode("utf-8")) if isinstance(x, str) else len(x)
+
+    return [
+        ("hn.feed_parse", size(hn_rss),
+         lambda: fetch_hackernews._build(feedparser.parse(hn_rss).entries, {}, False)),
+        ("hn.extract_article", size(article),
+         lambda: fetch_hackernews.parse_article(article)),
+        ("hn.extract_article_nested_divs", size(nested),
+         lambda: fetch_hackernews.parse_article(nested)),
+        ("hn.best_div_nested_divs", size(nested),
+         lambda: fetch_hackernews._best_div(nested_soup)),
+        ("hn.best_div_nested_divs_baseline", size(nested),
+         lambda: _most_paragraphs_div(nested_soup)),
+        ("hn.best_div_deep_nesting", size(deep),
+         lambda: fetch_hackernews._best_div(deep_soup)),
+        ("hn.best_div_deep_nesting_baseline", size(deep),
+         lambda: _most_paragraphs_div(deep_soup)),
+        ("techmeme.parse_page", size(techmeme),
+         lambda: fetch_techmeme.parse_page(techmeme)),
+        ("arxiv.feed_parse", size(arxiv_rss),
+         lambda: feedparser.parse(arxiv_rss)),
+        ("arxiv.merge", size(arxiv_rss),
+         lambda: fetch_arxiv._merge([], [arxiv_feed], None)),
+        ("arxiv.clean_text", sum(size(a) for a in abstracts),
+         lambda: [fetch_arxiv.clean_text(a) for a in abstracts]),
+        ("github.feed_parse", size(blog_rss),
+         lambda: fetch_github_trending.parse_blog(feedparser.parse(blog_rss))),
+        ("github.parse_blog", size(blog_rss),
+         lambda: fetch_github_trending.parse_blog(blog_feed)),
+        ("github.parse_blog_cached", size(blog_rss),
+         lambda: fetch_github_trending.parse_blog(blog_feed, blog_state)),
+        ("youtube.channel_feed", size(yt_atom),
+         lambda: fetch_youtube._channel_result(channel, feedparser.parse(yt_atom),
+                                               cutoff - timedelta(days=3))),
+        ("youtube.clean_vtt", size(vtt),
+         lambda: fetch_youtube.clean_vtt(vtt)),
+        ("xkcd.latest_comic", size(xkcd_atom),
+         lambda: fetch_xkcd._latest_comic(feedparser.parse(xkcd_atom), None, 10 ** 6)),
+    ]
+
+
+def measure(fn, input_bytes, min_time=0.2, repeat=5):
+    """Time fn and profile one call's memory. Returns a stats dict."""
+    fn()  # warm up imports and caches
+
+    # Calibrate so each repeat runs for at least min_time
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 10 ** 6:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - start) / loops)
+
+    gc.collect()
+    gen0_before = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gen0 = gc.get_stats()[0]["collections"] - gen0_before
+    retained = sum(max(d.count_diff, 0) for d in after.compare_to(before, "filename"))
+    del result
+
+    median = statistics.median(times)
+    return {
+        "median_s": median,
+        "best_s": min(times),
+        "ops_per_s": 1 / median if median else None,
+        "mb_per_s": input_bytes / median / 1e6 if median else None,
+        "input_bytes": input_bytes,
+        "peak_bytes": peak,
+        "retained_blocks": retained,
+        "gc_gen0_collections": gen0,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _fmt_time(s):
+    if s >= 1:
+        return f"{s:.2f}s"
+    if s >= 1e-3:
+        return f"{s * 1e3:.2f}ms"
+    return f"{s * 1e6:.1f}µs"
+
+
+def run(selected=None, min_time=0.2, repeat=5):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, input_bytes, fn in _benchmarks(tmp_dir):
+            if selected and not any(k in name for k in selected):
+                continue
+            print(f"  {name} ...", end="", file=sys.stderr, flush=True)
+            results[name] = measure(fn, input_bytes, min_time=min_time, repeat=repeat)
+            print(f" {_fmt_time(results[name]['median_s'])}", file=sys.stderr)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "run_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "feedparser": feedparser.__version__,
+            "html_parser": _html.PARSER,
+            "captured_fixtures": sorted(p.name for p in FIXTURES.iterdir()
+                                        if _fixture(p.name) != FIXTURES / p.name),
+        },
+        "results": results,
+    }
+
+
+def print_table(report, baseline=None):
+    rows = report["results"]
+    base = (baseline or {}).get("results", {})
+    header = f"{'benchmark':34} {'median':>10} {'MB/s':>8} {'peak KB':>9} {'blocks':>8}"
+    if base:
+        header += f" {'before':>10} {'change':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in rows.items():
+        line = (f"{name:34} {_fmt_time(r['median_s']):>10} {r['mb_per_s'] or 0:8.2f} "
+                f"{r['peak_bytes'] / 1024:9.0f} {r['retained_blocks']:8d}")
+        if base:
+            old = base.get(name)
+            if old:
+                change = (r["median_s"] - old["median_s"]) / old["median_s"] * 100
+                line += f" {_fmt_time(old['median_s']):>10} {change:+7.1f}%"
+            else:
+                line += f" {'-':>10} {'new':>8}"
+        print(line)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Offline parser benchmarks")
+    parser.add_argument("-k", dest="selected", action="append",
+                        help="Only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--json", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum seconds per timing repeat (default: 0.2)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats (default: 5)")
+    parser.add_argument("--html-parser", choices=["lxml", "html.parser"],
+                        help=f"BeautifulSoup backend (default: {_html.PARSER})")
+    parser.add_argument("--fixtures", metavar="DIR",
+                        help="Captured payloads that replace same-named files in fixtures/")
+    args = parser.parse_args()
+    if args.fixtures:
+        CAPTURED = Path(args.fixtures).expanduser()
+    if args.html_parser:
+        _html.PARSER = args.html_parser
+
+    report = run(args.selected, min_time=args.min_time, repeat=args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults: {args.json}", file=sys.stderr)
@@ -0,0 +1,112 @@
+"""Asyncio fetch engine: one event loop, one bounded HTTP layer.
+
+Every source schedules its requests into the same loop through get() and
+parse_feed(). A single semaphore caps the number of requests in flight
+across all sources, and the blocking work runs on one executor sized to
+that cap, so there are no nested per-fetcher pools competing for sockets.
+
+The HTTP layer wraps the shared session in _util, so pooling, the feed
+cache and every other _util.http_get behaviour apply unchanged.
+
+The cap counts blocking calls, not sockets: a slot is held for exactly
+one call(). A stream=True response from get() gives its slot back once
+the headers arrive, so its body would be read outside the cap; run
+get-and-read-body downloads as a single call() instead (as HN articles
+do with fetch_hackernews._download).
+"""
+
+import asyncio
+import contextvars
+import functools
+
+import _util
+
+
+class _Engine:
+    def __init__(self, loop, max_in_flight):
+        self.loop = loop
+        self.max_in_flight = max_in_flight
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.executor = _util.thread_pool(max_in_flight, "aio-http")
+
+
+_engine = None
+
+
+def _current():
+    """Return the engine bound to the running loop, creating a default one."""
+    global _engine
+    loop = asyncio.get_running_loop()
+    if _engine is None or _engine.loop is not loop:
+        _engine = _Engine(loop, int(_util.http_settings()["max_in_flight"]))
+    return _engine
+
+
+async def call(func, *args, **kwargs):
+    """Run blocking func(*args, **kwargs) on the engine, holding one slot throughout."""
+    engine = _current()
+    # Carry the caller's context (trace spans) into the executor thread
+    ctx = contextvars.copy_context()
+    async with engine.semaphore:
+        return await engine.loop.run_in_executor(
+            engine.executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+
+# Placeholder in until_deadline() results for work cancelled at the deadline
+DROPPED = object()
+
+
+async def until_deadline(coros):
+    """Run coros concurrently, stopping at the run-wide deadline.
+
+    Returns a list aligned with coros holding each result (or raised
+    exception), or DROPPED for those still pending and now cancelled.
+    """
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    if not tasks:
+        return []
+    left = _util.deadline_remaining()
+    await asyncio.wait(tasks, timeout=None if left is None else max(left, 0))
+    results = []
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+            results.append(DROPPED)
+        elif task.exception() is not None:
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+    return results
+
+
+async def get(url, timeout=30, **kwargs):
+    """Async GET through the shared session, bounded by the global limit."""
+    return await call(_util.http_get, url, timeout=timeout, **kwargs)
+
+
+async def parse_feed(url, timeout=30):
+    """Async _util.parse_feed, bounded by the global limit."""
+    return await call(_util.parse_feed, url, timeout=timeout)
+
+
+def run(main, max_in_flight=None):
+    """Run coroutine function ``main()`` on a fresh loop.
+
+    max_in_flight defaults to the "max_in_flight" HTTP setting.
+    """
+    global _engine
+    if max_in_flight is None:
+        max_in_flight = int(_util.http_settings()["max_in_flight"])
+
+    async def _runner():
+        global _engine
+        _engine = _Engine(asyncio.get_running_loop(), max_in_flight)
+        try:
+            return await main()
+        finally:
+            _util.abandon(_engine.executor)
+
+    try:
+        return asyncio.run(_runner())
+    finally:
+        _engine = None
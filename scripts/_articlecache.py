@@ -0,0 +1,132 @@
+"""Persistent cache of extracted Hacker News articles.
+
+Entries are keyed by canonical URL (see canonical_url()) and hold the
+extracted body, the extractable flag and timestamps:
+
+    {"https://example.com/post": {"body_md": "...", "extractable": true,
+                                  "fetched_at": 1792217341.3,
+                                  "used_at": 1792221000.0}}
+
+A failed fetch also records "error". Extractable entries are served for
+``ttl`` seconds; failures, non-HTML pages and pages with no extractable
+text are cached for the shorter ``negative_ttl``. On save, expired
+entries are dropped and the least recently used ones are evicted down to
+``max_entries``. The file is replaced atomically, under a file lock:
+save() re-reads it and merges in this process's new and used entries, so
+concurrent HN runs (subprocess fetchers, fetch_batch, the daemon) don't
+drop each other's entries.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from _util import file_lock, write_atomic
+
+TTL = 12 * 3600          # extractable articles
+NEGATIVE_TTL = 3600      # failures, non-HTML, nothing extractable
+MAX_ENTRIES = 1000
+
+_TRACKING_PARAM = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src)$")
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+def canonical_url(url):
+    """Normalize url for cache keys.
+
+    Lowercases scheme and host, drops default ports, fragments and
+    tracking query parameters (utm_*, fbclid, gclid, ref, ...).
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not _TRACKING_PARAM.match(k)])
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class ArticleCache:
+    """Extracted article bodies, keyed by canonical URL. Thread-safe."""
+
+    def __init__(self, path, ttl=TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Entries stored and read since the last save, for merging
+        self._stored = {}
+        self._used = {}
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def open(cls, path):
+        """Return the process-wide cache for path, loading it on first use."""
+        path = os.path.abspath(path)
+        with _open_lock:
+            if path not in _open:
+                _open[path] = cls(path)
+            return _open[path]
+
+    def _fresh(self, entry, now):
+        ttl = self.ttl if entry.get("extractable") else self.negative_ttl
+        return now - entry.get("fetched_at", 0) < ttl
+
+    def get(self, url):
+        """Return the fresh entry for url (marking it used), or None."""
+        key = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or not self._fresh(entry, now):
+                return None
+            entry["used_at"] = self._used[key] = now
+            return entry
+
+    def put(self, url, body_md, error=None):
+        """Store an extraction result; an empty body is a negative entry."""
+        now = time.time()
+        entry = {"body_md": body_md, "extractable": bool(body_md),
+                 "fetched_at": now, "used_at": now}
+        if error:
+            entry["error"] = error[:300]
+        key = canonical_url(url)
+        with self._lock:
+            self.entries[key] = self._stored[key] = entry
+
+    def save(self):
+        """Merge into the file, drop expired entries, evict least recently used."""
+        now = time.time()
+        with self._lock, file_lock(self.path):
+            entries = self._load()
+            for key, entry in self._stored.items():
+                if entry["fetched_at"] >= entries.get(key, {}).get("fetched_at", 0):
+                    entries[key] = entry
+            for key, used_at in self._used.items():
+                if key in entries:
+                    entries[key]["used_at"] = max(entries[key].get("used_at", 0), used_at)
+
+            live = {k: e for k, e in entries.items() if self._fresh(e, now)}
+            if len(live) > self.max_entries:
+                keep = sorted(live, key=lambda k: live[k].get("used_at", 0),
+                              reverse=True)[:self.max_entries]
+                live = {k: live[k] for k in keep}
+            write_atomic(self.path, json.dumps(live, ensure_ascii=False))
+            self.entries = live
+            self._stored = {}
+            self._used = {}
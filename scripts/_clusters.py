@@ -0,0 +1,181 @@
+"""Group near-duplicate stories across sources (the same launch on Techmeme,
+Hacker News and Product Hunt).
+
+Each item is reduced to the set of words in its title and the first
+LEAD_WORDS words of its other text fields (blurb, tagline, description,
+body_md), normalized as for relevance scoring. MinHash signatures of those
+sets are computed in one vectorized NumPy pass, and locality-sensitive
+hashing (BANDS bands of ROWS rows) turns them into candidate pairs in
+roughly linear time. A candidate is kept if its estimated overlap, the
+share of the smaller item's words found in the other, is at least
+MIN_OVERLAP. Items linking to the same canonical URL always match.
+
+build() returns the clusters written to clusters.json:
+
+    {"generated_at": "...", "items": 55, "clusters": [
+        {"canonical": {"source": "hackernews", "index": 3, "title": "...", "link": "..."},
+         "members": [{"source": "techmeme", "index": 0, "title": "...",
+                      "link": "...", "similarity": 0.83}]}]}
+
+The canonical item is the one with the most text to read; members are
+the other items of the cluster. Only clusters of two or more items are
+listed. NumPy is required (see _relevance.available()).
+"""
+
+import zlib
+from datetime import datetime, timezone
+
+from _articlecache import canonical_url
+from _relevance import TEXT_FIELDS, np, tokenize
+
+# Sources whose items are clustered, in order of preference for ties
+SOURCES = ("hackernews", "techmeme", "producthunt", "github_trending", "arxiv")
+
+LEAD_WORDS = 40
+LEAD_CHARS = 12
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+MIN_OVERLAP = 0.6
+# Sets smaller than this only match on estimated Jaccard similarity, so a
+# two-word product name is not "contained" in every story mentioning it
+MIN_WORDS = 4
+MIN_JACCARD = 0.5
+
+# Largest prime below 2**32: hashes are 32-bit, so (a * h + b) % _PRIME is a
+# random permutation-like hash that never overflows uint64
+_PRIME = 4294967291
+_MIX = np.uint64(0x9E3779B97F4A7C15) if np is not None else None
+
+
+def _permutations():
+    rng = np.random.default_rng(0x5EED)
+    a = rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def _words(item, fields):
+    # Only the lead is tokenized; stopwords and punctuation rarely take
+    # more than LEAD_CHARS characters per kept word
+    lead = " ".join(str(item.get(f) or "") for f in fields[1:])[:LEAD_WORDS * LEAD_CHARS]
+    return set(tokenize(str(item.get(fields[0]) or ""))) | set(tokenize(lead)[:LEAD_WORDS])
+
+
+def signatures(word_sets):
+    """MinHash signatures of non-empty word sets, one row per set."""
+    hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for words in word_sets for w in words),
+                         dtype=np.uint64)
+    sizes = np.fromiter((len(words) for words in word_sets), dtype=np.intp)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    a, b = _permutations()
+    permuted = (hashes[:, None] * a + b) % _PRIME
+    return np.minimum.reduceat(permuted, offsets, axis=0)
+
+
+def candidate_pairs(sig):
+    """Index pairs sharing at least one LSH band.
+
+    Each item in a band bucket is paired with the bucket's first item
+    only, so a large bucket of boilerplate stays linear.
+    """
+    n = len(sig)
+    pairs = set()
+    for band in range(BANDS):
+        rows = sig[:, band * ROWS:(band + 1) * ROWS]
+        key = rows[:, 0].copy()
+        for r in range(1, ROWS):
+            key = key * _MIX ^ rows[:, r]
+        order = np.argsort(key, kind="stable")
+        ordered = key[order]
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = ordered[1:] != ordered[:-1]
+        first = order[np.maximum.accumulate(np.where(starts, np.arange(n), 0))]
+        pairs.update(zip(first[~starts].tolist(), order[~starts].tolist()))
+    return pairs
+
+
+def _similarity(sig, sizes, i, j):
+    """Estimated overlap of sets i and j, or 0 if they don't match."""
+    jaccard = float(np.mean(sig[i] == sig[j]))
+    small = min(sizes[i], sizes[j])
+    if small < MIN_WORDS:
+        return jaccard if jaccard >= MIN_JACCARD else 0.0
+    overlap = jaccard * (sizes[i] + sizes[j]) / ((1 + jaccard) * small)
+    return min(overlap, 1.0) if overlap >= MIN_OVERLAP else 0.0
+
+
+def build(results):
+    """Cluster the items of {source: result}; see the module docstring."""
+    refs = []
+    word_sets = []
+    for source in SOURCES:
+        result = results.get(source)
+        if not isinstance(result, dict):
+            continue
+        fields = TEXT_FIELDS[source]
+        for index, item in enumerate(result.get("items", [])):
+            words = _words(item, fields)
+            if words:
+                text = sum(len(str(item.get(f) or "")) for f in fields)
+                refs.append({"source": source, "index": index,
+                             "title": str(item.get(fields[0]) or "").strip(),
+                             "link": item.get("link", ""), "_text": text})
+                word_sets.append(words)
+
+    parent = list(range(len(refs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    similarity = {}
+    if refs:
+        sig = signatures(word_sets)
+        sizes = [len(words) for words in word_sets]
+        for i, j in candidate_pairs(sig):
+            score = _similarity(sig, sizes, i, j)
+            if score:
+                similarity[i, j] = similarity[j, i] = score
+                parent[find(i)] = find(j)
+
+    by_link = {}
+    for i, ref in enumerate(refs):
+        if ref["link"]:
+            key = canonical_url(ref["link"])
+            if key in by_link:
+                similarity[i, by_link[key]] = similarity[by_link[key], i] = 1.0
+                parent[find(i)] = find(by_link[key])
+            else:
+                by_link[key] = i
+
+    groups = {}
+    for i in range(len(refs)):
+        groups.setdefault(find(i), []).append(i)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        head = max(members, key=lambda i: (refs[i]["_text"], -i))
+        others = []
+        for i in members:
+            if i != head:
+                ref = {k: v for k, v in refs[i].items() if k != "_text"}
+                ref["similarity"] = round(similarity.get((head, i), _linked(sig, sizes, head, i)), 3)
+                others.append(ref)
+        clusters.append({"canonical": {k: v for k, v in refs[head].items() if k != "_text"},
+                         "members": others})
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "items": len(refs),
+        "clusters": clusters,
+    }
+
+
+def _linked(sig, sizes, i, j):
+    """Similarity of two items clustered through others."""
+    return _similarity(sig, sizes, i, j) or float(np.mean(sig[i] == sig[j]))
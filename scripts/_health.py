@@ -0,0 +1,113 @@
+"""Per-source circuit breaker, persisted in the output directory.
+
+fetch_all records every source's outcome in <output_dir>/.health.json.
+After ``threshold`` consecutive failures the breaker opens and the source
+is skipped until its cooldown expires. The cooldown doubles with every
+further failure, up to ``max_cooldown``. The first run after a cooldown
+is a trial (half-open): success closes the breaker, failure reopens it.
+
+Settings come from the top-level "breaker" block of sources.json.
+
+Several runs may share an output directory (cron, the daemon, fetch_batch
+readers). save() therefore re-reads the file under a file lock and
+replays this run's outcomes onto it, so no run's failures are lost.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from _util import file_lock, write_atomic
+
+DEFAULTS = {
+    "threshold": 3,         # consecutive failures before the breaker opens
+    "cooldown": 3600,       # seconds skipped after opening
+    "max_cooldown": 86400,  # cap on the doubled cooldown
+}
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+class Breakers:
+    """Health records and breaker decisions for every source."""
+
+    def __init__(self, path, threshold=3, cooldown=3600, max_cooldown=86400):
+        self.path = path
+        self.threshold = int(threshold)
+        self.cooldown = float(cooldown)
+        self.max_cooldown = float(max_cooldown)
+        self._lock = threading.Lock()
+        self._pending = []
+        self.sources = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def state(self, name, now=None):
+        """Return "closed", "open" (skip it) or "half_open" (cooldown over, try once)."""
+        health = self.sources.get(name, {})
+        if health.get("consecutive_failures", 0) < self.threshold:
+            return "closed"
+        now = time.time() if now is None else now
+        return "open" if now < health.get("open_until", 0) else "half_open"
+
+    def allow(self, name):
+        return self.state(name) != "open"
+
+    def retry_in(self, name):
+        """Seconds until an open breaker allows a trial run (0 if not open)."""
+        return max(0.0, self.sources.get(name, {}).get("open_until", 0) - time.time())
+
+    def record(self, name, success, error=None):
+        """Record one run's outcome, opening or closing the breaker.
+
+        The outcome is kept until save() writes it.
+        """
+        now = time.time()
+        with self._lock:
+            self._pending.append((name, success, error, now))
+            self._apply(self.sources, name, success, error, now)
+
+    def _apply(self, sources, name, success, error, now):
+        health = sources.setdefault(name, {})
+        if success:
+            health.update(consecutive_failures=0, last_success=now, open_until=0)
+            health.pop("last_error", None)
+            return
+        failures = health.get("consecutive_failures", 0) + 1
+        health.update(consecutive_failures=failures, last_failure=now,
+                      last_error=(error or "")[:500])
+        if failures >= self.threshold:
+            cooldown = min(self.cooldown * 2 ** (failures - self.threshold),
+                           self.max_cooldown)
+            health["open_until"] = now + cooldown
+
+    def report(self, name):
+        """Breaker summary for the manifest."""
+        health = self.sources.get(name, {})
+        report = {
+            "state": self.state(name),
+            "consecutive_failures": health.get("consecutive_failures", 0),
+            "last_success": _iso(health.get("last_success")),
+        }
+        if report["state"] != "closed":
+            report["open_until"] = _iso(health.get("open_until"))
+            report["last_error"] = health.get("last_error", "")
+        return report
+
+    def save(self):
+        """Replay the outcomes recorded since the last save onto the file."""
+        with self._lock, file_lock(self.path):
+            sources = self._load()
+            for outcome in self._pending:
+                self._apply(sources, *outcome)
+            write_atomic(self.path, json.dumps(sources, indent=2))
+            self.sources = sources
+            self._pending = []
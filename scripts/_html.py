@@ -0,0 +1,29 @@
+"""HTML parser backend for the scraping fetchers.
+
+parse() builds a BeautifulSoup tree with lxml when it is installed (several
+times faster than the pure-Python "html.parser", which remains the
+fallback). Extractors that only read a few elements pass ``only`` so the
+tree is scoped to those elements and their descendants (a SoupStrainer);
+everything outside them is skipped while parsing.
+
+    soup = parse(html, only={"name": ["article", "main"]})
+    soup = parse(html, only={"class_": "clus"})
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+def parse(markup, only=None):
+    """Parse markup with the fastest available backend.
+
+    only is a dict of SoupStrainer arguments (name, attrs, class_, ...);
+    when given, just the matching elements and their subtrees are built.
+    """
+    strainer = SoupStrainer(**only) if only else None
+    return BeautifulSoup(markup, PARSER, parse_only=strainer)
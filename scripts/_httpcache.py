@@ -0,0 +1,156 @@
+"""On-disk conditional-GET cache for feed responses.
+
+Each cached URL is stored as three files keyed by a hash of the URL:
+
+    <key>.json    validators (ETag / Last-Modified), fetch time, size
+    <key>.body    raw response body
+    <key>.feed    parsed feedparser result as JSON, so a 304 also skips parsing
+
+The parsed feed is plain JSON rather than a pickle, so a file planted in
+the cache directory can at worst serve a wrong feed, never run code.
+Dates (time.struct_time) are tagged and restored; anything else JSON
+can't hold (bozo_exception) is stored as its string.
+
+Writes go through a temp file + rename, so concurrent fetchers (separate
+subprocesses share the same directory) never see a half-written entry.
+Eviction scans the whole directory, so a process runs it on its first
+store and then at most every EVICT_INTERVAL seconds.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from feedparser import FeedParserDict
+
+from _util import write_atomic
+
+EVICT_INTERVAL = 3600
+
+_STRUCT_TIME = "__struct_time__"
+
+
+def _to_json(value):
+    if isinstance(value, time.struct_time):
+        return {_STRUCT_TIME: list(value)}
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _from_json(obj):
+    if _STRUCT_TIME in obj:
+        return time.struct_time(obj[_STRUCT_TIME])
+    return FeedParserDict(obj)
+
+
+class FeedCache:
+    """Size- and age-bounded cache of feed bodies and their validators."""
+
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024, max_age=7 * 86400):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._next_evict = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url, ext):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def load(self, url):
+        """Return the cached metadata dict for url, or None."""
+        try:
+            with open(self._path(url, "json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        return meta
+
+    def body(self, url):
+        """Return the cached raw body for url, or None."""
+        try:
+            with open(self._path(url, "body"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def parsed(self, url):
+        """Return the cached parsed feed for url, or None if missing/unreadable."""
+        try:
+            with open(self._path(url, "feed"), encoding="utf-8") as f:
+                return json.load(f, object_hook=_from_json)
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def validators(self, meta):
+        """Conditional request headers for a cached entry."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url, body, headers, parsed=None):
+        """Cache a 200 response body, its validators and optionally the parsed feed."""
+        write_atomic(self._path(url, "body"), body)
+        if parsed is not None:
+            try:
+                write_atomic(self._path(url, "feed"),
+                             json.dumps(_to_json(parsed), ensure_ascii=False))
+            except (TypeError, ValueError):
+                pass
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag", ""),
+            "last_modified": headers.get("Last-Modified", ""),
+            "stored_at": time.time(),
+            "size": len(body),
+        }
+        write_atomic(self._path(url, "json"), json.dumps(meta).encode("utf-8"))
+        if time.time() >= self._next_evict:
+            self._next_evict = time.time() + EVICT_INTERVAL
+            self.evict()
+
+    def touch(self, url, meta):
+        """Mark an entry fresh again after a 304 Not Modified."""
+        meta = dict(meta, stored_at=time.time())
+        write_atomic(self._path(url, "json"), json.dumps(meta).encode("utf-8"))
+        return meta
+
+    def evict(self):
+        """Drop entries older than max_age, then the oldest until under max_bytes."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            paths = [os.path.join(self.cache_dir, f"{key}.{ext}")
+                     for ext in ("json", "body", "feed")]
+            try:
+                size = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+                mtime = os.path.getmtime(paths[0])
+            except OSError:
+                continue
+            entries.append((mtime, size, paths))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, paths in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                continue
+            for p in paths:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
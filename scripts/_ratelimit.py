@@ -0,0 +1,132 @@
+"""Per-host token buckets and concurrency caps, shared across processes.
+
+Limits come from the "rate_limits" HTTP setting, keyed by host suffix:
+
+    "rate_limits": {
+        "youtube.com": {"rate": 2, "burst": 5, "max_concurrency": 4},
+        "github.com":  {"rate": 1, "burst": 2, "max_concurrency": 1},
+        "*":           {"max_concurrency": 8}
+    }
+
+"rate" is requests per second, "burst" the bucket size (default: one
+second's worth) and "max_concurrency" the number of requests in flight.
+A key matches the host and its subdomains; the longest match wins and
+"*" applies to every other host (each host gets its own bucket).
+
+State lives in small files guarded by flock(), so every fetcher thread,
+every fetcher subprocess and every concurrent fetch_all run on the same
+machine draw from the same buckets:
+
+    <lock_dir>/<key>.bucket   "tokens timestamp" of the token bucket
+    <lock_dir>/<key>.slot<N>  locked while a request holds slot N
+
+Locks are released by the kernel if a process dies, so a crashed fetcher
+never leaks a slot. Where fcntl is unavailable, limiting is skipped.
+"""
+
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # not POSIX
+    fcntl = None
+
+SLOT_POLL = 0.05  # seconds between attempts to grab a concurrency slot
+
+
+def default_dir():
+    """Machine-wide lock directory used when "rate_limit_dir" is not set."""
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.path.join(tempfile.gettempdir(), f"newspaper-ratelimit-{uid}")
+
+
+def match(host, limits):
+    """Return (key, limit) for the longest configured suffix of host, or (None, None)."""
+    host = host.lower()
+    best = None
+    for key in limits:
+        k = key.lower()
+        if (host == k or host.endswith("." + k)) and (best is None or len(k) > len(best)):
+            best = key
+    if best is not None:
+        return best.lower(), limits[best]
+    if "*" in limits:
+        return host, limits["*"]
+    return None, None
+
+
+def _take_token(path, rate, burst):
+    """Reserve one token from the bucket at path; return seconds to wait for it.
+
+    The bucket may go negative: each caller reserves its turn under the
+    lock and then sleeps outside it, so waiters are served in order.
+    """
+    with open(path, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        now = time.time()
+        f.seek(0)
+        try:
+            tokens, stamp = (float(x) for x in f.read().split())
+        except ValueError:
+            tokens, stamp = burst, now
+        tokens = min(burst, tokens + (now - stamp) * rate) - 1
+        f.seek(0)
+        f.truncate()
+        f.write(f"{tokens} {now}")
+        f.flush()
+    return max(0.0, -tokens / rate)
+
+
+@contextmanager
+def _slot(base, max_concurrency):
+    """Hold one of max_concurrency slot locks for the duration of the block."""
+    while True:
+        for i in range(max_concurrency):
+            f = open(f"{base}.slot{i}", "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            try:
+                yield
+            finally:
+                f.close()
+            return
+        time.sleep(SLOT_POLL)
+
+
+@contextmanager
+def limit(url, limits, lock_dir=None):
+    """Wait for a token and a concurrency slot for url's host.
+
+    Yields the seconds spent waiting. A host with no matching limit (or
+    no fcntl) passes straight through.
+    """
+    key, cfg = match(urlsplit(url).hostname or "", limits or {})
+    if key is None or not cfg or fcntl is None:
+        yield 0.0
+        return
+
+    lock_dir = lock_dir or default_dir()
+    os.makedirs(lock_dir, exist_ok=True)
+    base = os.path.join(lock_dir, re.sub(r"[^A-Za-z0-9.-]", "_", key))
+
+    start = time.time()
+    rate = cfg.get("rate")
+    if rate:
+        delay = _take_token(base + ".bucket", float(rate), float(cfg.get("burst", max(rate, 1))))
+        if delay:
+            time.sleep(delay)
+
+    max_concurrency = int(cfg.get("max_concurrency", 0))
+    if max_concurrency > 0:
+        with _slot(base, max_concurrency):
+            yield time.time() - start
+    else:
+        yield time.time() - start
@@ -0,0 +1,211 @@
+"""Score fetched items against the reader's interests (config/interests.md).
+
+The interests file's bullets become weighted query terms: words and
+adjacent word pairs from "Primary" bullets weigh 1.0, "Secondary" 0.5 and
+"Avoid" -1.0 (single Avoid words half that; a term in both a positive
+section and Avoid keeps its positive weight; parenthetical asides are
+ignored). Every item is then scored in one BM25 pass over a NumPy
+term-frequency matrix restricted to those terms, so the batch as a whole
+sets term rarity and document length.
+
+    profile = load_profile("config/interests.md")
+    scored = annotate({"arxiv": arxiv_result, "hackernews": hn_result}, profile)
+
+annotate() adds "relevance" to each item: 1.0 for the best match in the
+batch, 0 for an item sharing no terms with the profile, negative for items
+leaning towards Avoid topics (down to -1.0). Titles count twice.
+
+NumPy is optional: without it nothing is scored (see available()).
+"""
+
+import functools
+import re
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SECTION_WEIGHTS = {"primary": 1.0, "secondary": 0.5, "avoid": -1.0}
+# Single words of an Avoid bullet count this much of its weight; word pairs count fully
+AVOID_WORD_FACTOR = 0.5
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# Fields scored per source; the first one is the title. YouTube items are
+# the videos nested in each channel.
+TEXT_FIELDS = {
+    "techmeme": ("headline", "blurb"),
+    "hackernews": ("title", "body_md"),
+    "arxiv": ("title", "abstract"),
+    "producthunt": ("name", "tagline"),
+    "github_trending": ("repo", "description", "blurb"),
+    "youtube": ("title",),
+}
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from in into is it its of on or the to with
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_ASIDE = re.compile(r"\([^)]*\)")
+_BULLET = re.compile(r"^\s*[-*+]\s+(.*\S)")
+
+# Distinct words remembered by _stem; a long-running daemon sees new ones forever
+STEM_CACHE_SIZE = 65536
+
+
+def available():
+    """True if NumPy is installed, so items can be scored."""
+    return np is not None
+
+
+@functools.lru_cache(maxsize=STEM_CACHE_SIZE)
+def _stem(word):
+    """Fold plurals: "tools" -> "tool", "libraries" -> "library"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, plural-folded words of text, stopwords removed."""
+    return [_stem(w) for w in _TOKEN.findall(text.lower()) if w not in STOPWORDS]
+
+
+def load_profile(path):
+    """Parse an interests file into {term: weight}.
+
+    Terms are single words and "word word" pairs from each bullet.
+    """
+    positive = {}
+    avoid = {}
+    weight = None
+    with open(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                heading = line.lstrip("#").strip().lower()
+                weight = next((w for name, w in SECTION_WEIGHTS.items()
+                               if heading.startswith(name)), None)
+                continue
+            bullet = _BULLET.match(line)
+            if weight is None or not bullet:
+                continue
+            words = tokenize(_ASIDE.sub(" ", bullet.group(1)))
+            pairs = [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if weight < 0:
+                # One word of an Avoid phrase ("software" in "Enterprise
+                # sales software") is weak evidence of the topic
+                avoid.update((word, weight * AVOID_WORD_FACTOR) for word in words)
+                avoid.update((pair, weight) for pair in pairs)
+            else:
+                for term in words + pairs:
+                    positive[term] = max(positive.get(term, 0.0), weight)
+    for term, weight in avoid.items():
+        positive.setdefault(term, weight)
+    return positive
+
+
+def _surface_forms(term):
+    """Spellings of a single-word term as they appear in text."""
+    forms = [term, term + "s"]
+    if term.endswith("y"):
+        forms.append(term[:-1] + "ies")
+    return forms
+
+
+def score(texts, profile):
+    """BM25 scores of texts against profile, as a NumPy array."""
+    terms = list(profile)
+    # Unigrams are looked up by spelling, so only pair heads need stemming
+    column = {form: i for i, term in enumerate(terms) if " " not in term
+              for form in _surface_forms(term)}
+    pair_column = {term: i for i, term in enumerate(terms) if " " in term}
+    heads = {form for term in pair_column for form in _surface_forms(term.split(" ", 1)[0])}
+
+    rows = []
+    cols = []
+    lengths = np.empty(len(texts))
+    for row, text in enumerate(texts):
+        words = [w for w in _TOKEN.findall(text.lower()) if w not in STOPWORDS]
+        lengths[row] = len(words)
+        hits = [column[w] for w in words if w in column]
+        hits += [pair_column[p] for p in [f"{_stem(a)} {_stem(b)}"
+                                          for a, b in zip(words, words[1:]) if a in heads]
+                 if p in pair_column]
+        rows += [row] * len(hits)
+        cols += hits
+
+    n, v = len(texts), len(terms)
+    if not n or not v:
+        return np.zeros(n)
+    tf = np.bincount(np.asarray(rows, dtype=np.intp) * v + np.asarray(cols, dtype=np.intp),
+                     minlength=n * v).reshape(n, v).astype(float)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    norm = K1 * (1 - B + B * lengths / max(lengths.mean(), 1.0))
+    saturated = tf * (K1 + 1) / (tf + norm[:, None])
+    weights = np.array([profile[term] for term in terms])
+    return saturated @ (idf * weights)
+
+
+def relevance(scores):
+    """Scale BM25 scores to [-1, 1], with 1.0 for the best positive score."""
+    if not len(scores):
+        return scores
+    top = scores.max()
+    scale = top if top > 0 else (np.abs(scores).max() or 1.0)
+    return np.clip(scores / scale, -1.0, 1.0)
+
+
+def source_items(source, result):
+    """The scorable items of a source's result (YouTube: every channel's videos)."""
+    if source == "youtube":
+        return [v for channel in result.get("channels", []) for v in channel.get("videos", [])]
+    return result.get("items", [])
+
+
+def _text(item, fields):
+    title = str(item.get(fields[0]) or "")
+    rest = " ".join(str(item.get(f) or "") for f in fields[1:])
+    return f"{title} {title} {rest}"
+
+
+def annotate(results, profile):
+    """Add "relevance" to every item of {source: result} in one scoring pass.
+
+    Sources without scorable items (xkcd) are left alone. Returns the
+    number of items scored.
+    """
+    items = []
+    texts = []
+    for source, result in results.items():
+        fields = TEXT_FIELDS.get(source)
+        if not fields or not isinstance(result, dict):
+            continue
+        for item in source_items(source, result):
+            items.append(item)
+            texts.append(_text(item, fields))
+    if not items:
+        return 0
+    for item, value in zip(items, relevance(score(texts, profile)).tolist()):
+        item["relevance"] = round(value, 3)
+    return len(items)
+
+
+def rank(texts, profile, count):
+    """Indices of the count most relevant texts, in their original order.
+
+    Texts leaning towards Avoid topics (negative scores) are only kept if
+    there are not enough others. Ties keep the original order.
+    """
+    if np is None:
+        print("Warning: numpy not installed; not ranking by interests", file=sys.stderr)
+        return list(range(min(count, len(texts))))
+    order = np.argsort(-score(texts, profile), kind="stable")
+    return sorted(order[:count].tolist())
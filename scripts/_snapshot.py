@@ -0,0 +1,75 @@
+"""Record and replay raw HTTP responses.
+
+With the "record_dir" HTTP setting, every response that passes through
+_util.http_get is saved to disk; with "replay_dir", http_get answers from
+those files and never touches the network. A URL that was not recorded
+fails like an unreachable host, so fetchers take their normal error path.
+
+Each response is stored as two files keyed by a hash of the URL:
+
+    <key>.json   url, status, reason, headers, encoding
+    <key>.body   decoded response body
+"""
+
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from _util import write_atomic
+
+# Body is stored already decoded, so transfer framing no longer applies
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def _paths(snapshot_dir, url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    return (os.path.join(snapshot_dir, f"{key}.json"),
+            os.path.join(snapshot_dir, f"{key}.body"))
+
+
+def save(snapshot_dir, url, resp, body=None):
+    """Save a response (body defaults to resp.content) under the requested URL."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    meta_path, body_path = _paths(snapshot_dir, url)
+    meta = {
+        "url": url,
+        "final_url": resp.url,
+        "status": resp.status_code,
+        "reason": resp.reason,
+        "encoding": resp.encoding,
+        "headers": {k: v for k, v in resp.headers.items()
+                    if k.lower() not in _DROP_HEADERS},
+    }
+    write_atomic(body_path, resp.content if body is None else body)
+    write_atomic(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+
+
+def load(snapshot_dir, url):
+    """Rebuild a requests.Response for url from disk.
+
+    Raises requests.ConnectionError if url was not recorded.
+    """
+    meta_path, body_path = _paths(snapshot_dir, url)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+    except (OSError, ValueError):
+        raise requests.ConnectionError(f"No recorded response for {url} in {snapshot_dir}")
+
+    resp = requests.Response()
+    resp.status_code = meta["status"]
+    resp.reason = meta.get("reason", "")
+    resp.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    resp.encoding = meta.get("encoding")
+    resp.url = meta.get("final_url", url)
+    resp.elapsed = timedelta(0)
+    resp.request = requests.Request("GET", url).prepare()
+    resp._content = body
+    resp._content_consumed = True
+    return resp
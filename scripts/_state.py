@@ -0,0 +1,290 @@
+"""SQLite store for what each source has already served.
+
+One database per output directory (.state.db, passed to fetchers as
+--state-file) replaces the per-source JSON state files. Two tables:
+
+    seen(source, key, first_seen, last_seen, data)
+        One row per item a source has served, e.g. ("hackernews",
+        "https://news.ycombinator.com/item?id=1"). The primary key makes
+        "which of these were served before?" one indexed query. data is
+        whatever was recorded the first time (arXiv keeps the
+        announcement date).
+    kv(source, key, value, updated_at)
+        Small per-source state as JSON (xkcd's last comic number, the
+        githubawesome post being staggered, arXiv's last cycle). Caches
+        with a TTL read it through get_many(max_age=...) and expire().
+
+Every read-modify-write happens in one transaction() that takes SQLite's
+write lock up front (BEGIN IMMEDIATE), so overlapping runs (two cron
+jobs, the daemon and a one-off fetch) queue for up to BUSY_TIMEOUT
+seconds instead of interleaving, and a crash leaves the last committed
+state. Read-only transactions (transaction(write=False), and the store's
+seen(), get() and get_many()) take no lock: in WAL mode they read the
+last committed state while a writer works.
+
+seen rows not touched for RETENTION seconds are dropped by prune().
+
+    store = StateStore.open(".state.db")
+    with store.transaction() as tx:
+        known = tx.seen("hackernews", keys)
+        tx.mark_seen("hackernews", keys)
+
+On creation the database imports the legacy JSON state files found next
+to it (.github_trending_state.json, .xkcd_state.json, .arxiv_state.json).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from _articlecache import canonical_url
+
+RETENTION = 30 * 86400
+BUSY_TIMEOUT = 30
+
+# An item first served this recently still belongs to the current edition:
+# re-runs and daemon refreshes during the morning don't flag it as a repeat
+SEEN_GRACE = 12 * 3600
+
+# Field identifying an item per source, for flag_seen()
+ITEM_KEYS = {
+    "techmeme": "link",
+    "hackernews": "comments_url",
+    "producthunt": "link",
+    "youtube": "link",
+}
+
+# SQLite caps the number of bound parameters per statement
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    data TEXT,
+    PRIMARY KEY (source, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_last_seen ON seen (last_seen);
+CREATE TABLE IF NOT EXISTS kv (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source, key)
+) WITHOUT ROWID;
+"""
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+class Transaction:
+    """Operations on one open transaction; see StateStore.transaction()."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def seen(self, source, keys):
+        """{key: {"first_seen", "last_seen", "data"}} for the keys already recorded."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        found = {}
+        for start in range(0, len(keys), _CHUNK):
+            chunk = keys[start:start + _CHUNK]
+            rows = self.conn.execute(
+                f"SELECT key, first_seen, last_seen, data FROM seen "
+                f"WHERE source = ? AND key IN ({','.join('?' * len(chunk))})",
+                [source] + chunk)
+            for key, first_seen, last_seen, data in rows:
+                found[key] = {"first_seen": first_seen, "last_seen": last_seen,
+                              "data": json.loads(data) if data is not None else None}
+        return found
+
+    def mark_seen(self, source, keys, now=None):
+        """Record keys as served now; keys may be a {key: data} dict.
+
+        A key's first_seen and data are kept from the first time it was
+        recorded; last_seen is updated.
+        """
+        now = now or time.time()
+        pairs = keys.items() if isinstance(keys, dict) else ((k, None) for k in keys)
+        self.conn.executemany(
+            "INSERT INTO seen (source, key, first_seen, last_seen, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, key) DO UPDATE SET last_seen = excluded.last_seen, "
+            "data = COALESCE(seen.data, excluded.data)",
+            [(source, key, now, now, json.dumps(data) if data is not None else None)
+             for key, data in pairs if key])
+
+    def forget(self, source):
+        """Drop every seen row of source."""
+        self.conn.execute("DELETE FROM seen WHERE source = ?", (source,))
+
+    def get(self, source, key, default=None):
+        row = self.conn.execute("SELECT value FROM kv WHERE source = ? AND key = ?",
+                                (source, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def put(self, source, key, value):
+        self.put_many(source, {key: value})
+
+    def get_many(self, source, keys, max_age=None):
+        """{key: value} for the keys stored, skipping values older than max_age seconds."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        cutoff = time.time() - max_age if max_age is not None else float("-inf")
+        found = {}
+        for start in range(0, len(keys), _CHUNK):
+            chunk = keys[start:start + _CHUNK]
+            rows = self.conn.execute(
+                f"SELECT key, value FROM kv WHERE source = ? AND updated_at >= ? "
+                f"AND key IN ({','.join('?' * len(chunk))})",
+                [source, cutoff] + chunk)
+            found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def put_many(self, source, values):
+        """put() every {key: value} pair."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO kv (source, key, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (source, key) DO UPDATE SET value = excluded.value, "
+            "updated_at = excluded.updated_at",
+            [(source, key, json.dumps(value, ensure_ascii=False), now)
+             for key, value in values.items()])
+
+    def expire(self, source, max_age):
+        """Drop source's kv values older than max_age seconds; returns how many."""
+        cur = self.conn.execute("DELETE FROM kv WHERE source = ? AND updated_at < ?",
+                                (source, time.time() - max_age))
+        return cur.rowcount
+
+    def prune(self, retention=RETENTION):
+        """Drop seen rows not touched for retention seconds; returns how many."""
+        cur = self.conn.execute("DELETE FROM seen WHERE last_seen < ?",
+                                (time.time() - retention,))
+        return cur.rowcount
+
+
+class StateStore:
+    """Handle on one state database. Safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        created = not os.path.exists(path)
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        if created:
+            with self.transaction() as tx:
+                _import_legacy(tx, os.path.dirname(path))
+
+    @classmethod
+    def open(cls, path):
+        """Return the process-wide store for path, creating it on first use."""
+        path = os.path.abspath(path)
+        with _open_lock:
+            if path not in _open:
+                _open[path] = cls(path)
+            return _open[path]
+
+    @contextmanager
+    def transaction(self, write=True):
+        """Yield a Transaction; commit on success.
+
+        A write transaction holds the write lock from the start; with
+        write=False it is a plain deferred one, for reads.
+        """
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield Transaction(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def seen(self, source, keys):
+        with self.transaction(write=False) as tx:
+            return tx.seen(source, keys)
+
+    def mark_seen(self, source, keys):
+        with self.transaction() as tx:
+            tx.mark_seen(source, keys)
+
+    def get(self, source, key, default=None):
+        with self.transaction(write=False) as tx:
+            return tx.get(source, key, default)
+
+    def get_many(self, source, keys, max_age=None):
+        with self.transaction(write=False) as tx:
+            return tx.get_many(source, keys, max_age)
+
+    def put(self, source, key, value):
+        with self.transaction() as tx:
+            tx.put(source, key, value)
+
+    def prune(self, retention=RETENTION):
+        with self.transaction() as tx:
+            return tx.prune(retention)
+
+
+def item_key(source, item):
+    """Canonical identity of an output item for source, or "" if it has none."""
+    value = item.get(ITEM_KEYS.get(source, "link")) or item.get("link")
+    return canonical_url(value) if value else ""
+
+
+def flag_seen(tx, source, items, grace=SEEN_GRACE):
+    """Flag items served before the current edition, then record all of them.
+
+    An item first served more than grace seconds ago gets
+    "previously_seen": true and its "first_seen" time. Returns the number
+    flagged.
+    """
+    now = time.time()
+    keys = [item_key(source, item) for item in items]
+    known = tx.seen(source, keys)
+    flagged = 0
+    for item, key in zip(items, keys):
+        row = known.get(key)
+        if row and row["first_seen"] < now - grace:
+            item["previously_seen"] = True
+            item["first_seen"] = datetime.fromtimestamp(row["first_seen"], timezone.utc).isoformat()
+            flagged += 1
+    tx.mark_seen(source, keys, now)
+    return flagged
+
+
+def _import_legacy(tx, directory):
+    """Copy the pre-SQLite JSON state files in directory into the store."""
+    def load(name):
+        try:
+            with open(os.path.join(directory, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    github = load(".github_trending_state.json")
+    if github and github.get("blog_id"):
+        tx.put("github_trending", "blog_id", github["blog_id"])
+        tx.mark_seen("github_trending", [r.lower() for r in github.get("served", [])])
+
+    xkcd = load(".xkcd_state.json")
+    if xkcd and xkcd.get("comic_num"):
+        tx.put("xkcd", "comic_num", xkcd["comic_num"])
+
+    arxiv = load(".arxiv_state.json")
+    if arxiv:
+        tx.mark_seen("arxiv", arxiv.pop("seen", {}))
+        tx.put("arxiv", "cycle", arxiv)
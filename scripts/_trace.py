@@ -0,0 +1,145 @@
+"""Lightweight timing spans for fetchers.
+
+Fetchers wrap interesting stages in ``with span("name", **attrs):``.
+Spans nest through a context variable, so they attach to whichever
+source is currently being collected:
+
+  * in-process / async runs: fetch_all wraps each source in collect(),
+    and submit() / the _aio executor carry the context into worker threads.
+  * subprocess runs: fetch_all sets NEWSPAPER_TRACE to a file path; a
+    process-wide root is created on import and dumped there at exit.
+
+When nothing is collecting, span() is a cheap no-op.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_ENV = "NEWSPAPER_TRACE"
+
+
+class Span:
+    """A timed stage with attributes and child spans."""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.end = None
+        self.tid = threading.get_ident()
+        self.children = []
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, child):
+        with self._lock:
+            self.children.append(child)
+
+    def finish(self):
+        self.end = time.time()
+
+    def to_dict(self):
+        end = self.end if self.end is not None else time.time()
+        d = {"name": self.name,
+             "start": round(self.start, 6),
+             "duration_ms": round((end - self.start) * 1000, 2)}
+        d.update(self.attrs)
+        d["tid"] = self.tid
+        if self.children:
+            d["children"] = [c.to_dict() for c in self.children]
+        return d
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NULL = _NullSpan()
+_current = contextvars.ContextVar("newspaper_span", default=None)
+_process_root = None
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a stage under the current span. No-op if nothing is collecting."""
+    parent = _current.get() or _process_root
+    if parent is None:
+        yield _NULL
+        return
+    s = Span(name, **attrs)
+    parent.add(s)
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        s.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def collect(name):
+    """Collect every span opened inside the block under a new root span."""
+    root = Span(name)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        root.finish()
+        _current.reset(token)
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit() that runs fn inside a copy of the caller's span context."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def to_chrome_events(timings, pid=0):
+    """Flatten a span dict tree into Chrome trace-event "complete" events."""
+    events = []
+
+    def walk(d):
+        args = {k: v for k, v in d.items()
+                if k not in ("name", "start", "duration_ms", "tid", "children")}
+        events.append({"name": d["name"], "ph": "X", "pid": pid, "tid": d.get("tid", 0),
+                       "ts": int(d["start"] * 1e6), "dur": int(d["duration_ms"] * 1000),
+                       "args": args})
+        for child in d.get("children", []):
+            walk(child)
+
+    walk(timings)
+    return events
+
+
+def detach():
+    """Stop the process-wide root started from NEWSPAPER_TRACE.
+
+    For worker processes that inherited the variable: they must not dump
+    their own spans over the parent's trace file at exit.
+    """
+    global _process_root
+    if _process_root is not None:
+        atexit.unregister(_dump_process_root)
+        _process_root = None
+    os.environ.pop(TRACE_ENV, None)
+
+
+def _dump_process_root(path):
+    _process_root.finish()
+    try:
+        with open(path, "w") as f:
+            json.dump(_process_root.to_dict(), f)
+    except OSError:
+        pass
+
+
+if os.environ.get(TRACE_ENV):
+    _process_root = Span("fetch", pid=os.getpid())
+    atexit.register(_dump_process_root, os.environ[TRACE_ENV])
@@ -1,7 +1,28 @@
 """Shared utilities for fetcher scripts."""
 
+import atexit
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from contextlib import contextmanager
+
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
+
+from _trace import span
+
+try:
+    import fcntl
+except ImportError:  # not POSIX
+    fcntl = None
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -9,6 +30,396 @@ HEADERS = {
                   "Chrome/120.0.0.0 Safari/537.36"
 }
 
+# HTTP settings come from the "http" block of sources.json. fetch_all.py
+# hands them to subprocess fetchers as JSON in this environment variable,
+# and to in-process fetchers via configure_http().
+HTTP_ENV = "NEWSPAPER_HTTP"
+
+DEFAULT_HTTP = {
+    "pool_connections": 10,  # number of per-host connection pools kept alive
+    "pool_maxsize": 10,      # max open connections per host
+    "max_in_flight": 16,     # global request cap for the asyncio engine
+    "cache_dir": None,       # feed cache directory; None disables caching
+    "cache_ttl": 0,          # seconds a cached feed is served without revalidating
+    "cache_ttl_overrides": {},  # {url_prefix: seconds}, longest prefix wins
+    "cache_max_bytes": 64 * 1024 * 1024,
+    "cache_max_age": 7 * 86400,
+    "record_dir": None,      # save every response here (see _snapshot.py)
+    "replay_dir": None,      # serve responses from here; no network access
+    "rate_limits": {},       # {host_suffix: {rate, burst, max_concurrency}} (see _ratelimit.py)
+    "rate_limit_dir": None,  # shared lock files; None = machine-wide temp dir
+    "deadline": None,        # run-wide deadline (epoch seconds); None = no deadline
+    "retries": 2,            # extra attempts after a connection error, timeout or 429/5xx
+    "retry_backoff": 0.5,    # base seconds for jittered exponential backoff
+    "retry_max_backoff": 8,  # cap on a single backoff (and on honoured Retry-After)
+    "memoize": False,        # fetch each URL once per process (fetch_batch.py)
+}
+
+# Responses worth retrying; anything else is returned to the caller as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Read once, while importing is still single-threaded: os.umask() can only
+# be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_http_config = None
+_session = None
+_session_lock = threading.Lock()
+_feed_cache = None
+_memo = {}
+_memo_lock = threading.Lock()
+_local_locks = {}
+# Thread name prefix of each pool made by thread_pool(), and the worker
+# threads abandon() left running
+_pool_prefixes = weakref.WeakKeyDictionary()
+_pool_ids = itertools.count()
+_abandoned = set()
+_abandoned_lock = threading.Lock()
+
+
+def http_settings():
+    """Return the effective HTTP settings (defaults < environment < configure_http)."""
+    global _http_config
+    if _http_config is None:
+        settings = dict(DEFAULT_HTTP)
+        raw = os.environ.get(HTTP_ENV)
+        if raw:
+            try:
+                settings.update(json.loads(raw))
+            except ValueError:
+                pass
+        _http_config = settings
+    return _http_config
+
+
+def configure_http(**options):
+    """Override HTTP settings for this process. Drops the current session."""
+    global _session, _feed_cache
+    with _session_lock:
+        http_settings().update(options)
+        if _session is not None:
+            _session.close()
+            _session = None
+        _feed_cache = None
+    with _memo_lock:
+        _memo.clear()
+
+
+def memoized(key, fn):
+    """Return fn(), computed once per key while the "memoize" setting is on.
+
+    Concurrent callers with the same key wait for the first caller's
+    result; a raised exception is shared the same way.
+    """
+    if not http_settings().get("memoize"):
+        return fn()
+    with _memo_lock:
+        entry = _memo.get(key)
+        owner = entry is None
+        if owner:
+            entry = _memo[key] = {"done": threading.Event()}
+    if owner:
+        try:
+            entry["value"] = fn()
+        except Exception as e:
+            entry["error"] = e
+        finally:
+            entry["done"].set()
+    else:
+        entry["done"].wait()
+    if "error" in entry:
+        raise entry["error"]
+    return entry["value"]
+
+
+def get_session():
+    """Return the process-wide requests session, creating it on first use.
+
+    The session keeps one keep-alive connection pool per host, so repeated
+    requests to the same host (YouTube channel feeds, arXiv categories)
+    reuse TCP/TLS connections. Safe to call from multiple threads.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                settings = http_settings()
+                adapter = HTTPAdapter(pool_connections=int(settings["pool_connections"]),
+                                      pool_maxsize=int(settings["pool_maxsize"]))
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised by http_get once the run-wide deadline has passed."""
+
+
+def deadline_remaining():
+    """Seconds left before the run-wide deadline, or None if there is none."""
+    deadline = http_settings().get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def deadline_passed():
+    """True once the run-wide deadline (if any) has been reached."""
+    left = deadline_remaining()
+    return left is not None and left <= 0
+
+
+def until_deadline(futures):
+    """as_completed(futures) that stops at the run-wide deadline.
+
+    Futures still pending at the deadline are cancelled (those already
+    running are abandoned); callers find them with ``not future.done()``.
+    """
+    try:
+        yield from as_completed(futures, timeout=deadline_remaining())
+    except TimeoutError:
+        for future in futures:
+            future.cancel()
+
+
+def thread_pool(max_workers, name="pool"):
+    """A ThreadPoolExecutor whose worker threads abandon() can find by name."""
+    prefix = f"{name}-{next(_pool_ids)}"
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=prefix)
+    _pool_prefixes[pool] = prefix + "_"
+    return pool
+
+
+def abandon(pool):
+    """Shut a thread_pool() down without waiting for its running tasks.
+
+    Queued tasks are cancelled. Running ones keep their threads, which
+    the interpreter would still join at exit; exit_process() does not
+    wait for them. Only threads still alive are remembered, and ones
+    that have since finished are dropped, so a daemon abandoning a pool
+    per refresh does not accumulate them.
+    """
+    pool.shutdown(wait=False, cancel_futures=True)
+    prefix = _pool_prefixes.pop(pool, None)
+    if prefix is None:
+        return
+    running = {t for t in threading.enumerate() if t.name.startswith(prefix)}
+    with _abandoned_lock:
+        _abandoned.difference_update([t for t in _abandoned if not t.is_alive()])
+        _abandoned.update(running)
+
+
+def exit_process(code=0):
+    """End a command-line run without waiting for abandoned tasks.
+
+    Normally this is sys.exit(). If a thread left running by abandon() is
+    still alive (a fetch hung past the deadline), the interpreter would
+    join it at exit, so exit handlers are run and output flushed here,
+    then the process ends with os._exit().
+    """
+    with _abandoned_lock:
+        hung = any(t.is_alive() for t in _abandoned)
+    if not hung:
+        sys.exit(code)
+    atexit._run_exitfuncs()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def _clamp_timeout(timeout):
+    """Shorten a request timeout so it cannot outlive the deadline."""
+    left = deadline_remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("run deadline reached")
+    return min(timeout, left) if timeout else left
+
+
+def rate_limit(url):
+    """Context manager holding url's per-host rate-limit token and slot.
+
+    http_get uses it for every request; wrap other network calls to the
+    same hosts (e.g. third-party clients) in it too. Yields seconds waited.
+    """
+    import _ratelimit
+    settings = http_settings()
+    return _ratelimit.limit(url, settings.get("rate_limits"), settings.get("rate_limit_dir"))
+
+
+def _backoff(attempt, settings, resp=None):
+    """Seconds before retry number attempt + 1.
+
+    Full jitter: uniform in [0, retry_backoff * 2**attempt], capped at
+    retry_max_backoff. A numeric Retry-After from the server wins.
+    """
+    cap = float(settings["retry_max_backoff"])
+    after = resp.headers.get("Retry-After", "") if resp is not None else ""
+    if after.isdigit():
+        return min(float(after), cap)
+    return random.uniform(0, min(cap, float(settings["retry_backoff"]) * 2 ** attempt))
+
+
+def _attempt(url, timeout, s, **kwargs):
+    """One rate-limited, deadline-bounded GET, recorded on span s."""
+    with rate_limit(url) as waited:
+        if waited:
+            s.set(rate_wait_ms=round(waited * 1000, 2))
+        timeout = _clamp_timeout(timeout)
+        start = time.time()
+        resp = get_session().get(url, timeout=timeout, **kwargs)
+        ttfb = resp.elapsed.total_seconds()
+        s.set(status=resp.status_code, ttfb_ms=round(ttfb * 1000, 2))
+        if not kwargs.get("stream"):
+            s.set(bytes=len(resp.content),
+                  download_ms=round(max(time.time() - start - ttfb, 0) * 1000, 2))
+        return resp
+
+
+def http_get(url, timeout=30, retries=None, **kwargs):
+    """GET a URL through the shared session. Same signature as requests.get.
+
+    Records an "http" span with status, time to first byte (headers
+    received), body size and body download time. Every request first
+    passes the per-host limiter (see rate_limit()), and its timeout is
+    cut short by the run-wide deadline, if any.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    "retries" times with jittered exponential backoff (see _backoff()),
+    as long as the wait ends before the deadline. The span's "attempts"
+    is set when more than one was needed. retries overrides the setting
+    for this request; pass 0 where timeout must bound the whole call.
+
+    In replay mode the response comes from the snapshot directory and the
+    network is never used; in record mode every response is saved there.
+    With "memoize" on, non-streamed responses are shared per URL.
+
+    With stream=True only the headers have been read on return; read the
+    body with read_body() (which also records it) and close the response.
+    """
+    if http_settings().get("memoize") and not kwargs.get("stream"):
+        key = ("get", url, repr(sorted(kwargs.items())))
+        return memoized(key, lambda: _http_get(url, timeout, retries, **kwargs))
+    return _http_get(url, timeout, retries, **kwargs)
+
+
+def _http_get(url, timeout=30, retries=None, **kwargs):
+    settings = http_settings()
+    if settings.get("replay_dir"):
+        import _snapshot
+        with span("http", url=url, replay=True) as s:
+            resp = _snapshot.load(settings["replay_dir"], url)
+            s.set(status=resp.status_code, bytes=len(resp.content))
+            return resp
+
+    if retries is None:
+        retries = int(settings.get("retries") or 0)
+    with span("http", url=url) as s:
+        attempt, retry_wait = 0, 0.0
+        while True:
+            try:
+                resp, error = _attempt(url, timeout, s, **kwargs), None
+            except DeadlineExceeded:
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                resp, error = None, e
+
+            if attempt >= retries or (error is None and resp.status_code not in RETRY_STATUSES):
+                break
+            delay = _backoff(attempt, settings, resp)
+            left = deadline_remaining()
+            if left is not None and delay >= left:
+                break
+            if resp is not None:
+                resp.close()
+            attempt += 1
+            retry_wait += delay
+            s.set(attempts=attempt + 1, retry_wait_ms=round(retry_wait * 1000, 2))
+            time.sleep(delay)
+
+        if error is not None:
+            s.set(error=type(error).__name__)
+            raise error
+        if settings.get("record_dir") and not kwargs.get("stream"):
+            import _snapshot
+            _snapshot.save(settings["record_dir"], url, resp)
+        return resp
+
+
+def read_body(resp, url, max_bytes=None, enough=None, chunk_size=64 * 1024):
+    """Read a stream=True response body, stopping early if asked to.
+
+    Reading stops after max_bytes, or as soon as enough(data_so_far)
+    returns true. The bytes read become resp.content (so resp.text works
+    as usual, on the part read) and are saved under url in record mode.
+    Records a "download" span with the size and whether it was cut short.
+    """
+    with span("download", url=url) as s:
+        start = time.time()
+        buf, cut = bytearray(), None
+        for chunk in resp.iter_content(chunk_size):
+            buf += chunk
+            if max_bytes and len(buf) > max_bytes:
+                cut = "max_bytes"
+                break
+            if enough is not None and enough(buf):
+                cut = "enough"
+                break
+        data = bytes(buf[:max_bytes] if max_bytes else buf)
+        resp._content = data
+        resp._content_consumed = True
+        s.set(bytes=len(data), download_ms=round((time.time() - start) * 1000, 2))
+        if cut:
+            s.set(stopped=cut)
+
+    settings = http_settings()
+    if settings.get("record_dir") and not settings.get("replay_dir"):
+        import _snapshot
+        _snapshot.save(settings["record_dir"], url, resp)
+    return data
+
+
+def feed_cache():
+    """Return the shared FeedCache, or None when no cache_dir is configured.
+
+    The cache is also off while recording or replaying, so snapshots hold
+    full 200 responses rather than 304s.
+    """
+    global _feed_cache
+    settings = http_settings()
+    if settings.get("record_dir") or settings.get("replay_dir"):
+        return None
+    if _feed_cache is None and settings.get("cache_dir"):
+        from _httpcache import FeedCache
+        _feed_cache = FeedCache(settings["cache_dir"],
+                                max_bytes=int(settings["cache_max_bytes"]),
+                                max_age=float(settings["cache_max_age"]))
+    return _feed_cache
+
+
+def cache_ttl(url):
+    """Seconds a cached copy of url may be served without revalidation."""
+    settings = http_settings()
+    best, ttl = "", settings.get("cache_ttl", 0)
+    for prefix, seconds in (settings.get("cache_ttl_overrides") or {}).items():
+        if url.startswith(prefix) and len(prefix) > len(best):
+            best, ttl = prefix, seconds
+    return float(ttl or 0)
+
+
+def _parse_body(url, body):
+    with span("parse", parser="feedparser", bytes=len(body)) as s:
+        feed = feedparser.parse(body)
+        s.set(entries=len(feed.entries))
+    if feed.bozo and not feed.entries:
+        raise RuntimeError(f"Failed to parse feed from {url}: {feed.bozo_exception}")
+    return feed
+
 
 def parse_feed(url, timeout=30):
     """Fetch RSS/Atom feed using requests (proxy-aware), parse with feedparser.
@@ -16,10 +427,132 @@ def parse_feed(url, timeout=30):
     feedparser.parse(url) uses urllib internally which doesn't respect
     system proxy settings in some environments. This function decouples
     HTTP fetching from XML parsing for reliability.
+
+    When a feed cache is configured, the request is conditional
+    (If-None-Match / If-Modified-Since) and a 304 is served from disk,
+    including the already-parsed feed. Within the URL's cache TTL the
+    network is skipped entirely. With "memoize" on, each URL is fetched
+    and parsed once per process.
     """
-    resp = requests.get(url, headers=HEADERS, timeout=timeout)
-    resp.raise_for_status()
-    feed = feedparser.parse(resp.content)
-    if feed.bozo and not feed.entries:
-        raise RuntimeError(f"Failed to parse feed from {url}: {feed.bozo_exception}")
-    return feed
+    return memoized(("feed", url), lambda: _parse_feed(url, timeout))
+
+
+def _parse_feed(url, timeout):
+    with span("feed", url=url) as s:
+        cache = feed_cache()
+        if cache is None:
+            s.set(cache="off")
+            resp = http_get(url, timeout=timeout)
+            resp.raise_for_status()
+            return _parse_body(url, resp.content)
+
+        meta = cache.load(url)
+        headers = {}
+        if meta:
+            if time.time() - meta.get("stored_at", 0) < cache_ttl(url):
+                feed = cache.parsed(url)
+                if feed is not None:
+                    s.set(cache="fresh")
+                    return feed
+            headers = cache.validators(meta)
+
+        resp = http_get(url, timeout=timeout, headers=headers)
+        if resp.status_code == 304:
+            feed = cache.parsed(url) if meta else None
+            if feed is None and meta:
+                body = cache.body(url)
+                if body is not None:
+                    feed = _parse_body(url, body)
+            if feed is not None:
+                cache.touch(url, meta)
+                s.set(cache="not_modified")
+                return feed
+            # Nothing to reuse (entry evicted meanwhile): treat it as a
+            # miss and ask again without validators; no-cache keeps a
+            # caching proxy from answering 304 again
+            resp = http_get(url, timeout=timeout, headers={"Cache-Control": "no-cache"})
+            if resp.status_code == 304:
+                raise requests.HTTPError(f"304 Not Modified for {url} with nothing cached",
+                                         response=resp)
+
+        s.set(cache="miss")
+        resp.raise_for_status()
+        feed = _parse_body(url, resp.content)
+        cache.store(url, resp.content, resp.headers, parsed=feed)
+        return feed
+
+
+# --- NDJSON streaming -------------------------------------------------------
+#
+# In streaming mode a fetcher emits one JSON record per line as soon as
+# each item is ready, then a final summary record carrying the counts:
+#
+#   {"type": "item", "source": "hackernews", "index": 3, "item": {...}}
+#   {"type": "summary", "source": "hackernews", "count": 10, ...}
+#
+# Sorting item records by "index" restores the non-streaming output order.
+# Each fetcher's stream() yields these records.
+
+def item_record(source, index, item):
+    return {"type": "item", "source": source, "index": index, "item": item}
+
+
+def summary_record(result, list_key="items"):
+    """Summary record for a fetch() result: everything except the item list."""
+    record = {"type": "summary"}
+    record.update((k, v) for k, v in result.items() if k != list_key)
+    return record
+
+
+def result_records(result, list_key="items"):
+    """Stream records for an already-complete fetch() result."""
+    for index, item in enumerate(result.get(list_key, [])):
+        yield item_record(result["source"], index, item)
+    yield summary_record(result, list_key)
+
+
+def write_records(records, out):
+    """Write records as NDJSON, flushing after each line."""
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def write_atomic(path, data):
+    """Replace path with data (str or bytes) so readers never see a partial file.
+
+    The file gets the permissions a plain open() would give it under the
+    umask, not mkstemp's owner-only 0600.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, 0o666 & ~_UMASK)
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path + ".lock" for a read-modify-write of path.
+
+    Serializes every process on the machine that updates the same file;
+    the kernel releases the lock if a process dies. Without fcntl (not
+    POSIX) this only guards threads of one process.
+    """
+    if fcntl is None:
+        with _local_locks.setdefault(os.path.abspath(path), threading.Lock()):
+            yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
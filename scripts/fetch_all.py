@@ -13,92 +13,571 @@ This runs each enabled fetcher, writing individual JSON files to output-dir:
     today/youtube.json
     today/xkcd.json
     today/xkcd-NNNN.png  (if new comic found)
+    today/clusters.json   (the same story reported by several sources)
     today/manifest.json   (summary of all fetches)
 
-Each fetcher runs as a subprocess so failures are isolated.
+By default each fetcher runs as a subprocess so failures are isolated.
+With --in-process, each fetcher module is imported once and its fetch
+function is called directly from a shared worker pool; failures are
+isolated by exception capture and a per-call timeout instead. With
+--async, every source runs as a coroutine on one asyncio event loop and
+all requests share a single globally bounded HTTP layer (see _aio.py).
+
+Every mode records per-stage timing spans (HTTP time-to-first-byte and
+download, feed/HTML parsing, per-article and per-channel work) under
+each source's "timings" in the manifest. --trace FILE also writes them
+as Chrome trace-event JSON (open in chrome://tracing or Perfetto).
+
+--record DIR saves every raw HTTP response fetched during the run;
+--replay DIR re-runs all fetchers against those snapshots with no
+network access (see _snapshot.py).
+
+With --stream, each source writes today/<name>.jsonl instead: one NDJSON
+record per item, appended and flushed as soon as the item is ready, then
+a summary record (format in _util.py). Downstream consumers can tail the
+files while slow sources such as Hacker News article extraction are still
+running. In --async mode results are written when each source finishes.
+
+Every run has a deadline (--deadline SECONDS, default just under the
+per-fetcher timeout) that fetchers see through the HTTP settings. Work
+still pending at the deadline is abandoned and the finished part is
+written with "partial": true and the dropped items listed; the manifest
+repeats both. Fetchers are only killed if they overrun it by
+DEADLINE_GRACE seconds.
+
+What each source has served is kept in today/.state.db (see _state.py):
+GitHub staggering, the last xkcd comic, arXiv announcement cycles, and
+every Techmeme, HN, Product Hunt and YouTube item, so items served in an
+earlier edition come out flagged "previously_seen".
+
+Each source's outcome is tracked in today/.health.json. A source that
+keeps failing trips its circuit breaker and is skipped until a cooldown
+expires (see _health.py); the manifest reports every breaker's state.
+
+--daemon keeps running instead: each source is refreshed in-process on
+its own "refresh_interval" (seconds, per source in sources.json), output
+files and manifest.json are replaced atomically, and a failed refresh
+keeps the previous file. Generating an edition then only reads files.
+
+If sources.json names an "interests" file, every item written is given a
+"relevance" score against it (see _relevance.py), all sources scored
+together once the fetchers finish. "prefilter": true on hackernews also
+picks which stories to extract by title relevance. Near-duplicate stories
+across sources are then grouped in today/clusters.json (see _clusters.py).
 """
 
+import asyncio
+import importlib
 import json
 import os
+import signal
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from pathlib import Path
 
 
 SCRIPT_DIR = Path(__file__).parent
+FETCH_TIMEOUT = 120
+DEADLINE_GRACE = 10  # seconds a fetcher gets past the deadline to write its output
+STATE_DB = ".state.db"  # what each source has served (see _state.py)
+
+# --daemon: default seconds between refreshes, overridden by a source's
+# "refresh_interval". github_trending serves its next per_day batch on
+# every refresh, so it stays daily.
+REFRESH_INTERVALS = {
+    "techmeme": 15 * 60,
+    "hackernews": 15 * 60,
+    "producthunt": 60 * 60,
+    "youtube": 60 * 60,
+    "xkcd": 3 * 3600,
+    "arxiv": 6 * 3600,
+    "github_trending": 24 * 3600,
+}
+RETRY_INTERVAL = 5 * 60
+
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+import _aio  # noqa: E402
+import _clusters  # noqa: E402
+import _relevance  # noqa: E402
+import _trace  # noqa: E402
+from _state import StateStore, flag_seen, ITEM_KEYS  # noqa: E402
+from _health import Breakers  # noqa: E402
+from _util import (HTTP_ENV, abandon, configure_http, exit_process, result_records,  # noqa: E402
+                   thread_pool, write_atomic)
+from fetch_youtube import YT_FEED_BASE  # noqa: E402
+
+
+def _describe(data, output_file):
+    """Summarize a fetcher result for the manifest detail string."""
+    try:
+        count = data.get("count",
+                      data.get("total_new_videos",
+                      "new" if data.get("new") else "?"))
+    except Exception:
+        count = "?"
+    partial = " (partial)" if isinstance(data, dict) and data.get("partial") else ""
+    return f"{count} items{partial} → {output_file}"
 
 
-def run_fetcher(name, cmd, output_file):
-    """Run a single fetcher subprocess. Returns (name, success, path_or_error)."""
+def _partial_info(output_file):
+    """Manifest fields for a partial result file: {"partial", "dropped"} or {}."""
+    try:
+        with open(output_file) as f:
+            if output_file.endswith(".jsonl"):
+                data = json.loads(f.read().splitlines()[-1])
+            else:
+                data = json.load(f)
+    except (OSError, ValueError, IndexError):
+        return {}
+    if isinstance(data, dict) and data.get("partial"):
+        return {"partial": True, "dropped": data.get("dropped", [])}
+    return {}
+
+
+def _load_trace(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_fetcher(name, cmd, output_file, env=None, timeout=FETCH_TIMEOUT):
+    """Run a single fetcher subprocess.
+
+    Returns (name, success, path_or_error, timings); timings are the
+    spans the child wrote to its NEWSPAPER_TRACE file.
+    """
+    fd, trace_path = tempfile.mkstemp(prefix=f".trace-{name}-", suffix=".json",
+                                      dir=os.path.dirname(output_file))
+    os.close(fd)
+    env = dict(env if env is not None else os.environ, **{_trace.TRACE_ENV: trace_path})
     try:
         result = subprocess.run(
             cmd,
             capture_output=True,
             text=True,
-            timeout=120
+            timeout=timeout,
+            env=env
         )
+        timings = _load_trace(trace_path)
         if result.returncode != 0:
-            return (name, False, result.stderr.strip())
+            return (name, False, result.stderr.strip(), timings)
 
-        with open(output_file, "w") as f:
-            f.write(result.stdout)
+        write_atomic(output_file, result.stdout)
 
         # Parse to get item count
         try:
             data = json.loads(result.stdout)
-            count = data.get("count",
-                          data.get("total_new_videos",
-                          "new" if data.get("new") else "?"))
         except Exception:
-            count = "?"
+            data = None
 
-        return (name, True, f"{count} items → {output_file}")
+        return (name, True, _describe(data, output_file), timings)
 
     except subprocess.TimeoutExpired:
-        return (name, False, "TIMEOUT (120s)")
+        return (name, False, f"TIMEOUT ({timeout:.0f}s)", _load_trace(trace_path))
     except Exception as e:
-        return (name, False, str(e))
+        return (name, False, str(e), _load_trace(trace_path))
 
 
-def fetch_all(config_path, output_dir):
-    config_path = os.path.abspath(config_path)
-    output_dir = os.path.abspath(output_dir)
-    os.makedirs(output_dir, exist_ok=True)
+def stream_fetcher(name, cmd, output_file, env=None, timeout=FETCH_TIMEOUT):
+    """Run a fetcher subprocess in --ndjson mode, appending records as they arrive.
 
-    with open(config_path) as f:
-        config = json.load(f)
+    Returns (name, success, path_or_error, timings) like run_fetcher().
+    """
+    fd, trace_path = tempfile.mkstemp(prefix=f".trace-{name}-", suffix=".json",
+                                      dir=os.path.dirname(output_file))
+    os.close(fd)
+    env = dict(env if env is not None else os.environ, **{_trace.TRACE_ENV: trace_path})
+    try:
+        with tempfile.TemporaryFile(mode="w+") as stderr, open(output_file, "w") as out:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr,
+                                    text=True, env=env)
+            timer = threading.Timer(timeout, proc.kill)
+            timer.start()
+            summary = None
+            try:
+                for line in proc.stdout:
+                    out.write(line)
+                    out.flush()
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("type") == "summary":
+                        summary = record
+                returncode = proc.wait()
+            finally:
+                timed_out = not timer.is_alive() and proc.returncode != 0
+                timer.cancel()
+
+            timings = _load_trace(trace_path)
+            if timed_out:
+                return (name, False, f"TIMEOUT ({timeout:.0f}s)", timings)
+            if returncode != 0:
+                stderr.seek(0)
+                return (name, False, stderr.read().strip(), timings)
+        return (name, True, _describe(summary, output_file), timings)
+
+    except Exception as e:
+        return (name, False, str(e), _load_trace(trace_path))
+
+
+def call_fetcher(name, call, output_file, keep_unchanged=False):
+    """Run a fetcher function in this process.
+
+    ``call`` is a ``(module, function, kwargs)`` triple naming the fetch
+    entry point, e.g. ``("fetch_techmeme", "fetch", {"url": ...})``.
+    With keep_unchanged, a result reporting nothing new since the last
+    call (``"reason": "already_seen"``) leaves an existing output file
+    in place. Returns (name, success, path_or_error, timings).
+    """
+    module_name, func_name, kwargs = call
+    with _trace.collect("fetch") as root:
+        try:
+            module = importlib.import_module(module_name)
+            if output_file.endswith(".jsonl"):
+                data = _write_records(module.stream(**kwargs), output_file)
+                result = (name, True, _describe(data, output_file))
+            else:
+                data = getattr(module, func_name)(**kwargs)
+                if (keep_unchanged and data.get("reason") == "already_seen"
+                        and os.path.exists(output_file)):
+                    result = (name, True, f"unchanged → {output_file}")
+                else:
+                    _write_result(data, output_file)
+                    result = (name, True, _describe(data, output_file))
+
+        except Exception as e:
+            result = (name, False, f"{type(e).__name__}: {e}")
+    return result + (root.to_dict(),)
+
+
+async def call_fetcher_async(name, call, output_file, timeout=FETCH_TIMEOUT):
+    """Await a fetcher's ``<function>_async`` coroutine.
+
+    Returns (name, success, path_or_error, timings).
+    """
+    module_name, func_name, kwargs = call
+    with _trace.collect("fetch") as root:
+        try:
+            func = getattr(importlib.import_module(module_name), func_name + "_async")
+            data = await asyncio.wait_for(func(**kwargs), timeout)
+            if output_file.endswith(".jsonl"):
+                list_key = "channels" if "channels" in data else "items"
+                _write_records(result_records(data, list_key), output_file)
+            else:
+                _write_result(data, output_file)
+            result = (name, True, _describe(data, output_file))
+
+        except asyncio.TimeoutError:
+            result = (name, False, f"TIMEOUT ({timeout:.0f}s)")
+        except Exception as e:
+            result = (name, False, f"{type(e).__name__}: {e}")
+    return result + (root.to_dict(),)
+
+
+def _write_result(data, output_file):
+    out = json.dumps(data, indent=2, ensure_ascii=False)
+    write_atomic(output_file, out + "\n")
+
+
+def _write_records(records, output_file):
+    """Write NDJSON records to output_file as they come; return the summary record."""
+    summary = None
+    with open(output_file, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            if record.get("type") == "summary":
+                summary = record
+    return summary
+
+
+def _interests_path(config):
+    """The reader's interests file from sources.json, or None if unset or missing.
+
+    A relative path is resolved against the skill directory.
+    """
+    path = config.get("interests")
+    if not path:
+        return None
+    path = os.path.join(SCRIPT_DIR.parent, path)
+    return path if os.path.exists(path) else None
+
+
+def _load_outputs(outputs, sources):
+    """Read the outputs of the given sources for post-processing.
+
+    outputs is {source: output_file} (.json or .jsonl). Returns
+    {source: (output_file, data, records)}, where records is the list of
+    NDJSON records for a .jsonl file (data then holds its items) and None
+    otherwise. Missing or unreadable files are skipped.
+    """
+    loaded = {}
+    for name, output_file in outputs.items():
+        if name not in sources:
+            continue
+        try:
+            with open(output_file) as f:
+                if output_file.endswith(".jsonl"):
+                    records = [json.loads(line) for line in f if line.strip()]
+                    list_key = "channels" if name == "youtube" else "items"
+                    data = {list_key: [r["item"] for r in records if r.get("type") == "item"]}
+                else:
+                    records = None
+                    data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        loaded[name] = (output_file, data, records)
+    return loaded
+
+
+def _flag_outputs(state_db, outputs):
+    """Flag items served in an earlier edition and record every item served.
+
+    One transaction over all outputs ({source: output_file}) that also
+    prunes old state; files with flagged items are rewritten. Returns
+    {source: number flagged} for sources with any.
+    """
+    loaded = _load_outputs(outputs, ITEM_KEYS)
+    flagged = {}
+    with StateStore.open(state_db).transaction() as tx:
+        for name, (_f, data, _r) in loaded.items():
+            count = flag_seen(tx, name, _relevance.source_items(name, data))
+            if count:
+                flagged[name] = count
+        tx.prune()
+    for name in flagged:
+        _rewrite_output(*loaded[name])
+    return flagged
+
+
+def _rewrite_output(output_file, data, records):
+    """Write post-processed output back as loaded by _load_outputs()."""
+    if records is None:
+        _write_result(data, output_file)
+    else:
+        write_atomic(output_file, "".join(json.dumps(r, ensure_ascii=False) + "\n"
+                                           for r in records))
+
+
+def _score_outputs(interests, outputs):
+    """Add "relevance" to the items of every output file, scored in one pass.
+
+    outputs is {source: output_file}. Files are rewritten atomically.
+    Returns the number of items scored.
+    """
+    if not interests:
+        return 0
+    if not _relevance.available():
+        print("Warning: numpy not installed; items are not scored for relevance",
+              file=sys.stderr)
+        return 0
+    try:
+        profile = _relevance.load_profile(interests)
+    except OSError as e:
+        print(f"Warning: cannot read interests: {e}", file=sys.stderr)
+        return 0
+
+    loaded = _load_outputs(outputs, _relevance.TEXT_FIELDS)
+    scored = _relevance.annotate({name: data for name, (_f, data, _r) in loaded.items()},
+                                 profile)
+    for output in loaded.values():
+        _rewrite_output(*output)
+    return scored
+
+
+def _cluster_outputs(outputs, output_dir):
+    """Write output_dir/clusters.json grouping near-duplicate stories across outputs.
+
+    Returns the manifest entry ({"file", "items", "clusters"}), or None
+    without numpy.
+    """
+    if not _relevance.available():
+        return None
+    loaded = _load_outputs(outputs, _clusters.SOURCES)
+    clusters = _clusters.build({name: data for name, (_f, data, _r) in loaded.items()})
+    path = os.path.join(output_dir, "clusters.json")
+    write_atomic(path, json.dumps(clusters, indent=2, ensure_ascii=False) + "\n")
+    return {"file": path, "items": clusters["items"], "clusters": len(clusters["clusters"])}
+
+
+def _hard_timeout(http):
+    """Seconds before a fetcher is killed: the deadline plus DEADLINE_GRACE."""
+    if http.get("deadline") is None:
+        return FETCH_TIMEOUT
+    return max(http["deadline"] - time.time(), 0) + DEADLINE_GRACE
+
+
+def _run_subprocesses(fetchers, http):
+    """Yield (name, success, detail, timings) for each fetcher run as a subprocess."""
+    env = dict(os.environ, **{HTTP_ENV: json.dumps(http)})
+    timeout = _hard_timeout(http)
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as pool:
+        futures = {}
+        for name, (cmd, out_file, _call) in fetchers.items():
+            run = stream_fetcher if out_file.endswith(".jsonl") else run_fetcher
+            futures[pool.submit(run, name, cmd, out_file, env, timeout)] = name
+
+        for future in as_completed(futures):
+            yield future.result()
 
+
+def _run_in_process(fetchers, http):
+    """Yield (name, success, detail, timings) for each fetcher called in-process.
+
+    All fetchers share one worker pool and one pooled HTTP session. A
+    fetcher that overruns the deadline by DEADLINE_GRACE is reported as
+    timed out. Its thread cannot be killed: the pool is abandoned, and
+    the command line ends with exit_process() so the hung thread does
+    not hold up the exit either.
+    """
+    configure_http(**http)
+    timeout = _hard_timeout(http)
+    pool = thread_pool(len(fetchers), "fetcher")
+    futures = {}
+    for name, (_cmd, out_file, call) in fetchers.items():
+        futures[pool.submit(call_fetcher, name, call, out_file)] = name
+
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            yield future.result()
+    except TimeoutError:
+        for future, name in futures.items():
+            if not future.done():
+                yield (name, False, f"TIMEOUT ({timeout:.0f}s)", None)
+    finally:
+        abandon(pool)
+
+
+def _run_async(fetchers, http):
+    """Yield (name, success, detail, timings) for each fetcher run on the asyncio engine."""
+    configure_http(**http)
+    timeout = _hard_timeout(http)
+
+    async def main():
+        tasks = [call_fetcher_async(name, call, out_file, timeout)
+                 for name, (_cmd, out_file, call) in fetchers.items()]
+        return [await t for t in asyncio.as_completed(tasks)]
+
+    yield from _aio.run(main)
+
+
+RUNNERS = {
+    "subprocess": _run_subprocesses,
+    "in-process": _run_in_process,
+    "async": _run_async,
+}
+
+
+def _source_urls(name, cfg):
+    """All feed URLs (or URL prefixes) a source fetches, for per-source settings."""
+    if name == "youtube":
+        return [YT_FEED_BASE]
+    urls = list(cfg.get("urls", []))
+    for key in ("url", "fallback_url"):
+        if cfg.get(key):
+            urls.append(cfg[key])
+    return urls
+
+
+def _http_settings(config, output_dir):
+    """Build the shared HTTP settings from the "http" block and per-source keys.
+
+    The feed cache lives in output_dir/.http_cache unless "cache_dir" is
+    set; "cache": false turns it off. A source's "cache_ttl" applies to
+    every feed URL that source fetches.
+    """
+    http = dict(config.get("http", {}))
+    if http.pop("cache", True) is False:
+        http["cache_dir"] = None
+    else:
+        http.setdefault("cache_dir", f"{output_dir}/.http_cache")
+
+    overrides = dict(http.get("cache_ttl_overrides", {}))
+    for name, cfg in config.get("sources", {}).items():
+        if cfg.get("enabled") and "cache_ttl" in cfg:
+            for url in _source_urls(name, cfg):
+                overrides[url] = cfg["cache_ttl"]
+    http["cache_ttl_overrides"] = overrides
+    return http
+
+
+def write_chrome_trace(results, path):
+    """Export every source's timing spans as Chrome trace-event JSON."""
+    events = []
+    for pid, (name, result) in enumerate(sorted(results.items()), start=1):
+        events.append({"name": "process_name", "ph": "M", "pid": pid,
+                       "args": {"name": name}})
+        if result.get("timings"):
+            events.extend(_trace.to_chrome_events(result["timings"], pid=pid))
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def build_fetchers(config, config_path, output_dir):
+    """Return {name: (cmd, output_file, call)} for every enabled source."""
     sources = config.get("sources", {})
     py = sys.executable
     sd = str(SCRIPT_DIR)
+    state = f"{output_dir}/{STATE_DB}"
 
-    # Build fetcher commands for enabled sources
     fetchers = {}
 
     if sources.get("techmeme", {}).get("enabled"):
         url = sources["techmeme"].get("url", "https://www.techmeme.com/")
         fetchers["techmeme"] = (
             [py, f"{sd}/fetch_techmeme.py", "--url", url],
-            f"{output_dir}/techmeme.json"
+            f"{output_dir}/techmeme.json",
+            ("fetch_techmeme", "fetch", {"url": url})
         )
 
     if sources.get("producthunt", {}).get("enabled"):
         url = sources["producthunt"].get("url", "https://www.producthunt.com/feed?category=undefined")
-        count = str(sources["producthunt"].get("count", 5))
+        count = int(sources["producthunt"].get("count", 5))
         fetchers["producthunt"] = (
-            [py, f"{sd}/fetch_producthunt.py", "--url", url, "--count", count],
-            f"{output_dir}/producthunt.json"
+            [py, f"{sd}/fetch_producthunt.py", "--url", url, "--count", str(count)],
+            f"{output_dir}/producthunt.json",
+            ("fetch_producthunt", "fetch", {"url": url, "count": count})
         )
 
     if sources.get("hackernews", {}).get("enabled"):
         url = sources["hackernews"].get("url", "https://news.ycombinator.com/rss")
-        count = str(sources["hackernews"].get("count", 10))
-        cmd = [py, f"{sd}/fetch_hackernews.py", "--url", url, "--count", count]
-        if not sources["hackernews"].get("follow_links", True):
+        count = int(sources["hackernews"].get("count", 10))
+        follow = sources["hackernews"].get("follow_links", True)
+        article_cache = f"{output_dir}/.hn_article_cache.json"
+        cmd = [py, f"{sd}/fetch_hackernews.py", "--url", url, "--count", str(count),
+               "--article-cache", article_cache]
+        kwargs = {"url": url, "count": count, "follow_links": follow,
+                  "article_cache": article_cache}
+        if not follow:
             cmd.append("--no-follow")
-        fetchers["hackernews"] = (cmd, f"{output_dir}/hackernews.json")
+        for key in ("max_bytes", "download_workers", "parse_workers"):
+            if key in sources["hackernews"]:
+                kwargs[key] = int(sources["hackernews"][key])
+                cmd += ["--" + key.replace("_", "-"), str(kwargs[key])]
+        interests = _interests_path(config)
+        if sources["hackernews"].get("prefilter") and interests:
+            kwargs["interests"] = interests
+            cmd += ["--interests", interests]
+        if sources["hackernews"].get("skip_seen"):
+            kwargs.update(state_file=state, skip_seen=True)
+            cmd += ["--state-file", state, "--skip-seen"]
+        fetchers["hackernews"] = (
+            cmd, f"{output_dir}/hackernews.json",
+            ("fetch_hackernews", "fetch", kwargs)
+        )
 
     if sources.get("arxiv", {}).get("enabled"):
         arxiv_cfg = sources["arxiv"]
@@ -114,64 +593,146 @@ def fetch_all(config_path, output_dir):
         c = arxiv_cfg.get("count")
         if c:
             cmd += ["--count", str(c)]
-        fetchers["arxiv"] = (cmd, f"{output_dir}/arxiv.json")
+        cmd += ["--state-file", state]
+        fetchers["arxiv"] = (
+            cmd, f"{output_dir}/arxiv.json",
+            ("fetch_arxiv", "fetch",
+             {"urls": urls or None, "count": c or None, "state_file": state})
+        )
 
     if sources.get("github_trending", {}).get("enabled"):
         rss = sources["github_trending"].get("url", "https://githubawesome.com/rss/")
         fb = sources["github_trending"].get("fallback_url", "https://rsshub.app/github/trending/daily")
-        per_day = str(sources["github_trending"].get("per_day", 10))
-        state = f"{output_dir}/.github_trending_state.json"
+        per_day = int(sources["github_trending"].get("per_day", 10))
+        kwargs = {"rss_url": rss, "fallback_url": fb, "state_file": state, "per_day": per_day}
+        cmd = [py, f"{sd}/fetch_github_trending.py", "--rss-url", rss, "--fallback-url", fb,
+               "--state-file", state, "--per-day", str(per_day)]
+        api_url = sources["github_trending"].get("api_url")
+        if api_url:
+            ttl = int(sources["github_trending"].get("metadata_ttl", 7 * 86400))
+            kwargs.update(api_url=api_url, metadata_ttl=ttl)
+            cmd += ["--api-url", api_url, "--metadata-ttl", str(ttl)]
         fetchers["github_trending"] = (
-            [py, f"{sd}/fetch_github_trending.py", "--rss-url", rss, "--fallback-url", fb,
-             "--state-file", state, "--per-day", per_day],
-            f"{output_dir}/github_trending.json"
+            cmd,
+            f"{output_dir}/github_trending.json",
+            ("fetch_github_trending", "fetch", kwargs)
         )
 
     if sources.get("youtube", {}).get("enabled"):
+        channels = sources["youtube"].get("channels", [])
+        max_age = int(sources["youtube"].get("max_age_hours", 24))
         fetchers["youtube"] = (
-            [py, f"{sd}/fetch_youtube.py", "channels", "--config", config_path],
-            f"{output_dir}/youtube.json"
+            [py, f"{sd}/fetch_youtube.py", "channels", "--config", config_path,
+             "--max-age", str(max_age)],
+            f"{output_dir}/youtube.json",
+            ("fetch_youtube", "check_channels",
+             {"channels": channels, "max_age_hours": max_age})
         )
 
     if sources.get("xkcd", {}).get("enabled"):
         url = sources["xkcd"].get("url", "https://www.xkcd.com/atom.xml")
-        state = f"{output_dir}/.xkcd_state.json"
         assets = str(SCRIPT_DIR.parent / "assets")
         fetchers["xkcd"] = (
             [py, f"{sd}/fetch_xkcd.py", "--url", url,
              "--output-dir", output_dir, "--assets-dir", assets,
              "--state-file", state],
-            f"{output_dir}/xkcd.json"
+            f"{output_dir}/xkcd.json",
+            ("fetch_xkcd", "fetch",
+             {"feed_url": url, "output_dir": output_dir, "assets_dir": assets,
+              "state_file": state})
         )
 
-    # Run all fetchers in parallel
-    results = {}
-    print(f"Fetching {len(fetchers)} sources...", file=sys.stderr)
+    return fetchers
 
-    with ThreadPoolExecutor(max_workers=len(fetchers)) as pool:
-        futures = {}
-        for name, (cmd, out_file) in fetchers.items():
-            futures[pool.submit(run_fetcher, name, cmd, out_file)] = name
 
-        for future in as_completed(futures):
-            name, success, detail = future.result()
-            status = "ok" if success else "FAILED"
-            print(f"  [{status}] {name}: {detail}", file=sys.stderr)
-            results[name] = {"success": success, "detail": detail}
+def fetch_all(config_path, output_dir, mode="subprocess", trace_path=None,
+              record_dir=None, replay_dir=None, stream=False, deadline=None):
+    """Run every enabled fetcher once and write the manifest.
+
+    deadline is the run's budget in seconds (default: FETCH_TIMEOUT minus
+    DEADLINE_GRACE); fetchers return partial results when it runs out.
+    """
+    config_path = os.path.abspath(config_path)
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    http = _http_settings(config, output_dir)
+    if record_dir:
+        http["record_dir"] = os.path.abspath(record_dir)
+        os.makedirs(http["record_dir"], exist_ok=True)
+    if replay_dir:
+        http["replay_dir"] = os.path.abspath(replay_dir)
+    if deadline is None:
+        deadline = FETCH_TIMEOUT - DEADLINE_GRACE
+    http["deadline"] = time.time() + deadline
+    fetchers = build_fetchers(config, config_path, output_dir)
+
+    if stream:
+        # Same fetchers in NDJSON mode, writing <name>.jsonl
+        fetchers = {name: (cmd + ["--ndjson"], out_file[:-len(".json")] + ".jsonl", call)
+                    for name, (cmd, out_file, call) in fetchers.items()}
+
+    # Run all fetchers in parallel
+    results = {}
+    breakers = Breakers(f"{output_dir}/.health.json", **config.get("breaker", {}))
+    for name in list(fetchers):
+        if not breakers.allow(name):
+            del fetchers[name]
+            results[name] = {"success": False, "skipped": True,
+                             "detail": "skipped: circuit open"}
+            print(f"  [skipped] {name}: circuit open", file=sys.stderr)
+
+    print(f"Fetching {len(fetchers)} sources ({mode})...", file=sys.stderr)
+
+    runner = RUNNERS[mode]
+    for name, success, detail, timings in (runner(fetchers, http) if fetchers else []):
+        status = "ok" if success else "FAILED"
+        print(f"  [{status}] {name}: {detail}", file=sys.stderr)
+        breakers.record(name, success, None if success else detail)
+        results[name] = {"success": success, "detail": detail}
+        if success:
+            results[name].update(_partial_info(fetchers[name][1]))
+        if timings:
+            results[name]["timings"] = timings
+
+    for name in results:
+        results[name]["breaker"] = breakers.report(name)
+    breakers.save()
+
+    outputs = {name: fetchers[name][1] for name, r in results.items() if r["success"]}
+    for name, count in _flag_outputs(f"{output_dir}/{STATE_DB}", outputs).items():
+        results[name]["previously_seen"] = count
+    interests = _interests_path(config)
+    scored = _score_outputs(interests, outputs)
+    clusters = _cluster_outputs(outputs, output_dir)
 
     # Write manifest
     manifest = {
         "fetched_at": datetime.now(timezone.utc).isoformat(),
         "config": config_path,
         "output_dir": output_dir,
+        "mode": mode,
+        "stream": stream,
+        "record_dir": http.get("record_dir"),
+        "replay_dir": http.get("replay_dir"),
+        "deadline": _iso(http["deadline"]),
+        "partial": any(r.get("partial") for r in results.values()),
+        "relevance": {"interests": interests, "scored": scored} if scored else None,
+        "clusters": clusters,
         "results": results
     }
     manifest_path = f"{output_dir}/manifest.json"
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+    write_atomic(manifest_path, json.dumps(manifest, indent=2))
 
     print(f"\nManifest: {manifest_path}", file=sys.stderr)
 
+    if trace_path:
+        write_chrome_trace(results, trace_path)
+        print(f"Trace: {trace_path}", file=sys.stderr)
+
     successes = sum(1 for r in results.values() if r["success"])
     failures = len(results) - successes
     print(f"Done: {successes} succeeded, {failures} failed", file=sys.stderr)
@@ -179,12 +740,145 @@ def fetch_all(config_path, output_dir):
     return manifest
 
 
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def run_daemon(config_path, output_dir):
+    """Keep output_dir current, refreshing each source on its own interval.
+
+    Every source gets its own thread calling its fetcher in-process, so a
+    slow source never holds up the others. manifest.json is rewritten
+    after each refresh with when the source was refreshed and when it is
+    next due. At startup a source whose output file is younger than its
+    interval waits out the remainder. A source whose circuit breaker is
+    open waits for its cooldown. Runs until SIGINT or SIGTERM.
+    """
+    config_path = os.path.abspath(config_path)
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    sources = config.get("sources", {})
+    interests = _interests_path(config)
+    configure_http(**_http_settings(config, output_dir))
+    fetchers = build_fetchers(config, config_path, output_dir)
+    manifest_path = f"{output_dir}/manifest.json"
+    breakers = Breakers(f"{output_dir}/.health.json", **config.get("breaker", {}))
+
+    # Carry over the last known state of each source from a previous run
+    results = {}
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f).get("results", {})
+        results = {name: r for name, r in previous.items() if name in fetchers}
+    except (OSError, ValueError):
+        pass
+
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def refresh_loop(name, call, output_file):
+        interval = float(sources[name].get("refresh_interval",
+                                           REFRESH_INTERVALS.get(name, 3600)))
+        delay = 0
+        if os.path.exists(output_file):
+            delay = max(0, os.path.getmtime(output_file) + interval - time.time())
+
+        while not stop.wait(delay):
+            if breakers.allow(name):
+                _name, success, detail, timings = call_fetcher(name, call, output_file,
+                                                               keep_unchanged=True)
+                if success and not detail.startswith("unchanged"):
+                    _flag_outputs(f"{output_dir}/{STATE_DB}", {name: output_file})
+                    _score_outputs(interests, {name: output_file})
+                    with lock:
+                        _cluster_outputs({n: f for n, (_c, f, _call) in fetchers.items()},
+                                         output_dir)
+                breakers.record(name, success, None if success else detail)
+                status = "ok" if success else "FAILED"
+            else:
+                success, detail, timings = False, "skipped: circuit open", None
+                status = "skipped"
+            delay = interval if success else min(interval, RETRY_INTERVAL)
+            delay = max(delay, breakers.retry_in(name))
+            now = time.time()
+            print(f"  [{status}] {name}: {detail}", file=sys.stderr)
+
+            with lock:
+                results[name] = {"success": success, "detail": detail,
+                                 "refreshed_at": _iso(now),
+                                 "next_refresh_at": _iso(now + delay),
+                                 "refresh_interval": interval,
+                                 "breaker": breakers.report(name)}
+                if timings:
+                    results[name]["timings"] = timings
+                breakers.save()
+                manifest = {
+                    "fetched_at": _iso(now),
+                    "config": config_path,
+                    "output_dir": output_dir,
+                    "mode": "daemon",
+                    "results": dict(sorted(results.items())),
+                }
+                write_atomic(manifest_path, json.dumps(manifest, indent=2))
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    threads = [threading.Thread(target=refresh_loop, args=(name, call, out_file),
+                                name=f"refresh-{name}", daemon=True)
+               for name, (_cmd, out_file, call) in fetchers.items()]
+    print(f"Refreshing {len(threads)} sources into {output_dir} (Ctrl-C to stop)",
+          file=sys.stderr)
+    for t in threads:
+        t.start()
+
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        stop.set()
+    print("Stopping; in-flight refreshes are abandoned", file=sys.stderr)
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Run all configured fetchers")
     parser.add_argument("--config", required=True, help="Path to sources.json")
     parser.add_argument("--output-dir", required=True, help="Output directory for fetched data")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--in-process", dest="mode", action="store_const", const="in-process",
+                      help="Call fetchers in this process instead of one subprocess each")
+    mode.add_argument("--async", dest="mode", action="store_const", const="async",
+                      help="Run every source on one asyncio loop with a global request cap")
+    parser.set_defaults(mode="subprocess")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Also write timing spans as Chrome trace-event JSON")
+    snapshots = parser.add_mutually_exclusive_group()
+    snapshots.add_argument("--record", metavar="DIR",
+                           help="Save every raw HTTP response to DIR")
+    snapshots.add_argument("--replay", metavar="DIR",
+                           help="Serve every HTTP request from DIR; no network access")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write <source>.jsonl records as items arrive instead of <source>.json")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="Run-wide time budget; late work is dropped and results "
+                             f"marked partial (default: {FETCH_TIMEOUT - DEADLINE_GRACE})")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running, refreshing each source on its refresh_interval")
     args = parser.parse_args()
 
-    manifest = fetch_all(args.config, args.output_dir)
+    if args.daemon:
+        if (args.mode == "async" or args.stream or args.trace or args.record or args.replay
+                or args.deadline is not None):
+            parser.error("--daemon runs sources in-process and cannot be combined "
+                         "with other run options")
+        run_daemon(args.config, args.output_dir)
+        exit_process(0)
+
+    manifest = fetch_all(args.config, args.output_dir, mode=args.mode, trace_path=args.trace,
+                         record_dir=args.record, replay_dir=args.replay, stream=args.stream,
+                         deadline=args.deadline)
     print(json.dumps(manifest, indent=2))
+    exit_process(0)
@@ -2,20 +2,32 @@
 """Fetch latest AI/ML/NLP papers from arXiv RSS feeds.
 
 Supports fetching from multiple arXiv subcategory feeds (e.g. cs.AI, cs.CL,
-cs.LG) and merging results with deduplication.
+cs.LG) concurrently and merging results in feed order, with one item per
+arXiv ID (cross-listed papers get the categories of every listing).
 
 Outputs ALL recent papers with title + full abstract so the LLM agent
 can pick the most relevant ones based on user interests.
 
-Output: JSON array of {title, abstract, link, authors, categories}.
+With --state-file, a run within the same announcement cycle as the last
+one returns the stored result ("cached": true) without fetching, and
+papers already published in an earlier edition (replacements,
+cross-lists) are flagged "previously_seen" with their "first_seen" date.
+
+Output: JSON array of {title, abstract, link, arxiv_id, authors, categories}.
 """
 
+import hashlib
 import json
 import re
 import sys
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-from _util import parse_feed
+import _aio
+from _state import StateStore
+from _trace import submit
+from _util import (parse_feed, until_deadline, deadline_passed, item_record, result_records,
+                   summary_record, write_records, abandon, exit_process, thread_pool)
 
 # Default feeds: AI, Computation & Language (NLP), Machine Learning
 DEFAULT_URLS = [
@@ -24,6 +36,16 @@ DEFAULT_URLS = [
     "https://rss.arxiv.org/rss/cs.LG",
 ]
 
+# Feeds fetched at once; more categories than this barely add wall time,
+# since each feed is a single request
+FEED_WORKERS = 8
+
+# Feeds are rebuilt at midnight US Eastern, Monday to Friday (see last_update())
+ANNOUNCE_TZ = "America/New_York"
+FEED_UPDATE_WEEKDAYS = {0, 1, 2, 3, 4}
+# New-style (2410.12345) or old-style (cs/0112017, math.GT/0309136) IDs
+_ARXIV_ID = re.compile(r"(\d{4}\.\d{4,5}|[a-z][a-z.\-]*/\d{7})(?:v\d+)?", re.I)
+
 
 def clean_text(text):
     """Strip HTML tags, arXiv boilerplate, and normalize whitespace."""
@@ -34,72 +56,364 @@ def clean_text(text):
     return text.strip()
 
 
-def fetch(urls=None, count=None):
+def _normalize_urls(urls):
     if urls is None:
         urls = DEFAULT_URLS
 
     # Normalize: accept a single URL string or a list
     if isinstance(urls, str):
         urls = [urls]
+    return urls
+
+
+def fetch(urls=None, count=None, state_file=None):
+    """Fetch every feed concurrently and merge them in the order of urls.
+
+    With a state_file, a run in the same announcement cycle as the last
+    one returns the stored result without touching the network (see
+    _cached()), and papers from earlier editions are flagged.
+    """
+    urls = _normalize_urls(urls)
+    state = _load_state(state_file)
+    cached = _cached(state, urls, count)
+    if cached:
+        return cached
+
+    pool = thread_pool(min(FEED_WORKERS, len(urls)) or 1, "arxiv")
+    futures = {submit(pool, parse_feed, url): i for i, url in enumerate(urls)}
+    results = [_aio.DROPPED] * len(urls)
+    for future in until_deadline(futures):
+        results[futures[future]] = future.exception() or future.result()
+    abandon(pool)
+
+    fetched, dropped = _collect(urls, results)
+    return _finish(urls, fetched, count, dropped, state, state_file)
+
+
+async def fetch_async(urls=None, count=None, state_file=None):
+    urls = _normalize_urls(urls)
+    state = _load_state(state_file)
+    cached = _cached(state, urls, count)
+    if cached:
+        return cached
 
-    seen_links = set()
+    results = await _aio.until_deadline([_aio.parse_feed(u) for u in urls])
+    fetched, dropped = _collect(urls, results)
+    return _finish(urls, fetched, count, dropped, state, state_file)
+
+
+def stream(urls=None, count=None, state_file=None):
+    """Yield NDJSON records, emitting each feed's new papers once it is parsed.
+
+    Feeds are fetched concurrently but emitted in order: a feed's papers
+    come out as soon as it and every feed before it are done, so items
+    have the same order, dedupe and count limit as fetch(). A paper's
+    categories are those of its first listing; fetch() also merges in
+    the categories of later cross-listings.
+    """
+    urls = _normalize_urls(urls)
+    state = _load_state(state_file)
+    cached = _cached(state, urls, count)
+    if cached:
+        yield from result_records(cached)
+        return
+
+    seen = set()
     items = []
+    fetched = []
+    dropped = []
+
+    pool = thread_pool(min(FEED_WORKERS, len(urls)) or 1, "arxiv")
+    futures = {submit(pool, parse_feed, url): i for i, url in enumerate(urls)}
+    done = {}
+    next_feed = 0
+
+    def emit(i):
+        ok, failed = _collect([urls[i]], [done[i]])
+        fetched.extend(ok)
+        dropped.extend(failed)
+        for _url, feed in ok:
+            announced = _announced(feed)
+            first_seen = _first_seen(state_file, [arxiv_id(entry) for entry in feed.entries])
+            for entry in feed.entries:
+                if count and len(items) >= count:
+                    return
+                key = arxiv_id(entry)
+                if key not in seen:
+                    seen.add(key)
+                    items.append(_flag(_item(entry), announced, first_seen))
+                    yield item_record("arxiv", len(items) - 1, items[-1])
+
+    for future in until_deadline(futures):
+        done[futures[future]] = future.exception() or future.result()
+        while next_feed in done:
+            yield from emit(next_feed)
+            next_feed += 1
+    abandon(pool)
+
+    # Feeds after one abandoned at the deadline
+    for i in range(next_feed, len(urls)):
+        if i in done:
+            yield from emit(i)
+        else:
+            dropped.append(urls[i])
+
+    result = _result(urls, items, dropped)
+    if state_file:
+        # The stored result is served by fetch() for the rest of the cycle,
+        # so it gets the categories of every cross-listing like fetch()'s
+        merged = _merge(urls, [feed for _url, feed in fetched], count, dropped)
+        _remember(state, state_file, urls, count, fetched,
+                  _flag_all(merged, fetched, state_file))
+    yield summary_record(result)
 
-    for url in urls:
-        try:
-            feed = parse_feed(url)
-        except Exception as e:
-            print(f"Warning: failed to fetch {url}: {e}", file=sys.stderr)
-            continue
 
+def _collect(urls, results):
+    """Split per-URL results into ([(url, parsed feed)] in order, URLs dropped at the deadline).
+
+    A result is a parsed feed, the exception its fetch raised, or
+    _aio.DROPPED. Failures before the deadline are warned about and skipped.
+    """
+    fetched = []
+    dropped = []
+    for url, result in zip(urls, results):
+        if result is _aio.DROPPED or (isinstance(result, Exception) and deadline_passed()):
+            dropped.append(url)
+        elif isinstance(result, Exception):
+            print(f"Warning: failed to fetch {url}: {result}", file=sys.stderr)
+        else:
+            fetched.append((url, result))
+    return fetched, dropped
+
+
+def _finish(urls, fetched, count, dropped, state, state_file):
+    """Merge fetched feeds into the result, or reuse the stored one if nothing changed."""
+    if state_file and not dropped and _unchanged(state, urls, count, fetched):
+        _remember(state, state_file, urls, count, fetched, state["result"])
+        return dict(state["result"], cached=True)
+
+    result = _merge(urls, [feed for _url, feed in fetched], count, dropped)
+    if state_file:
+        _flag_all(result, fetched, state_file)
+        _remember(state, state_file, urls, count, fetched, result)
+    return result
+
+
+def _flag_all(result, fetched, state_file):
+    """_flag() every item of a merged result."""
+    announced = {}
+    for _url, feed in fetched:
+        date = _announced(feed)
         for entry in feed.entries:
-            link = entry.get("link", "")
-
-            # Deduplicate papers that appear in multiple subcategory feeds
-            if link in seen_links:
-                continue
-            seen_links.add(link)
-
-            title = clean_text(entry.get("title", ""))
-
-            # arXiv RSS puts abstract in description/summary — keep full text
-            abstract = clean_text(
-                entry.get("summary", entry.get("description", ""))
-            )
-
-            # Extract authors
-            authors = ""
-            if "author" in entry:
-                authors = entry["author"]
-            elif "authors" in entry:
-                authors = ", ".join(a.get("name", "") for a in entry["authors"])
-
-            # Extract arXiv categories from tags
-            categories = []
-            for tag in entry.get("tags", []):
-                term = tag.get("term", "")
-                if term:
-                    categories.append(term)
-
-            items.append({
-                "title": title,
-                "abstract": abstract,
-                "link": link,
-                "authors": authors,
-                "categories": categories,
-            })
+            announced.setdefault(arxiv_id(entry), date)
+    first_seen = _first_seen(state_file, [item["arxiv_id"] for item in result["items"]])
+    for item in result["items"]:
+        _flag(item, announced[item["arxiv_id"]], first_seen)
+    return result
+
+
+def _merge(urls, feeds, count, dropped=()):
+    """Merge parsed feeds in order, one item per arXiv ID.
+
+    A paper cross-listed in several feeds keeps its first position and
+    gains the categories of every listing. dropped lists feed URLs
+    abandoned at the run deadline.
+    """
+    by_id = {}
+    items = []
+
+    for feed in feeds:
+        for entry in feed.entries:
+            key = arxiv_id(entry)
+            item = by_id.get(key)
+            if item is None:
+                item = by_id[key] = _item(entry)
+                items.append(item)
+            else:
+                item["categories"] += [c for c in _categories(entry)
+                                       if c not in item["categories"]]
 
     # Apply count limit after merging all feeds
     if count:
         items = items[:count]
 
-    return {
+    return _result(urls, items, dropped)
+
+
+def _result(urls, items, dropped=()):
+    result = {
         "source": "arxiv",
         "fetched_at": datetime.now(timezone.utc).isoformat(),
         "feed_urls": urls,
         "count": len(items),
         "items": items,
     }
+    if dropped:
+        result["partial"] = True
+        result["dropped"] = list(dropped)
+    return result
+
+
+# --- Announcement cycles -----------------------------------------------------
+#
+# arXiv announces new papers Sunday to Thursday evenings (US Eastern) and
+# rss.arxiv.org rebuilds every feed at the following midnight, so feeds
+# change at most once per weekday and never at weekends or on holidays.
+# The state database (_state.py) keeps the last cycle under ("arxiv",
+# "cycle"): per feed URL, the date the feed was built and a digest of its
+# entry IDs, plus the last complete result:
+#
+#     {"feeds": {"<url>": {"announced": "2026-10-16", "ids": "<sha1>",
+#                          "checked_at": "..."}},
+#      "count": null, "result": {...}}
+#
+# and every paper served as a seen row whose data is the announcement
+# date it first appeared in.
+
+
+def _eastern():
+    try:
+        return ZoneInfo(ANNOUNCE_TZ)
+    except Exception:  # no tz database: EST all year is close enough
+        return timezone(timedelta(hours=-5))
+
+
+def last_update(now=None):
+    """Date (US Eastern) of the latest scheduled feed rebuild at or before now."""
+    day = (now or datetime.now(timezone.utc)).astimezone(_eastern()).date()
+    while day.weekday() not in FEED_UPDATE_WEEKDAYS:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def _announced(feed):
+    """The feed's build date (US Eastern, ISO) from pubDate/lastBuildDate, or None."""
+    parsed = feed.feed.get("published_parsed") or feed.feed.get("updated_parsed")
+    if not parsed:
+        return None
+    built = datetime(*parsed[:6], tzinfo=timezone.utc)
+    return built.astimezone(_eastern()).date().isoformat()
+
+
+def _digest(feed):
+    ids = sorted(arxiv_id(entry) for entry in feed.entries)
+    return hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+
+
+def _same_request(state, urls, count):
+    result = state.get("result")
+    return bool(result) and result.get("feed_urls") == urls and state.get("count") == count
+
+
+def _cached(state, urls, count, now=None):
+    """The stored result if every feed was already seen for the latest rebuild.
+
+    Nothing has been announced since, so there is nothing to download.
+    """
+    if not _same_request(state, urls, count):
+        return None
+    due = last_update(now)
+    feeds = state.get("feeds", {})
+    if all((feeds.get(url, {}).get("announced") or "") >= due for url in urls):
+        return dict(state["result"], cached=True)
+    return None
+
+
+def _unchanged(state, urls, count, fetched):
+    """True if every fetched feed has the same entry IDs as when last stored."""
+    if not _same_request(state, urls, count) or len(fetched) != len(urls):
+        return False
+    feeds = state.get("feeds", {})
+    return all(feeds.get(url, {}).get("ids") == _digest(feed) for url, feed in fetched)
+
+
+def _first_seen(state_file, ids):
+    """{arXiv ID: announcement date it was first served in} for ids served before."""
+    if not state_file:
+        return {}
+    known = StateStore.open(state_file).seen("arxiv", ids)
+    return {key: row["data"] for key, row in known.items() if row["data"]}
+
+
+def _flag(item, announced, first_seen):
+    """Mark an item first published in an earlier edition than this feed's."""
+    first = first_seen.get(item["arxiv_id"])
+    if first and announced and first < announced:
+        item["previously_seen"] = True
+        item["first_seen"] = first
+    return item
+
+
+def _remember(state, state_file, urls, count, fetched, result):
+    """Record the fetched feeds, their papers and, if complete, the result."""
+    if not state_file or result.get("partial"):
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    feeds = state.setdefault("feeds", {})
+    today = datetime.now(_eastern()).date().isoformat()
+    announced = {}
+    for url, feed in fetched:
+        date = _announced(feed)
+        feeds[url] = {"announced": date, "ids": _digest(feed), "checked_at": now}
+        for entry in feed.entries:
+            announced.setdefault(arxiv_id(entry), date or today)
+
+    state["count"] = count
+    state["result"] = {k: v for k, v in result.items() if k != "cached"}
+    with StateStore.open(state_file).transaction() as tx:
+        tx.put("arxiv", "cycle", state)
+        tx.mark_seen("arxiv", announced)
+
+
+def _load_state(state_file):
+    """The last announcement cycle: {"feeds", "count", "result"}."""
+    if not state_file:
+        return {}
+    return StateStore.open(state_file).get("arxiv", "cycle", {})
+
+
+def arxiv_id(entry):
+    """Version-less arXiv identifier of a feed entry ("2410.12345", "cs/0112017").
+
+    Taken from the entry id ("oai:arXiv.org:2410.12345v2") or its link
+    (/abs/ or /pdf/, http or https), so differing link formats still
+    match. Falls back to the raw link.
+    """
+    for value in (entry.get("id", ""), entry.get("link", "")):
+        match = _ARXIV_ID.search(value)
+        if match:
+            return match.group(1).lower()
+    return entry.get("link", "")
+
+
+def _categories(entry):
+    """arXiv categories from an entry's tags."""
+    return [tag.get("term", "") for tag in entry.get("tags", []) if tag.get("term", "")]
+
+
+def _item(entry):
+    title = clean_text(entry.get("title", ""))
+
+    # arXiv RSS puts abstract in description/summary — keep full text
+    abstract = clean_text(
+        entry.get("summary", entry.get("description", ""))
+    )
+
+    # Extract authors
+    authors = ""
+    if "author" in entry:
+        authors = entry["author"]
+    elif "authors" in entry:
+        authors = ", ".join(a.get("name", "") for a in entry["authors"])
+
+    return {
+        "title": title,
+        "abstract": abstract,
+        "link": entry.get("link", ""),
+        "arxiv_id": arxiv_id(entry),
+        "authors": authors,
+        "categories": _categories(entry),
+    }
 
 
 if __name__ == "__main__":
@@ -121,11 +435,24 @@ if __name__ == "__main__":
         default=None,
         help="Max papers after merging (default: all, agent filters by interest)",
     )
+    parser.add_argument("--state-file",
+                        help="State database (skips refetching within a cycle, flags repeats)")
     parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Stream one JSON record per paper as each feed is parsed")
     args = parser.parse_args()
 
     try:
-        result = fetch(urls=args.urls, count=args.count)
+        if args.ndjson:
+            records = stream(urls=args.urls, count=args.count, state_file=args.state_file)
+            if args.output:
+                with open(args.output, "w") as f:
+                    write_records(records, f)
+            else:
+                write_records(records, sys.stdout)
+            exit_process(0)
+
+        result = fetch(urls=args.urls, count=args.count, state_file=args.state_file)
         out = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
             with open(args.output, "w") as f:
@@ -134,4 +461,5 @@ if __name__ == "__main__":
             print(out)
     except Exception as e:
         print(json.dumps({"source": "arxiv", "error": str(e)}), file=sys.stderr)
-        sys.exit(1)
+        exit_process(1)
+    exit_process(0)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Batch mode: fetch once for many readers, write one output directory each.
+
+Usage:
+    python fetch_batch.py --output-root ./today/ alice=readers/alice.json bob=readers/bob.json
+
+Each argument is a reader's sources.json, optionally prefixed with NAME=
+(the default name is the file's stem). Every reader's enabled sources
+become fetch jobs, which are merged before anything is fetched:
+
+  * identical jobs (same fetcher, URLs and options) run once and their
+    result is copied to every reader that asked for it;
+  * YouTube channel lists are merged into one job over the union of all
+    channels; each reader then gets only its own channels and max age;
+  * stateful sources (github_trending staggering, xkcd last-seen, arXiv
+    announcement cycles, hackernews with skip_seen) keep one job per
+    reader, since their output depends on the reader's state database,
+    but every request goes through one in-process HTTP layer with
+    "memoize" on, so each URL is still downloaded and parsed only once.
+    That includes HN article pages, so HN jobs that differ only in count
+    or state share their downloads.
+
+Output:
+    today/<reader>/<source>.json     same files fetch_all.py writes
+    today/<reader>/clusters.json     near-duplicate stories across that reader's sources
+    today/<reader>/.state.db         what that reader has been served
+    today/<reader>/manifest.json     results, relevance and clusters, as fetch_all.py writes
+    today/batch_manifest.json        jobs, which readers share each, timings
+    today/.hn_article_cache.json     article cache shared by every reader
+
+Each reader's items are scored against that reader's "interests" file,
+and each reader keeps its own circuit breakers (today/<reader>/.health.json,
+using that reader's "breaker" block): a job runs for the readers whose
+breaker for that source is not open, and its outcome is recorded for each.
+
+All jobs share one HTTP layer, so the readers' "http" blocks (and
+per-source cache_ttl) are merged: a setting given by only some readers
+applies to everyone, and two readers giving the same setting different
+values is an error.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+import fetch_youtube  # noqa: E402
+from _health import Breakers  # noqa: E402
+from _util import exit_process, write_atomic  # noqa: E402
+from fetch_all import (  # noqa: E402
+    DEADLINE_GRACE, FETCH_TIMEOUT, STATE_DB, build_fetchers, _cluster_outputs, _describe,
+    _flag_outputs, _http_settings, _interests_path, _iso, _partial_info, _run_in_process,
+    _score_outputs, _write_result,
+)
+
+
+def _reader_name(arg):
+    """Split a NAME=CONFIG argument; NAME defaults to the config file's stem."""
+    name, sep, path = arg.partition("=")
+    if not sep:
+        return Path(arg).stem, arg
+    return name, path
+
+
+def _merge_http(readers, output_root):
+    """One set of HTTP settings for the whole batch.
+
+    Raises ValueError if two readers set the same setting (or the same
+    entry of a dict setting such as rate_limits) to different values.
+    """
+    merged = {}
+    owner = {}
+    for reader, (_path, config) in readers.items():
+        for key, value in _http_settings(config, output_root).items():
+            if isinstance(value, dict):
+                merged.setdefault(key, {})
+                entries = value.items()
+            else:
+                entries = [(None, value)]
+            for sub, v in entries:
+                where = key if sub is None else f"{key}[{sub!r}]"
+                if where in owner:
+                    current = merged[key] if sub is None else merged[key][sub]
+                    if current != v:
+                        raise ValueError(f"Readers {owner[where]!r} and {reader!r} "
+                                         f"disagree on http setting {where}")
+                    continue
+                owner[where] = reader
+                if sub is None:
+                    merged[key] = v
+                else:
+                    merged[key][sub] = v
+    return merged
+
+
+def plan(readers, output_root, allow=None):
+    """Merge every reader's fetchers into a deduplicated set of jobs.
+
+    readers is {reader: (config_path, config)}. Returns {job_id: job},
+    where job is {"source", "call", "output_file", "targets"} and each
+    target is {"reader", "output_file", "kwargs"} for one reader's copy.
+    Sources for which allow(reader, source) is false are left out.
+    """
+    jobs = {}
+    by_key = {}
+    per_source = Counter()
+
+    for reader, (config_path, config) in readers.items():
+        out_dir = os.path.join(output_root, reader)
+        for name, (_cmd, out_file, call) in build_fetchers(config, config_path, out_dir).items():
+            if allow is not None and not allow(reader, name):
+                continue
+            module, func, kwargs = call
+            target = {"reader": reader, "output_file": out_file, "kwargs": kwargs}
+
+            if name == "youtube":
+                job = jobs.get("youtube")
+                if job is None:
+                    job = jobs["youtube"] = {
+                        "source": name,
+                        "call": (module, func, {"channels": [], "max_age_hours": 0}),
+                        "output_file": os.path.join(output_root, ".batch", "youtube.json"),
+                        "targets": [],
+                    }
+                merged = job["call"][2]
+                known = {ch["id"] for ch in merged["channels"]}
+                for ch in kwargs["channels"]:
+                    if ch["id"] not in known:
+                        known.add(ch["id"])
+                        merged["channels"].append(ch)
+                merged["max_age_hours"] = max(merged["max_age_hours"], kwargs["max_age_hours"])
+                job["targets"].append(target)
+                continue
+
+            if "article_cache" in kwargs:
+                # One article cache for the whole batch, so readers still share HN jobs
+                kwargs = dict(kwargs, article_cache=os.path.join(output_root, ".hn_article_cache.json"))
+                call = (module, func, kwargs)
+                target["kwargs"] = kwargs
+
+            key = json.dumps([module, func, kwargs], sort_keys=True)
+            if key not in by_key:
+                per_source[name] += 1
+                job_id = name if per_source[name] == 1 else f"{name}-{per_source[name]}"
+                by_key[key] = job_id
+                jobs[job_id] = {
+                    "source": name,
+                    "call": call,
+                    "output_file": os.path.join(output_root, ".batch", f"{job_id}.json"),
+                    "targets": [],
+                }
+            jobs[by_key[key]]["targets"].append(target)
+
+    # A job only one reader needs can write straight into that reader's directory
+    for job in jobs.values():
+        if job["source"] != "youtube" and len(job["targets"]) == 1:
+            job["output_file"] = job["targets"][0]["output_file"]
+    return jobs
+
+
+def _youtube_for(data, kwargs):
+    """Cut a merged YouTube result down to one reader's channels and max age."""
+    ids = {ch["id"] for ch in kwargs["channels"]}
+    names = {ch["name"] for ch in kwargs["channels"]}
+    now = datetime.fromisoformat(data["fetched_at"])
+    cutoff = now - timedelta(hours=kwargs["max_age_hours"])
+
+    results = []
+    for result in data["channels"]:
+        if result["channel_id"] not in ids:
+            continue
+        if result.get("error"):
+            results.append(result)
+            continue
+        videos = [v for v in result["videos"]
+                  if datetime.fromisoformat(v["published"]) >= cutoff]
+        if videos:
+            results.append(dict(result, new_video_count=len(videos), videos=videos))
+
+    dropped = [name for name in data.get("dropped", []) if name in names]
+    return fetch_youtube._summary(now, results, dropped)
+
+
+def _distribute(job):
+    """Write a finished job's result to every target that is not the job file."""
+    with open(job["output_file"]) as f:
+        text = f.read()
+    for target in job["targets"]:
+        if target["output_file"] == job["output_file"]:
+            continue
+        if job["source"] == "youtube":
+            _write_result(_youtube_for(json.loads(text), target["kwargs"]),
+                          target["output_file"])
+        else:
+            write_atomic(target["output_file"], text)
+
+
+def fetch_batch(reader_args, output_root, deadline=None):
+    output_root = os.path.abspath(output_root)
+    os.makedirs(os.path.join(output_root, ".batch"), exist_ok=True)
+
+    readers = {}
+    for arg in reader_args:
+        name, path = _reader_name(arg)
+        if name in readers:
+            raise ValueError(f"Duplicate reader name {name!r}; use NAME=CONFIG")
+        path = os.path.abspath(path)
+        with open(path) as f:
+            readers[name] = (path, json.load(f))
+        os.makedirs(os.path.join(output_root, name), exist_ok=True)
+
+    http = _merge_http(readers, output_root)
+    http["memoize"] = True
+    if deadline is None:
+        deadline = FETCH_TIMEOUT - DEADLINE_GRACE
+    http["deadline"] = time.time() + deadline
+
+    reader_results = {name: {} for name in readers}
+    breakers = {name: Breakers(os.path.join(output_root, name, ".health.json"),
+                               **config.get("breaker", {}))
+                for name, (_path, config) in readers.items()}
+
+    def allow(reader, source):
+        if breakers[reader].allow(source):
+            return True
+        reader_results[reader][source] = {"success": False, "skipped": True,
+                                          "detail": "skipped: circuit open"}
+        print(f"  [skipped] {reader}/{source}: circuit open", file=sys.stderr)
+        return False
+
+    jobs = plan(readers, output_root, allow)
+    reader_sources = sum(len(job["targets"]) for job in jobs.values())
+    print(f"{len(readers)} readers, {reader_sources} reader sources → "
+          f"{len(jobs)} fetch jobs", file=sys.stderr)
+
+    fetchers = {job_id: (None, job["output_file"], job["call"]) for job_id, job in jobs.items()}
+    job_results = {}
+
+    for job_id, success, detail, timings in (_run_in_process(fetchers, http) if jobs else []):
+        job = jobs[job_id]
+        if success:
+            try:
+                _distribute(job)
+            except Exception as e:
+                success, detail = False, f"{type(e).__name__}: {e}"
+        status = "ok" if success else "FAILED"
+        readers_of_job = [t["reader"] for t in job["targets"]]
+        print(f"  [{status}] {job_id} ({len(readers_of_job)} readers): {detail}", file=sys.stderr)
+
+        job_results[job_id] = {"source": job["source"], "readers": readers_of_job,
+                               "success": success, "detail": detail}
+        if timings:
+            job_results[job_id]["timings"] = timings
+
+        for target in job["targets"]:
+            result = {"success": success, "job": job_id}
+            if success:
+                with open(target["output_file"]) as f:
+                    result["detail"] = _describe(json.load(f), target["output_file"])
+                result.update(_partial_info(target["output_file"]))
+            else:
+                result["detail"] = detail
+            reader_results[target["reader"]][job["source"]] = result
+            breakers[target["reader"]].record(job["source"], success,
+                                              None if success else detail)
+
+    for name, results in reader_results.items():
+        for source in results:
+            results[source]["breaker"] = breakers[name].report(source)
+        breakers[name].save()
+
+    # Each reader's items are scored against their own interests
+    outputs = {name: {} for name in readers}
+    for job in jobs.values():
+        for target in job["targets"]:
+            if reader_results[target["reader"]][job["source"]]["success"]:
+                outputs[target["reader"]][job["source"]] = target["output_file"]
+
+    fetched_at = datetime.now(timezone.utc).isoformat()
+    for name, (config_path, config) in readers.items():
+        results = reader_results[name]
+        reader_dir = os.path.join(output_root, name)
+        for source, count in _flag_outputs(os.path.join(reader_dir, STATE_DB),
+                                           outputs[name]).items():
+            results[source]["previously_seen"] = count
+        interests = _interests_path(config)
+        scored = _score_outputs(interests, outputs[name])
+        clusters = _cluster_outputs(outputs[name], reader_dir)
+        manifest = {
+            "fetched_at": fetched_at,
+            "config": config_path,
+            "output_dir": os.path.join(output_root, name),
+            "mode": "batch",
+            "deadline": _iso(http["deadline"]),
+            "partial": any(r.get("partial") for r in results.values()),
+            "relevance": {"interests": interests, "scored": scored} if scored else None,
+            "clusters": clusters,
+            "results": dict(sorted(results.items())),
+        }
+        write_atomic(os.path.join(output_root, name, "manifest.json"),
+                      json.dumps(manifest, indent=2))
+
+    batch_manifest = {
+        "fetched_at": fetched_at,
+        "output_root": output_root,
+        "readers": {name: path for name, (path, _config) in readers.items()},
+        "reader_sources": reader_sources,
+        "jobs": job_results,
+    }
+    manifest_path = os.path.join(output_root, "batch_manifest.json")
+    write_atomic(manifest_path, json.dumps(batch_manifest, indent=2))
+
+    failures = sum(1 for r in job_results.values() if not r["success"])
+    print(f"\nBatch manifest: {manifest_path}", file=sys.stderr)
+    print(f"Done: {len(job_results) - failures} jobs succeeded, {failures} failed",
+          file=sys.stderr)
+    return batch_manifest
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fetch once for many readers' configs")
+    parser.add_argument("configs", nargs="+", metavar="[NAME=]CONFIG",
+                        help="A reader's sources.json, optionally named")
+    parser.add_argument("--output-root", required=True,
+                        help="Directory that gets one subdirectory per reader")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help=f"Run-wide time budget (default: {FETCH_TIMEOUT - DEADLINE_GRACE})")
+    args = parser.parse_args()
+
+    try:
+        manifest = fetch_batch(args.configs, args.output_root, deadline=args.deadline)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"source": "batch", "error": str(e)}), file=sys.stderr)
+        exit_process(1)
+    print(json.dumps(manifest, indent=2))
+    exit_process(0)
@@ -4,12 +4,18 @@
 Parses the githubawesome.com RSS feed for curated repo write-ups with
 editorial blurbs explaining why each repo is notable.
 
-Uses a state file to stagger repos across the week — each day returns a
+Uses the state database to stagger repos across the week — each day returns a
 fresh batch that hasn't been served before. When a new blog post drops,
 the pool resets.
 
 Falls back to scraping github.com/trending if the blog is unreachable.
 
+Blog items carry no description, language or stars. With an api_url
+(a GitHub REST API or compatible stand-in), the whole pool is enriched
+from /repos/{owner}/{repo} in one concurrent pass; results are cached in
+the state database per owner/repo for metadata_ttl seconds, so a repo
+seen on an earlier day costs no request.
+
 Output: JSON array of {repo, description, blurb, link, language, stars}.
 """
 
@@ -19,111 +25,154 @@ import re
 import sys
 from datetime import datetime, timezone
 
-import requests
-from bs4 import BeautifulSoup
+import _aio
+import _html
+from _state import StateStore
+from _trace import span, submit
+from _util import (parse_feed, http_get, until_deadline, result_records, write_records,
+                   abandon, exit_process, thread_pool, HEADERS)
 
-from _util import parse_feed, HEADERS
+API_WORKERS = 8
+# Repo metadata is looked up again after this many seconds
+METADATA_TTL = 7 * 86400
 
 
-def fetch_from_blog(rss_url):
+def fetch_from_blog(rss_url, state_file=None):
     """Parse repos and editorial blurbs from githubawesome.com blog posts.
 
     Returns (blog_id, items) where blog_id is the URL of the source post.
     """
+    try:
+        feed = parse_feed(rss_url)
+    except Exception:
+        return None, []
+    return parse_blog(feed, state_file)
+
+
+def parse_blog(feed, state_file=None):
+    """Parse repos and editorial blurbs from an already-fetched blog feed.
+
+    With a state database, each post's parsed repos are cached by its GUID
+    (and updated date), so only posts that are new or edited since the last
+    run are parsed. The cache holds the posts of the current feed.
+    """
+    store = StateStore.open(state_file) if state_file else None
+    cached = store.get("github_trending", "posts", {}) if store else {}
+    posts = {}
     items = []
     seen = set()
     blog_id = None
 
-    try:
-        feed = parse_feed(rss_url)
+    with span("html_parse", entries=len(feed.entries)) as s:
         for entry in feed.entries:
-            title = entry.get("title", "")
-
-            content = ""
-            if entry.get("content"):
-                content = entry["content"][0].get("value", "")
-            if not content:
-                content = entry.get("summary", "")
-            if not content:
-                continue
-
-            soup = BeautifulSoup(content, "html.parser")
-            text = soup.get_text(separator="\n", strip=True)
-
-            if "Trending" in title:
-                # Use first trending post's link as the blog_id
-                if blog_id is None:
-                    blog_id = entry.get("link", title)
-
-                # Multi-repo roundup post — split by "No.N" markers
-                sections = re.split(r'(?=No\.\d+)', text)
-                for section in sections[1:]:
-                    lines = section.strip().split("\n")
-                    blurb_lines = []
-                    repo_url = ""
-                    for line in lines[1:]:  # Skip "No.N"
-                        if "github.com/" in line:
-                            repo_url = line.strip()
-                        else:
-                            blurb_lines.append(line.strip())
-
-                    match = re.search(r'github\.com/([^/\s]+/[^/\s]+)', repo_url)
-                    if match:
-                        repo = match.group(1).rstrip("/")
-                        if repo.lower() in seen:
-                            continue
-                        seen.add(repo.lower())
-
-                        blurb = " ".join(blurb_lines).strip()
-                        items.append({
-                            "repo": repo,
-                            "description": "",
-                            "blurb": blurb,
-                            "link": f"https://github.com/{repo}",
-                            "language": "",
-                            "stars": ""
-                        })
-            else:
-                # Single-repo blog post
-                links = soup.find_all("a", href=re.compile(r'github\.com/'))
-                for a in links:
-                    href = a.get("href", "")
-                    match = re.search(r'github\.com/([^/\s]+/[^/\s]+)', href)
-                    if match:
-                        repo = match.group(1).rstrip("/")
-                        if repo.lower() in seen:
-                            break
-                        seen.add(repo.lower())
-
-                        blurb = text.strip()
-                        if len(blurb) > 500:
-                            blurb = blurb[:500].rsplit(" ", 1)[0] + "..."
-
-                        items.append({
-                            "repo": repo,
-                            "description": "",
-                            "blurb": blurb,
-                            "link": f"https://github.com/{repo}",
-                            "language": "",
-                            "stars": ""
-                        })
-                        break
+            guid = entry.get("id") or entry.get("link") or entry.get("title", "")
+            updated = entry.get("updated", "")
+            post = cached.get(guid)
+            if post is None or post["updated"] != updated:
+                try:
+                    post = _parse_post(entry)
+                except Exception:
+                    break
+                post["updated"] = updated
+            posts[guid] = post
+
+            # Use first trending post's link as the blog_id
+            if blog_id is None:
+                blog_id = post["blog_id"]
+            for item in post["items"]:
+                if item["repo"].lower() not in seen:
+                    seen.add(item["repo"].lower())
+                    items.append(dict(item))
 
             if len(items) >= 50:
                 break
+        s.set(parsed=sum(1 for guid, post in posts.items() if cached.get(guid) is not post))
 
-    except Exception:
-        pass
-
+    if store and posts != cached:
+        store.put("github_trending", "posts", posts)
     return blog_id, items
 
 
+def _parse_post(entry):
+    """Parse one blog post into {"blog_id", "items"}.
+
+    blog_id is the post's link if it is a trending roundup, else None.
+    """
+    title = entry.get("title", "")
+
+    content = ""
+    if entry.get("content"):
+        content = entry["content"][0].get("value", "")
+    if not content:
+        content = entry.get("summary", "")
+    if not content:
+        return {"blog_id": None, "items": []}
+
+    soup = _html.parse(content)
+    text = soup.get_text(separator="\n", strip=True)
+    items = []
+
+    if "Trending" in title:
+        # Multi-repo roundup post — split by "No.N" markers
+        sections = re.split(r'(?=No\.\d+)', text)
+        for section in sections[1:]:
+            lines = section.strip().split("\n")
+            blurb_lines = []
+            repo_url = ""
+            for line in lines[1:]:  # Skip "No.N"
+                if "github.com/" in line:
+                    repo_url = line.strip()
+                else:
+                    blurb_lines.append(line.strip())
+
+            match = re.search(r'github\.com/([^/\s]+/[^/\s]+)', repo_url)
+            if match:
+                repo = match.group(1).rstrip("/")
+                blurb = " ".join(blurb_lines).strip()
+                items.append(_item(repo, blurb))
+        return {"blog_id": entry.get("link", title), "items": items}
+
+    # Single-repo blog post — the first GitHub link is the repo
+    for a in soup.find_all("a", href=re.compile(r'github\.com/')):
+        match = re.search(r'github\.com/([^/\s]+/[^/\s]+)', a.get("href", ""))
+        if match:
+            blurb = text.strip()
+            if len(blurb) > 500:
+                blurb = blurb[:500].rsplit(" ", 1)[0] + "..."
+            items.append(_item(match.group(1).rstrip("/"), blurb))
+            break
+    return {"blog_id": None, "items": items}
+
+
+def _item(repo, blurb):
+    return {
+        "repo": repo,
+        "description": "",
+        "blurb": blurb,
+        "link": f"https://github.com/{repo}",
+        "language": "",
+        "stars": ""
+    }
+
+
+TRENDING_URL = "https://github.com/trending"
+
+
 def fetch_from_scrape():
     """Fallback: scrape github.com/trending directly."""
     try:
-        resp = requests.get("https://github.com/trending", headers=HEADERS, timeout=15)
+        resp = http_get(TRENDING_URL, headers=HEADERS, timeout=15)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        with span("html_parse", bytes=len(resp.content)):
+            return parse_trending(resp.text)
+    except Exception:
+        return []
+
+
+def parse_trending(html):
+    """Parse repos from the github.com/trending page HTML."""
+    try:
+        soup = _html.parse(html, only={"name": "article"})
 
         items = []
         for row in soup.select("article.Box-row"):
@@ -156,52 +205,176 @@ def fetch_from_scrape():
         return []
 
 
-def _load_state(state_file):
-    """Load stagger state from disk."""
-    if state_file and os.path.exists(state_file):
-        try:
-            with open(state_file) as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
+def enrich(items, api_url, state_file=None, ttl=METADATA_TTL):
+    """Fill in description, language and stars of items from a GitHub-compatible API.
 
+    Repos not in the state database's cache (or cached more than ttl
+    seconds ago) are looked up concurrently. Failed lookups leave the
+    fields empty and are retried next run; unknown repos (404) are cached.
+    """
+    missing, metadata = _cached_metadata(items, state_file, ttl)
+    fetched = {}
+    if missing:
+        with span("enrich", repos=len(missing)):
+            pool = thread_pool(min(API_WORKERS, len(missing)), "github-api")
+            futures = {submit(pool, http_get, _repo_url(api_url, key),
+                              headers=_api_headers(), timeout=15): key for key in missing}
+            for future in until_deadline(futures):
+                try:
+                    fetched[futures[future]] = _metadata(future.result())
+                except Exception:
+                    pass
+            abandon(pool)
+    _apply_metadata(items, metadata, fetched, state_file, ttl)
+
+
+async def enrich_async(items, api_url, state_file=None, ttl=METADATA_TTL):
+    """Async enrich() for the asyncio engine."""
+    missing, metadata = _cached_metadata(items, state_file, ttl)
+    fetched = {}
+    if missing:
+        with span("enrich", repos=len(missing)):
+            results = await _aio.until_deadline([
+                _aio.get(_repo_url(api_url, key), headers=_api_headers(), timeout=15)
+                for key in missing])
+        for key, resp in zip(missing, results):
+            if resp is _aio.DROPPED or isinstance(resp, Exception):
+                continue
+            try:
+                fetched[key] = _metadata(resp)
+            except Exception:
+                pass
+    _apply_metadata(items, metadata, fetched, state_file, ttl)
 
-def _save_state(state_file, state):
-    """Persist stagger state to disk."""
-    if not state_file:
-        return
-    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
-    with open(state_file, "w") as f:
-        json.dump(state, f, indent=2)
+
+def _repo_url(api_url, key):
+    return f"{api_url.rstrip('/')}/repos/{key}"
+
+
+def _api_headers():
+    headers = {"Accept": "application/vnd.github+json", "User-Agent": HEADERS["User-Agent"]}
+    # Unauthenticated requests to api.github.com are limited to 60 an hour
+    if os.environ.get("GITHUB_TOKEN"):
+        headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+    return headers
+
+
+def _metadata(resp):
+    """Metadata from a /repos/{owner}/{repo} response; {} for an unknown repo."""
+    if resp.status_code == 404:
+        return {}
+    resp.raise_for_status()
+    data = resp.json()
+    stars = data.get("stargazers_count")
+    return {
+        "description": (data.get("description") or "")[:200],
+        "language": data.get("language") or "",
+        "stars": f"{stars:,}" if isinstance(stars, int) else "",
+    }
+
+
+def _cached_metadata(items, state_file, ttl):
+    """(owner/repo keys to look up, {key: metadata} still cached)."""
+    keys = list(dict.fromkeys(item["repo"].lower() for item in items))
+    cached = {}
+    if state_file:
+        cached = StateStore.open(state_file).get_many("github_repos", keys, max_age=ttl)
+    return [key for key in keys if key not in cached], cached
+
+
+def _apply_metadata(items, cached, fetched, state_file, ttl):
+    if state_file and fetched:
+        with StateStore.open(state_file).transaction() as tx:
+            tx.expire("github_repos", ttl)
+            tx.put_many("github_repos", fetched)
+    metadata = {**cached, **fetched}
+    for item in items:
+        for field, value in metadata.get(item["repo"].lower(), {}).items():
+            if value and not item.get(field):
+                item[field] = value
 
 
 def fetch(rss_url="https://githubawesome.com/rss/",
           fallback_url="https://rsshub.app/github/trending/daily",
           state_file=None,
-          per_day=10):
+          per_day=10,
+          api_url=None,
+          metadata_ttl=METADATA_TTL):
     """Fetch today's batch of trending repos.
 
     Args:
         rss_url: githubawesome.com RSS feed
         fallback_url: backup RSS (unused currently)
-        state_file: JSON file tracking which repos have been served.
-                    If None, returns the full blog dump (no staggering).
+        state_file: State database (see _state.py) tracking which repos
+                    have been served. If None, returns the full blog dump
+                    (no staggering).
         per_day: How many repos to serve per day from the pool.
+        api_url: GitHub REST API root to enrich the pool from
+                 (e.g. https://api.github.com). If None, no enrichment.
+        metadata_ttl: Seconds repo metadata stays cached.
     """
-    blog_id, all_items = fetch_from_blog(rss_url)
+    blog_id, all_items = fetch_from_blog(rss_url, state_file)
 
     if not all_items:
         # Blog unreachable or empty — fall back to scrape
-        items = fetch_from_scrape()
-        return {
-            "source": "github_trending",
-            "fetched_at": datetime.now(timezone.utc).isoformat(),
-            "count": len(items),
-            "pool_remaining": 0,
-            "items": items
-        }
+        return _scraped_result(fetch_from_scrape())
+
+    if api_url:
+        enrich(all_items, api_url, state_file, metadata_ttl)
+
+    return _serve(blog_id, all_items, state_file, per_day)
+
+
+async def fetch_async(rss_url="https://githubawesome.com/rss/",
+                      fallback_url="https://rsshub.app/github/trending/daily",
+                      state_file=None,
+                      per_day=10,
+                      api_url=None,
+                      metadata_ttl=METADATA_TTL):
+    """Async fetch() for the asyncio engine."""
+    try:
+        blog_id, all_items = parse_blog(await _aio.parse_feed(rss_url), state_file)
+    except Exception:
+        blog_id, all_items = None, []
 
+    if not all_items:
+        try:
+            resp = await _aio.get(TRENDING_URL, headers=HEADERS, timeout=15)
+            resp.raise_for_status()
+            with span("html_parse", bytes=len(resp.content)):
+                items = parse_trending(resp.text)
+        except Exception:
+            items = []
+        return _scraped_result(items)
+
+    if api_url:
+        await enrich_async(all_items, api_url, state_file, metadata_ttl)
+    return _serve(blog_id, all_items, state_file, per_day)
+
+
+def stream(rss_url="https://githubawesome.com/rss/",
+           fallback_url="https://rsshub.app/github/trending/daily",
+           state_file=None,
+           per_day=10,
+           api_url=None,
+           metadata_ttl=METADATA_TTL):
+    """NDJSON records for fetch(); the batch is only known once the pool is read."""
+    yield from result_records(fetch(rss_url, fallback_url, state_file, per_day,
+                                    api_url, metadata_ttl))
+
+
+def _scraped_result(items):
+    return {
+        "source": "github_trending",
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "count": len(items),
+        "pool_remaining": 0,
+        "items": items
+    }
+
+
+def _serve(blog_id, all_items, state_file, per_day):
+    """Pick today's batch from the blog pool, staggered via the state file."""
     # No state file → return everything (for debugging / first run inspection)
     if not state_file:
         return {
@@ -213,28 +386,23 @@ def fetch(rss_url="https://githubawesome.com/rss/",
         }
 
     # --- Stagger logic ---
-    state = _load_state(state_file)
+    with StateStore.open(state_file).transaction() as tx:
+        # If blog post changed, reset the pool
+        if tx.get("github_trending", "blog_id") != blog_id:
+            tx.forget("github_trending")
+            tx.put("github_trending", "blog_id", blog_id)
 
-    # If blog post changed, reset the pool
-    if state.get("blog_id") != blog_id:
-        state = {
-            "blog_id": blog_id,
-            "served": [],
-        }
-
-    served = set(r.lower() for r in state.get("served", []))
+        served = tx.seen("github_trending", [item["repo"].lower() for item in all_items])
 
-    # Filter to unserved repos
-    remaining = [item for item in all_items if item["repo"].lower() not in served]
+        # Filter to unserved repos
+        remaining = [item for item in all_items if item["repo"].lower() not in served]
 
-    # Pick today's batch
-    todays_batch = remaining[:per_day]
+        # Pick today's batch
+        todays_batch = remaining[:per_day]
 
-    # Update served list
-    newly_served = [item["repo"].lower() for item in todays_batch]
-    state["served"] = list(served | set(newly_served))
-    state["last_served_at"] = datetime.now(timezone.utc).isoformat()
-    _save_state(state_file, state)
+        # Record it as served
+        tx.mark_seen("github_trending", [item["repo"].lower() for item in todays_batch])
+        tx.put("github_trending", "last_served_at", datetime.now(timezone.utc).isoformat())
 
     return {
         "source": "github_trending",
@@ -251,14 +419,33 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Fetch GitHub trending repos")
     parser.add_argument("--rss-url", default="https://githubawesome.com/rss/")
     parser.add_argument("--fallback-url", default="https://rsshub.app/github/trending/daily")
-    parser.add_argument("--state-file", help="JSON file to track served repos (enables staggering)")
+    parser.add_argument("--state-file",
+                        help="State database tracking served repos (enables staggering)")
     parser.add_argument("--per-day", type=int, default=10, help="Repos per day (default: 10)")
+    parser.add_argument("--api-url",
+                        help="GitHub API root to enrich repos from (e.g. https://api.github.com)")
+    parser.add_argument("--metadata-ttl", type=int, default=METADATA_TTL,
+                        help=f"Seconds repo metadata stays cached (default: {METADATA_TTL})")
     parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Write one JSON record per line (items, then a summary)")
     args = parser.parse_args()
 
     try:
+        if args.ndjson:
+            records = stream(rss_url=args.rss_url, fallback_url=args.fallback_url,
+                             state_file=args.state_file, per_day=args.per_day,
+                             api_url=args.api_url, metadata_ttl=args.metadata_ttl)
+            if args.output:
+                with open(args.output, "w") as f:
+                    write_records(records, f)
+            else:
+                write_records(records, sys.stdout)
+            exit_process(0)
+
         result = fetch(rss_url=args.rss_url, fallback_url=args.fallback_url,
-                       state_file=args.state_file, per_day=args.per_day)
+                       state_file=args.state_file, per_day=args.per_day,
+                       api_url=args.api_url, metadata_ttl=args.metadata_ttl)
         out = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
             with open(args.output, "w") as f:
@@ -267,4 +454,5 @@ if __name__ == "__main__":
             print(out)
     except Exception as e:
         print(json.dumps({"source": "github_trending", "error": str(e)}), file=sys.stderr)
-        sys.exit(1)
+        exit_process(1)
+    exit_process(0)
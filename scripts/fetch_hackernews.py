@@ -6,51 +6,440 @@ body as clean markdown. Falls back gracefully if a link can't be read.
 
 Output: JSON array of {title, link, hn_link, body_md, points, comments_url}.
 Typical output size: ~15KB for 10 stories (vs ~500KB raw HTML).
+
+With --ndjson, each story is written as soon as its article is extracted
+(see stream()), followed by a summary record.
+
+With --article-cache FILE, extraction results are kept across runs (see
+_articlecache.py), so only stories not seen recently cost a download and
+parse. Failed and non-HTML links are cached too, for a shorter time.
+
+With --interests FILE (config/interests.md), the --count stories are the
+front-page stories whose titles best match the reader's interests (see
+_relevance.py) rather than the top ones.
+
+With --state-file DB --skip-seen, stories served in an earlier edition
+(see _state.py) are left out before the --count stories are picked.
 """
 
+import asyncio
 import json
+import multiprocessing
+import os
 import re
 import sys
+import threading
+import time
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from html import unescape
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import CData, NavigableString, Tag
 
-from _util import parse_feed, HEADERS as _HEADERS
+import _aio
+import _html
+import _relevance
+import _trace
+from _articlecache import ArticleCache, canonical_url
+from _state import SEEN_GRACE, StateStore
+from _trace import span, submit
+from _util import (parse_feed, http_get, read_body, until_deadline, deadline_passed,
+                   deadline_remaining, item_record, summary_record, write_records,
+                   abandon, exit_process, memoized, thread_pool, DeadlineExceeded,
+                   HEADERS as _HEADERS)
 
 
 HEADERS = _HEADERS
 
+NOISE_TAGS = ["script", "style", "nav", "footer", "header",
+              "aside", "iframe", "noscript", "form"]
+_LANDMARK = re.compile(r"<(article|main)\b", re.I)
+
+# Streamed article downloads (see extract_article)
+MAX_ARTICLE_BYTES = 2 * 1024 * 1024
+# Stop reading once an <article> has this much paragraph text: well past
+# the 2000 chars body_md keeps, allowing for markup the regex misjudges
+EARLY_STOP_CHARS = 6000
+_ARTICLE_OPEN = re.compile(rb"<article\b", re.I)
+# Where paragraph text starts or ends; </p> is optional in HTML, so the
+# next <p> (or the end of the article) also ends a paragraph
+_PARAGRAPH_EDGE = re.compile(rb"<p\b[^>]*>|</p\s*>|</article\s*>", re.I)
+_TAG = re.compile(r"<[^>]*>")
+
+# Strings that count as text when scoring (not comments, doctypes, scripts)
+_TEXT_TYPES = (NavigableString, CData)
+
+# Extraction pipeline (see _Extractor)
+DOWNLOAD_WORKERS = 5
+# Pages are parsed in the download threads unless a batch has at least
+# PARSE_POOL_MIN_ARTICLES articles: for a front page of 10, spawning the
+# parse processes costs more than the parsing they take over
+PARSE_WORKERS = 0
+PARSE_POOL_MIN_ARTICLES = 30
+PARSE_QUEUE_PER_WORKER = 2
+_parse_pools = {}
+_parse_pools_lock = threading.Lock()
+
+
+def extract_article(url, timeout=15, cache=None, max_bytes=MAX_ARTICLE_BYTES):
+    """Extract main article text from a URL. Returns clean text or empty string.
+
+    The body is streamed: non-HTML links are skipped on their headers
+    alone, at most max_bytes are read, and reading stops once an
+    <article> holds enough text for the trimmed body_md.
+
+    With an ArticleCache, a fresh cached result is returned without any
+    network access and new results are stored in it.
+    """
+    with span("article", url=url) as s:
+        entry = cache.get(url) if cache is not None else None
+        if entry is not None:
+            s.set(cache="hit")
+            return entry["body_md"]
+        try:
+            page = _download(url, timeout, max_bytes)
+            body, error = (_parse_here(page) if page else ""), None
+        except Exception as e:
+            body, error = "", e
+        _remember(cache, url, body, error)
+        return body
+
+
+async def extract_article_async(url, timeout=15, cache=None, max_bytes=MAX_ARTICLE_BYTES,
+                                parsers=None):
+    """Async extract_article for the asyncio engine.
+
+    parsers is an optional (process pool, asyncio.Semaphore) parse stage;
+    without it the page is parsed on the event loop thread.
+    """
+    with span("article", url=url) as s:
+        entry = cache.get(url) if cache is not None else None
+        if entry is not None:
+            s.set(cache="hit")
+            return entry["body_md"]
+        try:
+            # Headers and body in one call, so the read holds its in-flight slot
+            page = await _aio.call(_download, url, timeout, max_bytes)
+            body, error = "", None
+            if page and parsers is None:
+                body = _parse_here(page)
+            elif page:
+                pool, queue = parsers
+                try:
+                    async with queue:
+                        body, seconds = await asyncio.wrap_future(pool.submit(_parse_job, *page))
+                    s.set(parse_ms=round(seconds * 1000, 2))
+                except BrokenProcessPool:
+                    _discard_pool(pool)
+                    body = _parse_here(page)
+        except Exception as e:
+            body, error = "", e
+        _remember(cache, url, body, error)
+        return body
+
+
+class _Extractor:
+    """Article extraction in two stages joined by a bounded queue.
+
+    The I/O stage streams pages on download_workers threads. Each raw page
+    then goes to a pool of parse_workers processes, since decoding and
+    BeautifulSoup parsing are CPU-bound and would serialize on the GIL in
+    threads. At most PARSE_QUEUE_PER_WORKER pages per parse worker are
+    queued or being parsed; a download that finds the queue full waits,
+    so raw pages never pile up. parse_workers=0 parses in the download
+    threads instead.
+    """
+
+    def __init__(self, cache=None, max_bytes=MAX_ARTICLE_BYTES, timeout=15,
+                 download_workers=DOWNLOAD_WORKERS, parse_workers=PARSE_WORKERS):
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.downloads = thread_pool(download_workers, "hn-download")
+        self.parsers = _parse_pool(parse_workers) if parse_workers else None
+        self.queue = threading.BoundedSemaphore(parse_workers * PARSE_QUEUE_PER_WORKER or 1)
+        self._parsing = []
+
+    def submit(self, url):
+        """Start extracting url; returns a Future of its body_md."""
+        result = Future()
+        result.set_running_or_notify_cancel()
+        submit(self.downloads, self._download, url, result)
+        return result
+
+    def close(self):
+        """Stop without waiting: pending downloads and parses are cancelled."""
+        abandon(self.downloads)
+        for parsed in self._parsing:
+            parsed.cancel()
+
+    def _download(self, url, result):
+        with span("article", url=url) as s:
+            entry = self.cache.get(url) if self.cache is not None else None
+            if entry is not None:
+                s.set(cache="hit")
+                result.set_result(entry["body_md"])
+                return
+            try:
+                page = _download(url, self.timeout, self.max_bytes)
+            except Exception as e:
+                self._finish(url, result, "", e)
+                return
+            if not page:
+                self._finish(url, result, "")
+                return
+            if self.parsers is None:
+                self._finish(url, result, _parse_here(page))
+                return
+
+            start = time.time()
+            left = deadline_remaining()
+            if not self.queue.acquire(timeout=None if left is None else max(left, 0)):
+                self._finish(url, result, "", DeadlineExceeded("deadline reached in parse queue"))
+                return
+            s.set(queue_wait_ms=round((time.time() - start) * 1000, 2))
+            try:
+                parsed = self.parsers.submit(_parse_job, *page)
+            except Exception:  # pool broken or shut down: parse here instead
+                self.queue.release()
+                self._finish(url, result, _parse_here(page))
+                return
+            self._parsing.append(parsed)
+            parsed.add_done_callback(lambda f: self._parsed(url, result, f, page, s))
+
+    def _parsed(self, url, result, parsed, page, s):
+        self.queue.release()
+        try:
+            body, seconds = parsed.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory): parse on a download thread
+            _discard_pool(self.parsers)
+            try:
+                submit(self.downloads, lambda: self._finish(url, result, _parse_here(page)))
+            except RuntimeError:  # closed at the deadline
+                pass
+            return
+        except Exception as e:
+            self._finish(url, result, "", e)
+            return
+        s.set(parse_ms=round(seconds * 1000, 2))
+        self._finish(url, result, body)
 
-def extract_article(url, timeout=15):
-    """Extract main article text from a URL. Returns clean text or empty string."""
+    def _finish(self, url, result, body, error=None):
+        _remember(self.cache, url, body, error)
+        result.set_result(body)
+
+
+def _parse_workers(requested, articles):
+    """Parse processes for a batch: requested if given, else sized by the batch."""
+    if requested is not None:
+        return requested
+    cores = os.cpu_count() or 1
+    # One core gains nothing from a separate parse process
+    if cores > 1 and articles >= PARSE_POOL_MIN_ARTICLES:
+        return min(4, cores)
+    return PARSE_WORKERS
+
+
+def _parse_pool(workers):
+    """The process-wide parse pool with this many workers, started on first use.
+
+    Workers are spawned rather than forked, so the pool can be started
+    from any thread of a multi-threaded fetch_all run.
+    """
+    with _parse_pools_lock:
+        pool = _parse_pools.get(workers)
+        if pool is None:
+            pool = _parse_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_trace.detach)
+        return pool
+
+
+def _discard_pool(pool):
+    """Forget a broken parse pool so the next _parse_pool() starts a new one."""
+    with _parse_pools_lock:
+        for workers, known in list(_parse_pools.items()):
+            if known is pool:
+                del _parse_pools[workers]
+
+
+def _remember(cache, url, body, error=None):
+    """Cache an extraction outcome, unless the run deadline cut it short."""
+    if cache is not None and not deadline_passed():
+        cache.put(url, body, error and f"{type(error).__name__}: {error}")
+
+
+def _open_cache(path):
+    return ArticleCache.open(path) if path else None
+
+
+def _download(url, timeout, max_bytes):
+    """I/O stage: stream an article page. Returns (raw bytes, encoding), or None if not HTML.
+
+    http_get never memoizes streamed responses, so with "memoize" on
+    (fetch_batch) the page itself is shared: HN jobs of several readers
+    download each article once.
+    """
+    return memoized(("article", url, max_bytes), lambda: _fetch_page(url, timeout, max_bytes))
+
+
+def _fetch_page(url, timeout, max_bytes):
+    # No retries: a stalled article server costs one timeout, not three
+    resp = http_get(url, headers=HEADERS, timeout=timeout, retries=0, stream=True)
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=timeout)
-        resp.raise_for_status()
+        if not _is_html(resp):
+            return None
+        read_body(resp, url, max_bytes=max_bytes, enough=_enough_text())
+        return resp.content, resp.encoding
+    finally:
+        resp.close()
 
-        # Skip non-HTML
-        ct = resp.headers.get("content-type", "")
-        if "html" not in ct and "text" not in ct:
-            return ""
 
-        soup = BeautifulSoup(resp.text, "html.parser")
+def _is_html(resp):
+    """Raise on HTTP errors, then decide from the headers whether to read the body."""
+    resp.raise_for_status()
+    ct = resp.headers.get("content-type", "")
+    return "html" in ct or "text" in ct
 
-        # Remove noise
-        for tag in soup(["script", "style", "nav", "footer", "header",
-                         "aside", "iframe", "noscript", "form"]):
-            tag.decompose()
 
-        # Try <article> first, then <main>, then largest <div>
-        article = soup.find("article")
-        if not article:
-            article = soup.find("main")
-        if not article:
-            # Fallback: find the div with the most <p> children
-            divs = soup.find_all("div")
-            if divs:
-                article = max(divs, key=lambda d: len(d.find_all("p")))
+def parse_raw(raw, encoding=None):
+    """CPU stage: decode raw HTML as resp.text would, then extract the article."""
+    resp = requests.Response()
+    resp._content, resp._content_consumed, resp.encoding = raw, True, encoding
+    return parse_article(resp.text)
+
+
+def _parse_here(page):
+    with span("html_parse", bytes=len(page[0])):
+        return parse_raw(*page)
+
+
+def _parse_job(raw, encoding):
+    """parse_raw() in a parse worker process; also returns its duration."""
+    start = time.perf_counter()
+    return parse_raw(raw, encoding), time.perf_counter() - start
+
+
+def _enough_text(limit=EARLY_STOP_CHARS):
+    """Return a read_body() stop test: true once an <article> has ~limit chars of <p> text.
+
+    Only the first <article> counts (up to its first </article>, so a
+    nested one ends it early); if it closes short of limit, the whole
+    page is read. Each call scans forward from where the last one
+    stopped, so the download stays linear.
+    """
+    state = {"pos": 0, "in_article": False, "para": None, "chars": 0, "closed": False}
 
+    def enough(data):
+        if state["closed"]:
+            return False
+        if not state["in_article"]:
+            m = _ARTICLE_OPEN.search(data, max(state["pos"] - 16, 0))
+            if not m:
+                state["pos"] = len(data)
+                return False
+            state["in_article"], state["pos"] = True, m.end()
+        pos = state["pos"]
+        while True:
+            m = _PARAGRAPH_EDGE.search(data, pos)
+            if not m:
+                # Resume at a tag that may still be arriving
+                tag = data.rfind(b"<", pos)
+                state["pos"] = tag if tag >= 0 else len(data)
+                break
+            if state["para"] is not None:
+                chunk = data[state["para"]:m.start()]
+                text = unescape(_TAG.sub("", chunk.decode("utf-8", "ignore"))).strip()
+                if len(text) > 20:
+                    state["chars"] += len(text)
+                state["para"] = None
+            pos = state["pos"] = m.end()
+            if m.group()[:3].lower() == b"</a":
+                state["closed"] = True
+                return state["chars"] >= limit
+            if not m.group().startswith(b"</"):
+                state["para"] = m.end()
+        return state["chars"] >= limit
+
+    return enough
+
+
+def _strip_noise(soup):
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+
+
+def _container(html):
+    """Find the element holding the article: <article>, <main>, else the best <div>.
+
+    Pages that have an <article> or <main> are parsed scoped to just those
+    (plus noise tags, so a container inside e.g. a <header> is still removed
+    with it, as with a full tree). The <div> fallback needs nearly the whole
+    document, so it gets a full parse.
+    """
+    if _LANDMARK.search(html):
+        soup = _html.parse(html, only={"name": ["article", "main"] + NOISE_TAGS})
+        _strip_noise(soup)
+        article = soup.find("article") or soup.find("main")
+        if article:
+            return article
+
+    soup = _html.parse(html)
+    _strip_noise(soup)
+
+    # Try <article> first, then <main>, then the best-scoring <div>
+    return soup.find("article") or soup.find("main") or _best_div(soup)
+
+
+def _best_div(soup):
+    """Return the <div> that scores highest as article content.
+
+    Readability-style: every <p> with more than 20 chars of text scores
+    1 plus 1 per 100 chars (up to 3), and a <div> scores the sum over its
+    subtree; both are scaled down by the share of their text inside links.
+    Totals are accumulated bottom-up in a single traversal, so each node
+    is visited once however deeply the divs nest. Among equal scores the
+    outermost <div> wins; with no scoring <div>, the first one is used.
+    """
+    best, best_score = None, 0.0
+    # Each frame: node, iterator over its children, [score, text, link_text]
+    frames = [(soup, iter(soup.contents), [0.0, 0, 0])]
+    while frames:
+        node, children, totals = frames[-1]
+        child = next(children, None)
+        if child is not None:
+            if isinstance(child, Tag):
+                frames.append((child, iter(child.contents), [0.0, 0, 0]))
+            elif type(child) in _TEXT_TYPES:
+                totals[1] += len(child.strip())
+            continue
+
+        frames.pop()
+        score, text, links = totals
+        if node.name == "a":
+            links = text
+        elif node.name == "p" and text > 20:
+            score += (1 + min(text / 100, 3)) * (1 - links / text)
+        if node.name == "div" and text:
+            div_score = score * (1 - links / text)
+            if div_score and div_score >= best_score:
+                best, best_score = node, div_score
+        if frames:
+            parent = frames[-1][2]
+            parent[0] += score
+            parent[1] += text
+            parent[2] += links
+
+    return best or soup.find("div")
+
+
+def parse_article(html):
+    """Extract main article text from an HTML document. Returns clean text or empty string."""
+    try:
+        article = _container(html)
         if not article:
             return ""
 
@@ -73,65 +462,202 @@ def extract_article(url, timeout=15):
         return ""
 
 
-def fetch(url="https://news.ycombinator.com/rss", count=10, follow_links=True):
+def _select(entries, count, interests=None):
+    """The first count feed entries, or with an interests file the count
+    whose titles are most relevant to it (still in feed order).
+
+    Ranking happens before any article is downloaded, so extraction is
+    only spent on stories the reader is likely to want.
+    """
+    if not interests:
+        return entries[:count]
+    profile = _relevance.load_profile(interests)
+    keep = _relevance.rank([e.get("title", "") for e in entries], profile, count)
+    return [entries[i] for i in keep]
+
+
+def _unseen(entries, state_file):
+    """Entries not served in an earlier edition, per the state database.
+
+    fetch_all.py records every story it writes (see _state.flag_seen());
+    one indexed lookup then drops the repeats before any article is
+    downloaded.
+    """
+    if not state_file:
+        return entries
+    keys = [canonical_url(e.get("comments") or e.get("link", "")) for e in entries]
+    known = StateStore.open(state_file).seen("hackernews", keys)
+    cutoff = time.time() - SEEN_GRACE
+    return [e for e, key in zip(entries, keys)
+            if key not in known or known[key]["first_seen"] >= cutoff]
+
+
+def _external(entries):
+    """Entries that link off-site (self-posts have nothing to extract)."""
+    return [e for e in entries if "news.ycombinator.com" not in e.get("link", "")]
+
+
+def fetch(url="https://news.ycombinator.com/rss", count=10, follow_links=True,
+          article_cache=None, max_bytes=MAX_ARTICLE_BYTES,
+          download_workers=DOWNLOAD_WORKERS, parse_workers=None, interests=None,
+          state_file=None, skip_seen=False):
     feed = parse_feed(url)
+    cache = _open_cache(article_cache)
 
-    entries = feed.entries[:count]
+    entries = _select(_unseen(feed.entries, state_file) if skip_seen else feed.entries,
+                      count, interests)
 
-    items = []
+    extracted = {}
+    dropped = []
     if follow_links:
-        # Separate self-posts from external links
-        external = []
-        self_posts = []
-        for entry in entries:
-            link = entry.get("link", "")
-            if "news.ycombinator.com" in link:
-                self_posts.append(entry)
+        # Parallel article extraction for external links only. Articles
+        # still pending at the run deadline are dropped from the result.
+        external = _external(entries)
+        extractor = _Extractor(cache, max_bytes, download_workers=download_workers,
+                               parse_workers=_parse_workers(parse_workers, len(external)))
+        futures = {extractor.submit(e.get("link", "")): e for e in external}
+        for future in until_deadline(futures):
+            entry = futures[future]
+            try:
+                extracted[entry.get("title", "")] = future.result()
+            except Exception:
+                extracted[entry.get("title", "")] = ""
+        extractor.close()
+        dropped = [e for e in futures.values() if e.get("title", "") not in extracted]
+        if cache is not None:
+            cache.save()
+
+    return _build(entries, extracted, follow_links, dropped)
+
+
+async def fetch_async(url="https://news.ycombinator.com/rss", count=10, follow_links=True,
+                      article_cache=None, max_bytes=MAX_ARTICLE_BYTES,
+                      download_workers=DOWNLOAD_WORKERS, parse_workers=None,
+                      interests=None, state_file=None, skip_seen=False):
+    """fetch() on the asyncio engine.
+
+    Downloads are bounded by the engine (download_workers is unused);
+    pages are parsed in the process pool, if one is used (see _parse_workers()).
+    """
+    feed = await _aio.parse_feed(url)
+    cache = _open_cache(article_cache)
+
+    entries = _select(_unseen(feed.entries, state_file) if skip_seen else feed.entries,
+                      count, interests)
+
+    extracted = {}
+    dropped = []
+    if follow_links:
+        external = _external(entries)
+        parse_workers = _parse_workers(parse_workers, len(external))
+        parsers = None
+        if parse_workers:
+            parsers = (_parse_pool(parse_workers),
+                       asyncio.Semaphore(parse_workers * PARSE_QUEUE_PER_WORKER))
+        bodies = await _aio.until_deadline(
+            [extract_article_async(e.get("link", ""), cache=cache, max_bytes=max_bytes,
+                                   parsers=parsers)
+             for e in external])
+        for entry, body in zip(external, bodies):
+            if body is _aio.DROPPED:
+                dropped.append(entry)
             else:
-                external.append(entry)
-
-        # Parallel article extraction for external links only
-        extracted = {}
-        with ThreadPoolExecutor(max_workers=5) as pool:
-            futures = {pool.submit(extract_article, e.get("link", "")): e
-                       for e in external}
-            for future in as_completed(futures):
-                entry = futures[future]
-                try:
-                    extracted[entry.get("title", "")] = future.result()
-                except Exception:
-                    extracted[entry.get("title", "")] = ""
-
-        for entry in entries:
-            title = entry.get("title", "").strip()
-            body = extracted.get(title, "")
-            hn_id = entry.get("id", entry.get("link", ""))
-            comments_url = entry.get("comments", f"https://news.ycombinator.com/item?id={hn_id}")
-
-            items.append({
-                "title": title,
-                "link": entry.get("link", ""),
-                "comments_url": comments_url,
-                "body_md": body,
-                "extractable": bool(body)
-            })
-    else:
-        for entry in entries:
-            items.append({
-                "title": entry.get("title", "").strip(),
-                "link": entry.get("link", ""),
-                "comments_url": entry.get("comments", ""),
-                "body_md": "",
-                "extractable": False
-            })
+                extracted[entry.get("title", "")] = body if isinstance(body, str) else ""
+        if cache is not None:
+            cache.save()
+
+    return _build(entries, extracted, follow_links, dropped)
+
+
+def stream(url="https://news.ycombinator.com/rss", count=10, follow_links=True,
+           article_cache=None, max_bytes=MAX_ARTICLE_BYTES,
+           download_workers=DOWNLOAD_WORKERS, parse_workers=None, interests=None,
+           state_file=None, skip_seen=False):
+    """Yield NDJSON records: each story as soon as it is ready, then a summary.
+
+    Self-posts (and every story with follow_links off) are emitted right
+    after the feed is parsed; linked stories follow in the order their
+    article extraction completes, until the run deadline.
+    """
+    feed = parse_feed(url)
+    cache = _open_cache(article_cache)
+
+    entries = _select(_unseen(feed.entries, state_file) if skip_seen else feed.entries,
+                      count, interests)
+    items = [None] * len(entries)
+    external = set(id(e) for e in _external(entries)) if follow_links else set()
+
+    for i, entry in enumerate(entries):
+        if id(entry) not in external:
+            items[i] = _item(entry, "", follow_links)
+            yield item_record("hackernews", i, items[i])
 
+    if external:
+        extractor = _Extractor(cache, max_bytes, download_workers=download_workers,
+                               parse_workers=_parse_workers(parse_workers, len(external)))
+        futures = {extractor.submit(e.get("link", "")): i
+                   for i, e in enumerate(entries) if id(e) in external}
+        for future in until_deadline(futures):
+            i = futures[future]
+            try:
+                body = future.result()
+            except Exception:
+                body = ""
+            items[i] = _item(entries[i], body, follow_links)
+            yield item_record("hackernews", i, items[i])
+        extractor.close()
+        if cache is not None:
+            cache.save()
+
+    dropped = [entries[i].get("title", "").strip() for i, item in enumerate(items) if item is None]
+    yield summary_record(_result([item for item in items if item is not None], dropped))
+
+
+def _item(entry, body, follow_links):
+    """Build one output story from a feed entry and its extracted body."""
+    if not follow_links:
+        return {
+            "title": entry.get("title", "").strip(),
+            "link": entry.get("link", ""),
+            "comments_url": entry.get("comments", ""),
+            "body_md": "",
+            "extractable": False
+        }
+
+    hn_id = entry.get("id", entry.get("link", ""))
+    comments_url = entry.get("comments", f"https://news.ycombinator.com/item?id={hn_id}")
     return {
+        "title": entry.get("title", "").strip(),
+        "link": entry.get("link", ""),
+        "comments_url": comments_url,
+        "body_md": body,
+        "extractable": bool(body)
+    }
+
+
+def _build(entries, extracted, follow_links, dropped=()):
+    """Assemble the fetch() result from feed entries and extracted bodies.
+
+    Entries in dropped (not extracted before the deadline) are left out.
+    """
+    skip = set(id(e) for e in dropped)
+    items = [_item(entry, extracted.get(entry.get("title", "").strip(), ""), follow_links)
+             for entry in entries if id(entry) not in skip]
+    return _result(items, [e.get("title", "").strip() for e in dropped])
+
+
+def _result(items, dropped=()):
+    result = {
         "source": "hackernews",
         "fetched_at": datetime.now(timezone.utc).isoformat(),
         "count": len(items),
         "extractable_count": sum(1 for i in items if i["extractable"]),
         "items": items
     }
+    if dropped:
+        result["partial"] = True
+        result["dropped"] = list(dropped)
+    return result
 
 
 if __name__ == "__main__":
@@ -141,10 +667,39 @@ if __name__ == "__main__":
     parser.add_argument("--count", type=int, default=10)
     parser.add_argument("--no-follow", action="store_true", help="Skip article extraction")
     parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Stream one JSON record per story as it completes")
+    parser.add_argument("--article-cache", metavar="FILE",
+                        help="Reuse extracted articles across runs (JSON cache file)")
+    parser.add_argument("--max-bytes", type=int, default=MAX_ARTICLE_BYTES,
+                        help=f"Read at most this much of each article (default: {MAX_ARTICLE_BYTES})")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS,
+                        help=f"Article download threads (default: {DOWNLOAD_WORKERS})")
+    parser.add_argument("--parse-workers", type=int,
+                        help=f"Article parse processes, 0 to parse in the download threads "
+                             f"(default: 0, or up to 4 for {PARSE_POOL_MIN_ARTICLES}+ articles)")
+    parser.add_argument("--interests", metavar="FILE",
+                        help="Pick the --count stories whose titles best match this interests file")
+    parser.add_argument("--state-file", help="State database recording stories already served")
+    parser.add_argument("--skip-seen", action="store_true",
+                        help="Leave out stories served in an earlier edition (needs --state-file)")
     args = parser.parse_args()
+    opts = dict(url=args.url, count=args.count, follow_links=not args.no_follow,
+                article_cache=args.article_cache, max_bytes=args.max_bytes,
+                download_workers=args.download_workers, parse_workers=args.parse_workers,
+                interests=args.interests, state_file=args.state_file, skip_seen=args.skip_seen)
 
     try:
-        result = fetch(url=args.url, count=args.count, follow_links=not args.no_follow)
+        if args.ndjson:
+            records = stream(**opts)
+            if args.output:
+                with open(args.output, "w") as f:
+                    write_records(records, f)
+            else:
+                write_records(records, sys.stdout)
+            exit_process(0)
+
+        result = fetch(**opts)
         out = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
             with open(args.output, "w") as f:
@@ -153,4 +708,5 @@ if __name__ == "__main__":
             print(out)
     except Exception as e:
         print(json.dumps({"source": "hackernews", "error": str(e)}), file=sys.stderr)
-        sys.exit(1)
+        exit_process(1)
+    exit_process(0)
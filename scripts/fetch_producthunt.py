@@ -10,7 +10,8 @@ import re
 import sys
 from datetime import datetime, timezone
 
-from _util import parse_feed
+import _aio
+from _util import parse_feed, result_records, write_records
 
 
 def clean_html(text):
@@ -21,8 +22,19 @@ def clean_html(text):
 
 
 def fetch(url="https://www.producthunt.com/feed?category=undefined", count=5):
-    feed = parse_feed(url)
+    return _build(parse_feed(url), count)
 
+
+async def fetch_async(url="https://www.producthunt.com/feed?category=undefined", count=5):
+    return _build(await _aio.parse_feed(url), count)
+
+
+def stream(url="https://www.producthunt.com/feed?category=undefined", count=5):
+    """NDJSON records for fetch()."""
+    yield from result_records(fetch(url, count))
+
+
+def _build(feed, count):
     items = []
     for entry in feed.entries[:count]:
         raw_tagline = entry.get("summary", entry.get("description", ""))
@@ -52,9 +64,20 @@ if __name__ == "__main__":
     parser.add_argument("--url", default="https://www.producthunt.com/feed?category=undefined")
     parser.add_argument("--count", type=int, default=5)
     parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Write one JSON record per line (items, then a summary)")
     args = parser.parse_args()
 
     try:
+        if args.ndjson:
+            records = stream(url=args.url, count=args.count)
+            if args.output:
+                with open(args.output, "w") as f:
+                    write_records(records, f)
+            else:
+                write_records(records, sys.stdout)
+            sys.exit(0)
+
         result = fetch(url=args.url, count=args.count)
         out = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
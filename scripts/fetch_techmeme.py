@@ -10,21 +10,34 @@ import sys
 import re
 from datetime import datetime, timezone
 
-import requests
-from bs4 import BeautifulSoup
+import _aio
+import _html
+from _trace import span
+from _util import http_get, result_records, write_records, HEADERS
 
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/120.0.0.0 Safari/537.36"
-}
+def fetch(url="https://www.techmeme.com/", max_items=20):
+    resp = http_get(url, headers=HEADERS, timeout=30)
+    resp.raise_for_status()
+    with span("html_parse", bytes=len(resp.content)):
+        return parse_page(resp.text, max_items)
 
 
-def fetch(url="https://www.techmeme.com/", max_items=20):
-    resp = requests.get(url, headers=HEADERS, timeout=30)
+async def fetch_async(url="https://www.techmeme.com/", max_items=20):
+    resp = await _aio.get(url, headers=HEADERS, timeout=30)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    with span("html_parse", bytes=len(resp.content)):
+        return parse_page(resp.text, max_items)
+
+
+def stream(url="https://www.techmeme.com/", max_items=20):
+    """NDJSON records for fetch(); the page is parsed in one go."""
+    yield from result_records(fetch(url, max_items))
+
+
+def parse_page(html, max_items=20):
+    """Parse the Techmeme front page HTML into the fetch() result."""
+    soup = _html.parse(html, only={"class_": "clus"})
 
     items = []
     seen_headlines = set()
@@ -80,9 +93,20 @@ if __name__ == "__main__":
     parser.add_argument("--url", default="https://www.techmeme.com/")
     parser.add_argument("--max", type=int, default=20)
     parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Write one JSON record per line (items, then a summary)")
     args = parser.parse_args()
 
     try:
+        if args.ndjson:
+            records = stream(url=args.url, max_items=args.max)
+            if args.output:
+                with open(args.output, "w") as f:
+                    write_records(records, f)
+            else:
+                write_records(records, sys.stdout)
+            sys.exit(0)
+
         result = fetch(url=args.url, max_items=args.max)
         out = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
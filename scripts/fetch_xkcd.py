@@ -14,9 +14,9 @@ import re
 import sys
 from datetime import datetime, timezone, timedelta
 
-import requests
-
-from _util import parse_feed
+import _aio
+from _state import StateStore
+from _util import parse_feed, http_get, result_records, write_records
 
 
 def fetch(feed_url="https://www.xkcd.com/atom.xml",
@@ -33,11 +33,93 @@ def fetch(feed_url="https://www.xkcd.com/atom.xml",
                     ``xkcd_latest.<ext>`` and return a template-relative
                     ``img_path`` (just the filename) so the Typst template
                     in the same directory can embed it with ``image()``.
-        state_file: Optional file tracking last-seen comic number
+        state_file: Optional state database (see _state.py) tracking the
+                    last-seen comic number
         max_age_hours: Consider comics newer than this as "new"
     """
     feed = parse_feed(feed_url)
 
+    comic = _latest_comic(feed, state_file, max_age_hours)
+    if "source" in comic:
+        return comic
+
+    # Get comic image URL from the XKCD JSON API
+    data = None
+    if comic["comic_num"]:
+        try:
+            api_resp = http_get(_api_url(comic["comic_num"]), timeout=10)
+            api_resp.raise_for_status()
+            data = api_resp.json()
+        except Exception:
+            data = None
+    _apply_comic_info(comic, data)
+
+    # Download the image
+    img_bytes = None
+    if comic["img_url"]:
+        try:
+            resp = http_get(comic["img_url"], timeout=15)
+            resp.raise_for_status()
+            img_bytes = resp.content
+        except Exception as e:
+            print(f"[xkcd] image download failed: {e}", file=sys.stderr)
+
+    return _finish(comic, img_bytes, output_dir, assets_dir, state_file)
+
+
+async def fetch_async(feed_url="https://www.xkcd.com/atom.xml",
+                      output_dir=".",
+                      assets_dir=None,
+                      state_file=None,
+                      max_age_hours=48):
+    """Async fetch() for the asyncio engine."""
+    feed = await _aio.parse_feed(feed_url)
+
+    comic = _latest_comic(feed, state_file, max_age_hours)
+    if "source" in comic:
+        return comic
+
+    data = None
+    if comic["comic_num"]:
+        try:
+            api_resp = await _aio.get(_api_url(comic["comic_num"]), timeout=10)
+            api_resp.raise_for_status()
+            data = api_resp.json()
+        except Exception:
+            data = None
+    _apply_comic_info(comic, data)
+
+    img_bytes = None
+    if comic["img_url"]:
+        try:
+            resp = await _aio.get(comic["img_url"], timeout=15)
+            resp.raise_for_status()
+            img_bytes = resp.content
+        except Exception as e:
+            print(f"[xkcd] image download failed: {e}", file=sys.stderr)
+
+    return _finish(comic, img_bytes, output_dir, assets_dir, state_file)
+
+
+def stream(feed_url="https://www.xkcd.com/atom.xml",
+           output_dir=".",
+           assets_dir=None,
+           state_file=None,
+           max_age_hours=48):
+    """NDJSON records for fetch(): a single summary record, xkcd has no item list."""
+    yield from result_records(fetch(feed_url, output_dir, assets_dir, state_file, max_age_hours))
+
+
+def _api_url(comic_num):
+    return f"https://xkcd.com/{comic_num}/info.0.json"
+
+
+def _latest_comic(feed, state_file, max_age_hours):
+    """Inspect the newest feed entry.
+
+    Returns a finished ``new: False`` result if there is nothing to do,
+    otherwise a working dict describing the comic to download.
+    """
     if not feed.entries:
         return {"source": "xkcd", "new": False, "reason": "empty_feed"}
 
@@ -53,14 +135,8 @@ def fetch(feed_url="https://www.xkcd.com/atom.xml",
     else:
         is_fresh = True  # Can't tell, assume fresh
 
-    # Check state file for duplicate prevention
-    last_seen = None
-    if state_file and os.path.exists(state_file):
-        try:
-            with open(state_file) as f:
-                last_seen = json.load(f).get("comic_num")
-        except Exception:
-            pass
+    # Check state for duplicate prevention
+    last_seen = StateStore.open(state_file).get("xkcd", "comic_num") if state_file else None
 
     title = entry.get("title", "").strip()
 
@@ -87,38 +163,48 @@ def fetch(feed_url="https://www.xkcd.com/atom.xml",
             "title": title
         }
 
-    # Get comic image URL from the XKCD JSON API
-    img_url = ""
-    alt_text = ""
-    if comic_num:
-        try:
-            api_resp = requests.get(f"https://xkcd.com/{comic_num}/info.0.json", timeout=10)
-            api_resp.raise_for_status()
-            data = api_resp.json()
-            img_url = data.get("img", "")
-            alt_text = data.get("alt", "")
-            title = data.get("safe_title", title)
-        except Exception:
-            # Fallback: parse from feed entry summary
-            summary = entry.get("summary", "")
-            img_match = re.search(r'src="([^"]+)"', summary)
-            if img_match:
-                img_url = img_match.group(1)
-            alt_match = re.search(r'alt="([^"]*)"', summary)
-            if alt_match:
-                alt_text = alt_match.group(1)
+    return {
+        "entry": entry,
+        "comic_num": comic_num,
+        "title": title,
+        "link": link,
+        "img_url": "",
+        "alt_text": "",
+    }
+
+
+def _apply_comic_info(comic, data):
+    """Fill img_url / alt_text / title from the JSON API, or the feed entry."""
+    if not comic["comic_num"]:
+        return
+    if data is not None:
+        comic["img_url"] = data.get("img", "")
+        comic["alt_text"] = data.get("alt", "")
+        comic["title"] = data.get("safe_title", comic["title"])
+        return
+
+    # Fallback: parse from feed entry summary
+    summary = comic["entry"].get("summary", "")
+    img_match = re.search(r'src="([^"]+)"', summary)
+    if img_match:
+        comic["img_url"] = img_match.group(1)
+    alt_match = re.search(r'alt="([^"]*)"', summary)
+    if alt_match:
+        comic["alt_text"] = alt_match.group(1)
+
+
+def _finish(comic, img_bytes, output_dir, assets_dir, state_file):
+    """Save the downloaded image, update state and build the result."""
+    comic_num = comic["comic_num"]
+    img_url = comic["img_url"]
 
-    # Download the image
     img_path = ""
-    if img_url:
+    if img_url and img_bytes is not None:
         try:
             ext = os.path.splitext(img_url.split("?")[0])[1] or ".png"
             filename = f"xkcd-{comic_num}{ext}" if comic_num else f"xkcd-latest{ext}"
             save_path = os.path.join(output_dir, filename)
             os.makedirs(output_dir, exist_ok=True)
-            resp = requests.get(img_url, timeout=15)
-            resp.raise_for_status()
-            img_bytes = resp.content
 
             # Save to output_dir (primary copy)
             with open(save_path, "wb") as f:
@@ -139,23 +225,23 @@ def fetch(feed_url="https://www.xkcd.com/atom.xml",
                 img_path = os.path.abspath(save_path)
         except Exception as e:
             img_path = ""
-            print(f"[xkcd] image download failed: {e}", file=sys.stderr)
+            print(f"[xkcd] image save failed: {e}", file=sys.stderr)
 
     # Update state
     if state_file and comic_num:
-        os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
-        with open(state_file, "w") as f:
-            json.dump({"comic_num": comic_num, "fetched_at": datetime.now(timezone.utc).isoformat()}, f)
+        with StateStore.open(state_file).transaction() as tx:
+            tx.put("xkcd", "comic_num", comic_num)
+            tx.put("xkcd", "fetched_at", datetime.now(timezone.utc).isoformat())
 
     return {
         "source": "xkcd",
         "new": True,
         "comic_num": comic_num,
-        "title": title,
-        "alt_text": alt_text,
+        "title": comic["title"],
+        "alt_text": comic["alt_text"],
         "img_url": img_url,
         "img_path": img_path,
-        "link": link
+        "link": comic["link"]
     }
 
 
@@ -166,19 +252,30 @@ if __name__ == "__main__":
     parser.add_argument("--output-dir", default=".", help="Dir to save comic PNG")
     parser.add_argument("--assets-dir", default=None,
                         help="Dir where the Typst template lives; image is copied here as xkcd_latest.png")
-    parser.add_argument("--state-file", help="Track last-seen comic number")
+    parser.add_argument("--state-file", help="State database tracking the last-seen comic number")
     parser.add_argument("--max-age", type=int, default=48, help="Max comic age in hours")
     parser.add_argument("--output", "-o", help="JSON output file (default: stdout)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Write the result as a single NDJSON summary record")
     args = parser.parse_args()
 
     try:
-        result = fetch(
+        kwargs = dict(
             feed_url=args.url,
             output_dir=args.output_dir,
             assets_dir=args.assets_dir,
             state_file=args.state_file,
             max_age_hours=args.max_age
         )
+        if args.ndjson:
+            if args.output:
+                with open(args.output, "w") as f:
+                    write_records(stream(**kwargs), f)
+            else:
+                write_records(stream(**kwargs), sys.stdout)
+            sys.exit(0)
+
+        result = fetch(**kwargs)
         out = json.dumps(result, indent=2, ensure_ascii=False)
         if args.output:
             with open(args.output, "w") as f:
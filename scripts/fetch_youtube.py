@@ -16,9 +16,11 @@ import re
 import sys
 from datetime import datetime, timezone, timedelta
 from time import mktime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from _util import parse_feed
+import _aio
+from _trace import span, submit
+from _util import (parse_feed, rate_limit, until_deadline, item_record, summary_record,
+                   write_records, abandon, exit_process, thread_pool)
 
 
 YT_FEED_BASE = "https://www.youtube.com/feeds/videos.xml?channel_id="
@@ -26,12 +28,32 @@ YT_FEED_BASE = "https://www.youtube.com/feeds/videos.xml?channel_id="
 
 def _check_one_channel(ch, cutoff):
     """Check a single channel for new videos. Called in parallel."""
+    with span("channel", channel=ch["name"]):
+        try:
+            feed = parse_feed(YT_FEED_BASE + ch["id"])
+        except Exception as e:
+            return {"channel": ch["name"], "channel_id": ch["id"],
+                    "error": str(e), "videos": []}
+        return _channel_result(ch, feed, cutoff)
+
+
+async def _check_one_channel_async(ch, cutoff):
+    """Async _check_one_channel for the asyncio engine."""
+    with span("channel", channel=ch["name"]):
+        try:
+            feed = await _aio.parse_feed(YT_FEED_BASE + ch["id"])
+        except Exception as e:
+            return {"channel": ch["name"], "channel_id": ch["id"],
+                    "error": str(e), "videos": []}
+        return _channel_result(ch, feed, cutoff)
+
+
+def _channel_result(ch, feed, cutoff):
+    """Collect videos newer than cutoff from a channel's parsed feed."""
     name = ch["name"]
     cid = ch["id"]
-    feed_url = YT_FEED_BASE + cid
 
     try:
-        feed = parse_feed(feed_url)
         new_videos = []
 
         for entry in feed.entries:
@@ -69,25 +91,103 @@ def check_channels(channels, max_age_hours=24):
     now = datetime.now(timezone.utc)
     cutoff = now - timedelta(hours=max_age_hours)
     results = []
+    checked = set()
 
-    with ThreadPoolExecutor(max_workers=min(len(channels), 8)) as pool:
-        futures = {pool.submit(_check_one_channel, ch, cutoff): ch for ch in channels}
-        for future in as_completed(futures):
+    # Channels still unchecked at the run deadline are dropped
+    pool = thread_pool(min(len(channels), 8), "youtube")
+    futures = {submit(pool, _check_one_channel, ch, cutoff): ch for ch in channels}
+    for future in until_deadline(futures):
+        checked.add(future)
+        result = future.result()
+        if result is not None:
+            results.append(result)
+    abandon(pool)
+
+    dropped = [ch["name"] for f, ch in futures.items() if f not in checked]
+    return _summary(now, results, dropped)
+
+
+async def check_channels_async(channels, max_age_hours=24):
+    """Async check_channels: every channel feed is scheduled on the engine loop."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=max_age_hours)
+    found = await _aio.until_deadline([_check_one_channel_async(ch, cutoff) for ch in channels])
+    dropped = [ch["name"] for ch, r in zip(channels, found) if r is _aio.DROPPED]
+    return _summary(now, [r for r in found if r is not None and r is not _aio.DROPPED], dropped)
+
+
+def stream(channels, max_age_hours=24):
+    """Yield NDJSON records: each channel with new videos as soon as it is checked.
+
+    "index" is the channel's position in check_channels() output order
+    (sorted by name), so sorting the records by it restores that order.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=max_age_hours)
+    by_name = sorted(range(len(channels)), key=lambda i: channels[i]["name"])
+    rank = {i: r for r, i in enumerate(by_name)}
+    results = []
+    checked = set()
+    futures = {}
+
+    if channels:
+        pool = thread_pool(min(len(channels), 8), "youtube")
+        futures = {submit(pool, _check_one_channel, ch, cutoff): i
+                   for i, ch in enumerate(channels)}
+        for future in until_deadline(futures):
+            checked.add(future)
             result = future.result()
             if result is not None:
                 results.append(result)
+                yield item_record("youtube", rank[futures[future]], result)
+        abandon(pool)
 
+    dropped = [channels[i]["name"] for f, i in futures.items() if f not in checked]
+    yield summary_record(_summary(now, results, dropped), "channels")
+
+
+def _summary(now, results, dropped=()):
     # Sort by channel name for stable output
     results.sort(key=lambda r: r["channel"])
 
     total = sum(len(r.get("videos", [])) for r in results)
-    return {
+    summary = {
         "source": "youtube",
         "fetched_at": now.isoformat(),
         "total_new_videos": total,
         "channels_with_new": len([r for r in results if r.get("videos")]),
         "channels": results
     }
+    if dropped:
+        summary["partial"] = True
+        summary["dropped"] = list(dropped)
+    return summary
+
+
+def clean_vtt(raw):
+    """Flatten a WebVTT subtitle file to plain text, dropping repeated lines.
+
+    Auto-generated captions repeat each line across overlapping cues, so
+    consecutive duplicates are collapsed.
+    """
+    lines = []
+    for line in raw.split("\n"):
+        line = line.strip()
+        if not line or line.startswith("WEBVTT") or "-->" in line:
+            continue
+        if re.match(r'^\d+$', line):
+            continue
+        line = re.sub(r'<[^>]+>', '', line)
+        if line:
+            lines.append(line)
+
+    deduped = []
+    for line in lines:
+        if not deduped or line != deduped[-1]:
+            deduped.append(line)
+
+    text = " ".join(deduped)
+    return re.sub(r'\s+', ' ', text).strip()
 
 
 def fetch_transcript(video_url):
@@ -101,7 +201,8 @@ def fetch_transcript(video_url):
     try:
         from youtube_transcript_api import YouTubeTranscriptApi
         api = YouTubeTranscriptApi()
-        transcript = api.fetch(video_id)
+        with rate_limit(video_url):
+            transcript = api.fetch(video_id)
         text = " ".join(snippet.text for snippet in transcript.snippets)
         text = re.sub(r'\s+', ' ', text).strip()
     except ImportError:
@@ -112,12 +213,13 @@ def fetch_transcript(video_url):
 
         with tempfile.TemporaryDirectory() as tmpdir:
             out_path = os.path.join(tmpdir, "subs")
-            subprocess.run(
-                ["yt-dlp", "--write-auto-sub", "--sub-lang", "en",
-                 "--skip-download", "--sub-format", "vtt",
-                 "-o", out_path, video_url],
-                capture_output=True, text=True, timeout=30
-            )
+            with rate_limit(video_url):
+                subprocess.run(
+                    ["yt-dlp", "--write-auto-sub", "--sub-lang", "en",
+                     "--skip-download", "--sub-format", "vtt",
+                     "-o", out_path, video_url],
+                    capture_output=True, text=True, timeout=30
+                )
 
             vtt_file = None
             for f in os.listdir(tmpdir):
@@ -129,26 +231,7 @@ def fetch_transcript(video_url):
                 raise RuntimeError("No transcript available (tried youtube-transcript-api and yt-dlp)")
 
             with open(vtt_file) as f:
-                raw = f.read()
-
-            lines = []
-            for line in raw.split("\n"):
-                line = line.strip()
-                if not line or line.startswith("WEBVTT") or "-->" in line:
-                    continue
-                if re.match(r'^\d+$', line):
-                    continue
-                line = re.sub(r'<[^>]+>', '', line)
-                if line:
-                    lines.append(line)
-
-            deduped = []
-            for line in lines:
-                if not deduped or line != deduped[-1]:
-                    deduped.append(line)
-
-            text = " ".join(deduped)
-            text = re.sub(r'\s+', ' ', text).strip()
+                text = clean_vtt(f.read())
 
     return {
         "source": "youtube_transcript",
@@ -169,6 +252,8 @@ if __name__ == "__main__":
     ch_parser.add_argument("--config", required=True, help="Path to sources.json")
     ch_parser.add_argument("--max-age", type=int, default=24, help="Max video age in hours")
     ch_parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    ch_parser.add_argument("--ndjson", action="store_true",
+                           help="Stream one JSON record per channel as it is checked")
 
     # Subcommand: transcript
     tr_parser = sub.add_parser("transcript", help="Get transcript for a video")
@@ -183,6 +268,14 @@ if __name__ == "__main__":
                 config = json.load(f)
             channels = config.get("sources", {}).get("youtube", {}).get("channels", [])
             max_age = args.max_age or config.get("sources", {}).get("youtube", {}).get("max_age_hours", 24)
+            if args.ndjson:
+                records = stream(channels, max_age_hours=max_age)
+                if args.output:
+                    with open(args.output, "w") as f:
+                        write_records(records, f)
+                else:
+                    write_records(records, sys.stdout)
+                exit_process(0)
             result = check_channels(channels, max_age_hours=max_age)
         elif args.command == "transcript":
             result = fetch_transcript(args.url)
@@ -196,4 +289,5 @@ if __name__ == "__main__":
 
     except Exception as e:
         print(json.dumps({"source": "youtube", "error": str(e)}), file=sys.stderr)
-        sys.exit(1)
+        exit_process(1)
+    exit_process(0)
@@ -0,0 +1,57 @@
+"""Make the flat scripts/ modules importable, as the fetchers themselves do."""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+
+if str(SCRIPTS) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS))
+
+import _util  # noqa: E402
+
+
+class Session:
+    """Stand-in for the shared requests session, counting GETs per URL.
+
+    pages maps URL to (content type, body); error is raised by every GET.
+    """
+
+    def __init__(self, pages=None, error=None):
+        self.pages = pages or {}
+        self.error = error
+        self.calls = {}
+
+    def get(self, url, timeout=None, **kwargs):
+        self.calls[url] = self.calls.get(url, 0) + 1
+        if self.error is not None:
+            raise self.error
+        resp = requests.Response()
+        resp.url = url
+        if url not in self.pages:
+            resp.status_code = 404
+            resp._content = b""
+            return resp
+        content_type, body = self.pages[url]
+        resp.status_code = 200
+        resp.headers["content-type"] = content_type
+        resp.raw = io.BytesIO(body)
+        return resp
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    """Install a Session in _util with fresh HTTP settings; returns an installer."""
+    monkeypatch.setattr(_util, "_http_config", None)
+    monkeypatch.setattr(_util, "_feed_cache", None)
+    monkeypatch.setattr(_util, "_memo", {})
+
+    def install(**kwargs):
+        session = Session(**kwargs)
+        monkeypatch.setattr(_util, "get_session", lambda: session)
+        return session
+    return install
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+
+import feedparser
+import pytest
+
+import fetch_arxiv
+
+
+def _feed(category, papers, built="Fri, 16 Oct 2026 04:00:00 +0000"):
+    """A parsed rss.arxiv.org-style feed; papers are (id, [categories]) pairs."""
+    items = "".join(
+        f"<item><title>Paper {pid}</title><link>https://arxiv.org/abs/{pid}</link>"
+        f"<guid>oai:arXiv.org:{pid}v1</guid><description>About {pid}.</description>"
+        + "".join(f"<category>{c}</category>" for c in cats) + "</item>"
+        for pid, cats in papers)
+    return feedparser.parse(
+        f'<?xml version="1.0"?><rss version="2.0"><channel><title>{category}</title>'
+        f"<pubDate>{built}</pubDate>{items}</channel></rss>")
+
+
+AI = _feed("cs.AI", [("2610.00001", ["cs.AI"]), ("2610.00002", ["cs.AI", "cs.CL"])])
+CL = _feed("cs.CL", [("2610.00002", ["cs.CL"]), ("2610.00003", ["cs.CL", "cs.LG"])])
+LG = _feed("cs.LG", [("2610.00003", ["cs.LG", "stat.ML"]), ("2610.00004", ["cs.LG"])])
+
+
+@pytest.mark.parametrize("entry", [
+    {"id": "oai:arXiv.org:2410.12345v2"},
+    {"link": "https://arxiv.org/abs/2410.12345"},
+    {"link": "http://arxiv.org/pdf/2410.12345v3"},
+])
+def test_arxiv_id_ignores_version_and_link_format(entry):
+    assert fetch_arxiv.arxiv_id(entry) == "2410.12345"
+
+
+def test_arxiv_id_old_style_and_fallback():
+    assert fetch_arxiv.arxiv_id({"link": "https://arxiv.org/abs/cs/0112017v1"}) == "cs/0112017"
+    assert fetch_arxiv.arxiv_id({"link": "https://example.org/x"}) == "https://example.org/x"
+
+
+def test_merge_keeps_one_item_per_paper_in_first_position():
+    result = fetch_arxiv._merge([], [AI, CL, LG], None)
+    assert [i["arxiv_id"] for i in result["items"]] == [
+        "2610.00001", "2610.00002", "2610.00003", "2610.00004"]
+    assert result["count"] == 4
+
+
+def test_merge_unions_categories_of_cross_listings():
+    items = {i["arxiv_id"]: i for i in fetch_arxiv._merge([], [AI, CL, LG], None)["items"]}
+    assert items["2610.00002"]["categories"] == ["cs.AI", "cs.CL"]
+    assert items["2610.00003"]["categories"] == ["cs.CL", "cs.LG", "stat.ML"]
+
+
+def test_merge_applies_count_after_dedupe():
+    result = fetch_arxiv._merge([], [AI, CL], 3)
+    assert [i["arxiv_id"] for i in result["items"]] == ["2610.00001", "2610.00002", "2610.00003"]
+
+
+def test_merge_reports_dropped_feeds():
+    result = fetch_arxiv._merge(["a", "b"], [AI], None, dropped=["b"])
+    assert result["partial"] is True
+    assert result["dropped"] == ["b"]
+
+
+def test_fetch_merges_in_url_order(monkeypatch):
+    feeds = {"ai": AI, "cl": CL, "lg": LG}
+    monkeypatch.setattr(fetch_arxiv, "parse_feed", feeds.__getitem__)
+    result = fetch_arxiv.fetch(["lg", "cl", "ai"])
+    assert [i["arxiv_id"] for i in result["items"]] == [
+        "2610.00003", "2610.00004", "2610.00002", "2610.00001"]
+
+
+def test_last_update_skips_weekends():
+    saturday = datetime(2026, 10, 17, 15, tzinfo=timezone.utc)
+    assert fetch_arxiv.last_update(saturday) == "2026-10-16"
+    monday = datetime(2026, 10, 19, 15, tzinfo=timezone.utc)
+    assert fetch_arxiv.last_update(monday) == "2026-10-19"
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_arxiv, "last_update", lambda now=None: "2026-10-16")
+    return str(tmp_path / ".state.db")
+
+
+def _serve(monkeypatch, feeds):
+    """Serve feeds by URL in place of parse_feed; returns the URLs requested."""
+    calls = []
+
+    def parse_feed(url):
+        calls.append(url)
+        return feeds[url]
+
+    monkeypatch.setattr(fetch_arxiv, "parse_feed", parse_feed)
+    return calls
+
+
+def test_same_cycle_is_served_from_state(state_file, monkeypatch):
+    calls = _serve(monkeypatch, {"ai": AI, "cl": CL})
+    first = fetch_arxiv.fetch(["ai", "cl"], state_file=state_file)
+    second = fetch_arxiv.fetch(["ai", "cl"], state_file=state_file)
+    assert calls == ["ai", "cl"]
+    assert second["cached"] is True
+    assert second["items"] == first["items"]
+
+
+def test_unchanged_feeds_reuse_the_stored_result(state_file, monkeypatch):
+    old = _feed("cs.AI", [("2610.00001", ["cs.AI"])], built="Thu, 15 Oct 2026 04:00:00 +0000")
+    calls = _serve(monkeypatch, {"ai": old})
+    fetch_arxiv.fetch(["ai"], state_file=state_file)
+    # Still yesterday's build, so the next run asks again and gets the same IDs
+    assert fetch_arxiv.fetch(["ai"], state_file=state_file)["cached"] is True
+    assert calls == ["ai", "ai"]
+
+
+def test_papers_from_an_earlier_edition_are_flagged(state_file, monkeypatch):
+    _serve(monkeypatch, {"ai": _feed("cs.AI", [("2610.00001", ["cs.AI"])],
+                                     built="Thu, 15 Oct 2026 04:00:00 +0000")})
+    fetch_arxiv.fetch(["ai"], state_file=state_file)
+    _serve(monkeypatch, {"ai": _feed("cs.AI", [("2610.00001", ["cs.AI"]),
+                                               ("2610.00005", ["cs.AI"])])})
+    items = {i["arxiv_id"]: i for i in fetch_arxiv.fetch(["ai"], state_file=state_file)["items"]}
+    assert items["2610.00001"]["previously_seen"] is True
+    assert items["2610.00001"]["first_seen"] == "2026-10-15"
+    assert "previously_seen" not in items["2610.00005"]
+
+
+def test_stream_stores_merged_categories(state_file, monkeypatch):
+    _serve(monkeypatch, {"ai": AI, "cl": CL, "lg": LG})
+    records = list(fetch_arxiv.stream(["ai", "cl", "lg"], state_file=state_file))
+    streamed = {r["item"]["arxiv_id"]: r["item"] for r in records if r["type"] == "item"}
+    # Streamed items carry their first listing's categories ...
+    assert streamed["2610.00003"]["categories"] == ["cs.CL", "cs.LG"]
+    # ... but the result fetch() serves for the rest of the cycle has them all
+    cached = fetch_arxiv.fetch(["ai", "cl", "lg"], state_file=state_file)
+    assert cached["cached"] is True
+    items = {i["arxiv_id"]: i for i in cached["items"]}
+    assert items["2610.00003"]["categories"] == ["cs.CL", "cs.LG", "stat.ML"]
+    assert items["2610.00002"]["categories"] == ["cs.AI", "cs.CL"]
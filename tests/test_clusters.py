@@ -0,0 +1,74 @@
+import pytest
+
+import _clusters
+import _relevance
+
+pytestmark = pytest.mark.skipif(not _relevance.available(), reason="needs numpy")
+
+
+def _set(n, start=0):
+    return {f"word{i}" for i in range(start, start + n)}
+
+
+def test_signature_agreement_estimates_jaccard():
+    a, b, c = _set(100), _set(100, start=50), _set(100, start=1000)
+    sig = _clusters.signatures([a, a, b, c])
+    assert sig.shape == (4, _clusters.NUM_PERM)
+    assert (sig[0] == sig[1]).all()
+    # True Jaccard of a and b is 50/150
+    assert (sig[0] == sig[2]).mean() == pytest.approx(1 / 3, abs=0.15)
+    assert (sig[0] == sig[3]).mean() < 0.1
+
+
+def test_candidate_pairs_find_duplicates_only():
+    sets = [_set(30), _set(30, start=100), _set(30), _set(30, start=200)]
+    pairs = _clusters.candidate_pairs(_clusters.signatures(sets))
+    assert {tuple(sorted(p)) for p in pairs} == {(0, 2)}
+
+
+def test_similarity_uses_overlap_of_the_smaller_set():
+    small, big = _set(10), _set(40)
+    sig = _clusters.signatures([small, big])
+    assert _clusters._similarity(sig, [10, 40], 0, 1) == pytest.approx(1.0, abs=0.15)
+
+
+def test_short_sets_need_jaccard():
+    sig = _clusters.signatures([_set(2), _set(40)])
+    assert _clusters._similarity(sig, [2, 40], 0, 1) == 0.0
+
+
+def _results():
+    launch = "Acme launches Widget 2 with offline sync, local AI models and a new plugin API"
+    return {
+        "hackernews": {"items": [
+            {"title": "Acme launches Widget 2", "body_md": launch + " " + "x " * 50,
+             "link": "https://acme.example/blog/widget-2"},
+            {"title": "Show HN: A tiny Forth interpreter in 500 lines of C",
+             "body_md": "", "link": "https://forth.example/"},
+        ]},
+        "techmeme": {"items": [
+            {"headline": launch, "blurb": "", "link": "https://news.example/acme-widget"},
+        ]},
+        "producthunt": {"items": [
+            {"name": "Widget 2", "tagline": "Offline sync",
+             "link": "https://acme.example/blog/widget-2?utm_source=ph"},
+        ]},
+    }
+
+
+def test_build_groups_the_same_story():
+    clusters = _clusters.build(_results())
+    assert clusters["items"] == 4
+    assert len(clusters["clusters"]) == 1
+    cluster = clusters["clusters"][0]
+    # The item with the most text is canonical
+    assert cluster["canonical"]["source"] == "hackernews"
+    assert cluster["canonical"]["index"] == 0
+    members = {(m["source"], m["index"]): m["similarity"] for m in cluster["members"]}
+    assert set(members) == {("techmeme", 0), ("producthunt", 0)}
+    # Product Hunt only matches through the shared canonical link
+    assert members["producthunt", 0] == 1.0
+
+
+def test_build_with_no_items():
+    assert _clusters.build({"hackernews": {"items": []}})["clusters"] == []
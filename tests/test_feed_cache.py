@@ -0,0 +1,135 @@
+import json
+import os
+import time
+
+import pytest
+import requests
+
+import _httpcache
+import _util
+
+FEED = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><title>One</title><link>https://example.org/1</link></item>
+<item><title>Two</title><link>https://example.org/2</link></item>
+</channel></rss>"""
+URL = "https://example.org/feed.xml"
+
+
+def _response(status, body=b"", headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp.headers.update(headers or {})
+    resp.url = URL
+    return resp
+
+
+class Server:
+    """Stand-in for http_get: answers 304 to a matching If-None-Match."""
+
+    def __init__(self, always_304=False):
+        self.always_304 = always_304
+        self.requests = []
+
+    def __call__(self, url, timeout=30, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        if self.always_304 or headers.get("If-None-Match") == '"v1"':
+            return _response(304)
+        return _response(200, FEED, {"ETag": '"v1"'})
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(_util, "_http_config", None)
+    monkeypatch.setattr(_util, "_feed_cache", None)
+    _util.configure_http(cache_dir=str(tmp_path))
+    server = Server()
+    monkeypatch.setattr(_util, "http_get", server)
+    return server
+
+
+def _titles(feed):
+    return [e.title for e in feed.entries]
+
+
+def test_304_serves_the_cached_feed(server):
+    assert _titles(_util._parse_feed(URL, 10)) == ["One", "Two"]
+    assert _titles(_util._parse_feed(URL, 10)) == ["One", "Two"]
+    assert server.requests == [{}, {"If-None-Match": '"v1"'}]
+
+
+def test_304_reparses_the_body_without_a_parsed_copy(server, tmp_path):
+    _util._parse_feed(URL, 10)
+    for name in os.listdir(tmp_path):
+        if name.endswith(".feed"):
+            os.remove(tmp_path / name)
+    assert _titles(_util._parse_feed(URL, 10)) == ["One", "Two"]
+    assert len(server.requests) == 2
+
+
+def test_parsed_feed_is_stored_as_json(server, tmp_path):
+    feed = _util._parse_feed(URL, 10)
+    cache = _httpcache.FeedCache(str(tmp_path))
+    with open(cache._path(URL, "feed")) as f:
+        json.load(f)
+    cached = cache.parsed(URL)
+    assert cached.entries[0].title == "One"
+    assert cached.feed.title == feed.feed.title
+
+
+def test_unreadable_parsed_copy_is_ignored(server, tmp_path):
+    _util._parse_feed(URL, 10)
+    cache = _httpcache.FeedCache(str(tmp_path))
+    with open(cache._path(URL, "feed"), "wb") as f:
+        f.write(b"\x80\x04not json")
+    assert cache.parsed(URL) is None
+    assert _titles(_util._parse_feed(URL, 10)) == ["One", "Two"]
+
+
+def test_304_with_nothing_cached_refetches(server, tmp_path):
+    _util._parse_feed(URL, 10)
+    for name in os.listdir(tmp_path):
+        if not name.endswith(".json"):
+            os.remove(tmp_path / name)
+    assert _titles(_util._parse_feed(URL, 10)) == ["One", "Two"]
+    # The retry carries no validators
+    assert server.requests[1:] == [{"If-None-Match": '"v1"'}, {"Cache-Control": "no-cache"}]
+    assert len(server.requests) == 3
+
+
+def test_repeated_304_with_nothing_cached_raises(server):
+    server.always_304 = True
+    with pytest.raises(requests.HTTPError):
+        _util._parse_feed(URL, 10)
+
+
+def test_fresh_entry_skips_the_network(server, monkeypatch):
+    _util.configure_http(cache_ttl=60)
+    _util._parse_feed(URL, 10)
+    _util._parse_feed(URL, 10)
+    assert server.requests == [{}]
+
+
+def test_evicts_at_most_once_per_interval(tmp_path, monkeypatch):
+    cache = _httpcache.FeedCache(str(tmp_path))
+    calls = []
+    monkeypatch.setattr(cache, "evict", lambda: calls.append(1))
+    for i in range(5):
+        cache.store(f"https://example.org/{i}", FEED, {})
+    assert len(calls) == 1
+    cache._next_evict = 0
+    cache.store(URL, FEED, {})
+    assert len(calls) == 2
+
+
+def test_evict_drops_oldest_over_max_bytes(tmp_path):
+    cache = _httpcache.FeedCache(str(tmp_path), max_bytes=25000)
+    for i in range(3):
+        url = f"https://example.org/{i}"
+        cache.store(url, b"x" * 10000, {})
+        stamp = time.time() - 10 + i
+        os.utime(cache._path(url, "json"), (stamp, stamp))
+    cache.evict()
+    assert cache.load("https://example.org/0") is None
+    assert cache.load("https://example.org/2") is not None
@@ -0,0 +1,220 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fetch_batch
+from _health import Breakers
+
+FEED_URL = "https://hn.example/rss"
+STORIES = 9
+
+
+def _hn_pages():
+    items = "".join(
+        f"<item><title>Story {i}</title><link>https://site{i}.example/post</link>"
+        f"<comments>https://news.ycombinator.com/item?id={i}</comments></item>"
+        for i in range(STORIES))
+    pages = {FEED_URL: ("application/rss+xml",
+                        f'<?xml version="1.0"?><rss version="2.0"><channel><title>HN</title>'
+                        f"{items}</channel></rss>".encode())}
+    for i in range(STORIES):
+        pages[f"https://site{i}.example/post"] = (
+            "text/html",
+            f"<html><body><article><p>{'Story %d text. ' % i * 20}</p></article>"
+            f"</body></html>".encode())
+    return pages
+
+
+def _reader(tmp_path, name, sources, **extra):
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps(dict({"sources": sources}, **extra)))
+    return f"{name}={path}"
+
+
+def _hn(count):
+    return {"hackernews": {"enabled": True, "url": FEED_URL, "count": count,
+                           "follow_links": True}}
+
+
+def _youtube(channels, max_age_hours):
+    return {"youtube": {"enabled": True, "max_age_hours": max_age_hours,
+                        "channels": [{"name": c, "id": f"id-{c}"} for c in channels]}}
+
+
+def _readers(tmp_path, **configs):
+    return {name: (str(tmp_path / f"{name}.json"), config) for name, config in configs.items()}
+
+
+def test_plan_merges_identical_jobs_across_readers(tmp_path):
+    root = str(tmp_path)
+    readers = _readers(tmp_path,
+                       alice={"sources": dict(_hn(5), techmeme={"enabled": True})},
+                       bob={"sources": _hn(5)},
+                       carol={"sources": _hn(9)})
+    jobs = fetch_batch.plan(readers, root)
+
+    assert sorted(jobs) == ["hackernews", "hackernews-2", "techmeme"]
+    shared = jobs["hackernews"]
+    assert [t["reader"] for t in shared["targets"]] == ["alice", "bob"]
+    assert shared["output_file"] == os.path.join(root, ".batch", "hackernews.json")
+    # Readers share one article cache so their kwargs still match
+    assert shared["call"][2]["article_cache"] == os.path.join(root, ".hn_article_cache.json")
+    # Single-reader jobs write straight into the reader's directory
+    assert jobs["hackernews-2"]["output_file"] == os.path.join(root, "carol", "hackernews.json")
+    assert jobs["techmeme"]["output_file"] == os.path.join(root, "alice", "techmeme.json")
+
+
+def test_plan_leaves_out_sources_allow_rejects(tmp_path):
+    readers = _readers(tmp_path, alice={"sources": _hn(5)}, bob={"sources": _hn(5)})
+    jobs = fetch_batch.plan(readers, str(tmp_path), lambda reader, source: reader == "bob")
+    assert [t["reader"] for t in jobs["hackernews"]["targets"]] == ["bob"]
+
+
+def test_plan_unions_youtube_channels(tmp_path):
+    readers = _readers(tmp_path,
+                       alice={"sources": _youtube(["a", "b"], 24)},
+                       bob={"sources": _youtube(["b", "c"], 48)})
+    jobs = fetch_batch.plan(readers, str(tmp_path))
+
+    assert list(jobs) == ["youtube"]
+    _module, _func, kwargs = jobs["youtube"]["call"]
+    assert [ch["id"] for ch in kwargs["channels"]] == ["id-a", "id-b", "id-c"]
+    assert kwargs["max_age_hours"] == 48
+    assert jobs["youtube"]["output_file"] == os.path.join(str(tmp_path), ".batch", "youtube.json")
+    assert [t["reader"] for t in jobs["youtube"]["targets"]] == ["alice", "bob"]
+
+
+def _youtube_result(now):
+    def video(hours):
+        return {"title": f"{hours}h", "published": (now - timedelta(hours=hours)).isoformat()}
+    return {
+        "source": "youtube",
+        "fetched_at": now.isoformat(),
+        "channels": [
+            {"channel": "a", "channel_id": "id-a", "videos": [video(1), video(30)]},
+            {"channel": "b", "channel_id": "id-b", "videos": [video(40)]},
+            {"channel": "c", "channel_id": "id-c", "error": "timeout"},
+        ],
+        "dropped": ["c"],
+    }
+
+
+def test_youtube_for_keeps_one_readers_channels_and_age():
+    now = datetime.now(timezone.utc)
+    data = _youtube_result(now)
+
+    alice = fetch_batch._youtube_for(data, _youtube(["a", "b"], 24)["youtube"])
+    assert [c["channel"] for c in alice["channels"]] == ["a"]
+    assert [v["title"] for v in alice["channels"][0]["videos"]] == ["1h"]
+    assert alice["channels"][0]["new_video_count"] == 1
+    assert alice["total_new_videos"] == 1
+    assert "partial" not in alice
+
+    bob = fetch_batch._youtube_for(data, _youtube(["b", "c"], 48)["youtube"])
+    assert [c["channel"] for c in bob["channels"]] == ["b", "c"]
+    assert bob["partial"] and bob["dropped"] == ["c"]
+
+
+def test_distribute_copies_to_every_other_target(tmp_path):
+    job_file = tmp_path / ".batch" / "hackernews.json"
+    job_file.parent.mkdir()
+    job_file.write_text('{"items": []}')
+    targets = [{"reader": r, "output_file": str(tmp_path / f"{r}.json"), "kwargs": {}}
+               for r in ("alice", "bob")]
+    fetch_batch._distribute({"source": "hackernews", "output_file": str(job_file),
+                             "targets": targets})
+    for r in ("alice", "bob"):
+        assert (tmp_path / f"{r}.json").read_text() == '{"items": []}'
+
+
+def test_distribute_cuts_youtube_per_reader(tmp_path):
+    job_file = tmp_path / "youtube.json"
+    job_file.write_text(json.dumps(_youtube_result(datetime.now(timezone.utc))))
+    targets = [{"reader": r, "output_file": str(tmp_path / f"{r}.json"),
+                "kwargs": _youtube(channels, 48)["youtube"]}
+               for r, channels in (("alice", ["a"]), ("bob", ["b"]))]
+    fetch_batch._distribute({"source": "youtube", "output_file": str(job_file),
+                             "targets": targets})
+    for r, channel in (("alice", "a"), ("bob", "b")):
+        with open(tmp_path / f"{r}.json") as f:
+            assert [c["channel"] for c in json.load(f)["channels"]] == [channel]
+
+
+def test_merge_http_combines_readers(tmp_path):
+    readers = _readers(
+        tmp_path,
+        alice={"http": {"retries": 2, "rate_limits": {"a.example": {"rate": 1}}}},
+        bob={"http": {"retries": 2, "rate_limits": {"b.example": {"rate": 5}}}})
+    http = fetch_batch._merge_http(readers, str(tmp_path))
+    assert http["retries"] == 2
+    assert http["rate_limits"] == {"a.example": {"rate": 1}, "b.example": {"rate": 5}}
+    assert http["cache_dir"] == f"{tmp_path}/.http_cache"
+
+
+@pytest.mark.parametrize("alice, bob, where", [
+    ({"retries": 2}, {"retries": 3}, "retries"),
+    ({"rate_limits": {"a.example": {"rate": 1}}},
+     {"rate_limits": {"a.example": {"rate": 2}}}, "rate_limits['a.example']"),
+])
+def test_merge_http_rejects_conflicts(tmp_path, alice, bob, where):
+    readers = _readers(tmp_path, alice={"http": alice}, bob={"http": bob})
+    message = f"'alice' and 'bob' disagree on http setting {where}"
+    with pytest.raises(ValueError, match=re.escape(message)):
+        fetch_batch._merge_http(readers, str(tmp_path))
+
+
+def test_open_breaker_skips_only_that_reader(tmp_path, fake_session):
+    fake_session(pages=_hn_pages())
+    out = tmp_path / "out"
+    (out / "alice").mkdir(parents=True)
+    breakers = Breakers(str(out / "alice" / ".health.json"), threshold=1)
+    breakers.record("hackernews", False, "boom")
+    breakers.save()
+
+    readers = [_reader(tmp_path, "alice", _hn(5), breaker={"threshold": 1}),
+               _reader(tmp_path, "bob", _hn(5), breaker={"threshold": 1})]
+    manifest = fetch_batch.fetch_batch(readers, str(out))
+    assert manifest["jobs"]["hackernews"]["readers"] == ["bob"]
+
+    def results(reader):
+        with open(out / reader / "manifest.json") as f:
+            return json.load(f)["results"]["hackernews"]
+    assert results("alice")["skipped"] and not results("alice")["success"]
+    assert results("alice")["breaker"]["state"] == "open"
+    assert results("bob")["success"]
+    assert not (out / "alice" / "hackernews.json").exists()
+
+
+def test_reader_manifest_records_relevance(tmp_path, fake_session):
+    fake_session(pages=_hn_pages())
+    interests = tmp_path / "interests.md"
+    interests.write_text("Story text\n")
+    readers = [_reader(tmp_path, "alice", _hn(5), interests=str(interests)),
+               _reader(tmp_path, "bob", _hn(5))]
+    fetch_batch.fetch_batch(readers, str(tmp_path / "out"))
+
+    def manifest(reader):
+        with open(tmp_path / "out" / reader / "manifest.json") as f:
+            return json.load(f)
+    assert manifest("alice")["relevance"] == {"interests": str(interests), "scored": 5}
+    assert manifest("bob")["relevance"] is None
+
+
+def test_overlapping_hn_readers_download_each_url_once(tmp_path, fake_session):
+    session = fake_session(pages=_hn_pages())
+    readers = [_reader(tmp_path, "alice", _hn(5)), _reader(tmp_path, "bob", _hn(STORIES))]
+    manifest = fetch_batch.fetch_batch(readers, str(tmp_path / "out"))
+
+    # Different counts make two jobs, but every URL is requested once
+    assert len(manifest["jobs"]) == 2
+    assert set(session.calls) == set(_hn_pages())
+    assert all(n == 1 for n in session.calls.values()), session.calls
+
+    for name, count in (("alice", 5), ("bob", STORIES)):
+        with open(tmp_path / "out" / name / "hackernews.json") as f:
+            items = json.load(f)["items"]
+        assert len(items) == count
+        assert all(item["body_md"] for item in items)
@@ -0,0 +1,103 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import _aio
+import fetch_all
+import fetch_github_trending as gh
+from _state import StateStore
+
+API = "https://api.example"
+RSS = "https://blog.example/rss/"
+BLOG = (Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+        / "githubawesome_rss.xml").read_bytes()
+
+
+def _api_pages(*repos):
+    return {f"{API}/repos/{repo}": ("application/json", json.dumps(
+        {"description": f"About {repo}", "language": "Rust",
+         "stargazers_count": 12345}).encode()) for repo in repos}
+
+
+def _items(*repos):
+    return [{"repo": repo, "description": "", "blurb": "", "link": "",
+             "language": "", "stars": ""} for repo in repos]
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / ".state.db")
+
+
+def test_enrich_fills_empty_fields(fake_session, state_file):
+    fake_session(pages=_api_pages("a/one"))
+    items = _items("a/one")
+    items[0]["description"] = "Kept"
+    gh.enrich(items, API, state_file)
+    assert (items[0]["description"], items[0]["language"], items[0]["stars"]) == \
+        ("Kept", "Rust", "12,345")
+
+
+def test_cache_hit_within_ttl(fake_session, state_file):
+    session = fake_session(pages=_api_pages("a/one", "b/two"))
+    gh.enrich(_items("a/one", "b/two"), API, state_file, ttl=3600)
+    items = _items("A/One", "b/two")
+    gh.enrich(items, API, state_file, ttl=3600)
+    assert all(n == 1 for n in session.calls.values())
+    assert [i["language"] for i in items] == ["Rust", "Rust"]
+
+
+def test_refetch_after_expiry(fake_session, state_file):
+    session = fake_session(pages=_api_pages("a/one"))
+    gh.enrich(_items("a/one"), API, state_file, ttl=3600)
+    store = StateStore.open(state_file)
+    with store.transaction() as tx:
+        tx.conn.execute("UPDATE kv SET updated_at = ? WHERE source = 'github_repos'",
+                        (time.time() - 7200,))
+    assert store.get_many("github_repos", ["a/one"], max_age=3600) == {}
+
+    items = _items("a/one")
+    gh.enrich(items, API, state_file, ttl=3600)
+    assert session.calls[f"{API}/repos/a/one"] == 2
+    assert items[0]["stars"] == "12,345"
+    assert store.get_many("github_repos", ["a/one"], max_age=3600)
+
+
+def test_unknown_repos_are_cached(fake_session, state_file):
+    session = fake_session(pages={})
+    gh.enrich(_items("gone/repo"), API, state_file)
+    gh.enrich(_items("gone/repo"), API, state_file)
+    assert session.calls[f"{API}/repos/gone/repo"] == 1
+
+
+def test_enrich_async_shares_the_cache(fake_session, state_file):
+    session = fake_session(pages=_api_pages("a/one"))
+    gh.enrich(_items("a/one"), API, state_file, ttl=3600)
+    items = _items("a/one")
+    _aio.run(lambda: gh.enrich_async(items, API, state_file, ttl=3600))
+    assert session.calls[f"{API}/repos/a/one"] == 1
+    assert items[0]["language"] == "Rust"
+
+    with StateStore.open(state_file).transaction() as tx:
+        tx.conn.execute("UPDATE kv SET updated_at = ?", (time.time() - 7200,))
+    _aio.run(lambda: gh.enrich_async(_items("a/one"), API, state_file, ttl=3600))
+    assert session.calls[f"{API}/repos/a/one"] == 2
+
+
+def test_enrichment_is_off_without_api_url(fake_session, state_file):
+    session = fake_session(pages={RSS: ("application/rss+xml", BLOG)})
+    result = gh.fetch(rss_url=RSS, state_file=state_file)
+    assert result["items"]
+    assert list(session.calls) == [RSS]
+
+
+def test_shipped_config_has_no_api_url(tmp_path):
+    config_path = Path(fetch_all.__file__).resolve().parent.parent / "config" / "sources.json"
+    config = json.loads(config_path.read_text())
+    assert "api_url" not in config["sources"]["github_trending"]
+    config["sources"]["github_trending"]["enabled"] = True
+    _cmd, _out, (_module, _func, kwargs) = fetch_all.build_fetchers(
+        config, str(config_path), str(tmp_path))["github_trending"]
+    assert "api_url" not in kwargs
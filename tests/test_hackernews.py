@@ -0,0 +1,24 @@
+import pytest
+import requests
+
+import _util
+import fetch_hackernews
+
+
+@pytest.fixture
+def session(fake_session):
+    _util.configure_http(retries=2, retry_backoff=0)
+    return fake_session
+
+
+def test_article_downloads_are_not_retried(session):
+    s = session(error=requests.Timeout("stalled"))
+    assert fetch_hackernews.extract_article("https://slow.example/a", timeout=1) == ""
+    assert s.calls == {"https://slow.example/a": 1}
+
+
+def test_other_requests_still_retry(session):
+    s = session(error=requests.Timeout("stalled"))
+    with pytest.raises(requests.Timeout):
+        _util.http_get("https://slow.example/feed")
+    assert s.calls == {"https://slow.example/feed": 3}
@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+
+from _health import Breakers
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / ".health.json")
+
+
+def test_opens_after_threshold_failures(path):
+    b = Breakers(path, threshold=3, cooldown=60)
+    for _ in range(2):
+        b.record("hn", False, "boom")
+        assert b.state("hn") == "closed"
+    b.record("hn", False, "boom")
+    assert b.state("hn") == "open"
+    assert not b.allow("hn")
+    assert 59 < b.retry_in("hn") <= 60
+
+
+def test_success_resets_the_count(path):
+    b = Breakers(path, threshold=2)
+    b.record("hn", False, "boom")
+    b.record("hn", True)
+    b.record("hn", False, "boom")
+    assert b.state("hn") == "closed"
+    assert "last_error" in b.sources["hn"]
+    b.record("hn", True)
+    assert "last_error" not in b.sources["hn"]
+
+
+def test_half_open_after_cooldown(path):
+    b = Breakers(path, threshold=1, cooldown=60)
+    b.record("hn", False, "boom")
+    assert b.state("hn", now=time.time() + 61) == "half_open"
+    b.record("hn", True)
+    assert b.state("hn") == "closed"
+
+
+def test_cooldown_doubles_up_to_max(path):
+    b = Breakers(path, threshold=1, cooldown=60, max_cooldown=200)
+    spans = []
+    for _ in range(4):
+        b.record("hn", False, "boom")
+        spans.append(b.sources["hn"]["open_until"] - b.sources["hn"]["last_failure"])
+    assert spans == pytest.approx([60, 120, 200, 200])
+
+
+def test_report(path):
+    b = Breakers(path, threshold=1)
+    b.record("ok", True)
+    b.record("bad", False, "x" * 1000)
+    assert b.report("ok")["state"] == "closed"
+    assert b.report("ok")["last_success"]
+    report = b.report("bad")
+    assert report["state"] == "open"
+    assert report["open_until"]
+    assert len(report["last_error"]) == 500
+
+
+def test_save_and_reload(path):
+    b = Breakers(path, threshold=1)
+    b.record("hn", False, "boom")
+    b.save()
+    assert Breakers(path, threshold=1).state("hn") == "open"
+
+
+def test_save_replays_onto_concurrent_runs(path):
+    a = Breakers(path, threshold=5)
+    b = Breakers(path, threshold=5)
+    a.record("hn", False, "a")
+    b.record("hn", False, "b")
+    b.record("arxiv", True)
+    a.save()
+    b.save()
+    with open(path) as f:
+        sources = json.load(f)
+    assert sources["hn"]["consecutive_failures"] == 2
+    assert "arxiv" in sources
+
+
+def _fail_many(path, n):
+    b = Breakers(path, threshold=10 ** 6)
+    for _ in range(n):
+        b.record("hn", False, "boom")
+        b.save()
+
+
+def test_saves_from_several_processes_all_count(path):
+    procs = [multiprocessing.Process(target=_fail_many, args=(path, 25)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    with open(path) as f:
+        assert json.load(f)["hn"]["consecutive_failures"] == 100
@@ -0,0 +1,90 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import _ratelimit
+
+pytestmark = pytest.mark.skipif(_ratelimit.fcntl is None, reason="needs fcntl")
+
+
+def test_match_prefers_longest_suffix():
+    limits = {"youtube.com": {"rate": 1}, "www.youtube.com": {"rate": 2}, "*": {"rate": 3}}
+    assert _ratelimit.match("www.youtube.com", limits) == ("www.youtube.com", {"rate": 2})
+    assert _ratelimit.match("m.YouTube.com", limits) == ("youtube.com", {"rate": 1})
+    assert _ratelimit.match("notyoutube.com", limits) == ("notyoutube.com", {"rate": 3})
+    assert _ratelimit.match("example.org", {"youtube.com": {}}) == (None, None)
+
+
+def test_unlimited_host_passes_through(tmp_path):
+    with _ratelimit.limit("https://example.org/", {"youtube.com": {"rate": 1}},
+                          str(tmp_path)) as waited:
+        assert waited == 0.0
+    assert not list(tmp_path.iterdir())
+
+
+def test_bucket_allows_burst_then_paces(tmp_path):
+    path = str(tmp_path / "host.bucket")
+    delays = [_ratelimit._take_token(path, rate=10, burst=3) for _ in range(5)]
+    assert delays[:3] == [0.0, 0.0, 0.0]
+    # Each reservation past the burst waits one more token's worth
+    assert delays[3] == pytest.approx(0.1, abs=0.02)
+    assert delays[4] == pytest.approx(0.2, abs=0.02)
+
+
+def test_bucket_refills_over_time(tmp_path):
+    path = str(tmp_path / "host.bucket")
+    for _ in range(2):
+        _ratelimit._take_token(path, rate=20, burst=2)
+    time.sleep(0.15)
+    assert _ratelimit._take_token(path, rate=20, burst=2) == 0.0
+
+
+def test_limit_waits_for_token(tmp_path):
+    limits = {"example.org": {"rate": 20, "burst": 1}}
+    start = time.time()
+    for _ in range(3):
+        with _ratelimit.limit("https://example.org/a", limits, str(tmp_path)):
+            pass
+    assert time.time() - start >= 0.09
+
+
+def test_max_concurrency_across_threads(tmp_path):
+    limits = {"example.org": {"max_concurrency": 2}}
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def request():
+        with _ratelimit.limit("https://example.org/", limits, str(tmp_path)):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+
+
+def _take(path, queue):
+    queue.put(_ratelimit._take_token(path, rate=1, burst=1))
+
+
+def test_bucket_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "host.bucket")
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_take, args=(path, queue)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    delays = sorted(queue.get() for _ in procs)
+    # One token up front; the others queue one second apart
+    assert delays[0] == 0.0
+    assert delays[1:] == pytest.approx([1.0, 2.0, 3.0], abs=0.2)
@@ -0,0 +1,113 @@
+import math
+
+import pytest
+
+import _relevance
+
+pytestmark = pytest.mark.skipif(not _relevance.available(), reason="needs numpy")
+
+INTERESTS = """# Interests
+
+## Primary
+- Rust compilers (codegen, LLVM)
+- Vector databases
+
+## Secondary
+- Databases
+
+## Avoid
+- Crypto tokens
+- Rust jobs
+"""
+
+
+@pytest.fixture
+def profile(tmp_path):
+    path = tmp_path / "interests.md"
+    path.write_text(INTERESTS)
+    return _relevance.load_profile(str(path))
+
+
+def test_load_profile_weights(profile):
+    assert profile["rust"] == 1.0
+    assert profile["rust compiler"] == 1.0
+    assert profile["vector database"] == 1.0
+    # A word in a positive section keeps its positive weight
+    assert profile["database"] == 1.0
+    # Avoid pairs weigh fully, their single words half
+    assert profile["crypto token"] == -1.0
+    assert profile["crypto"] == -0.5
+    assert profile["jobs"] == -0.5
+    assert profile["rust jobs"] == -1.0
+    # Parenthetical asides are ignored
+    assert "codegen" not in profile and "llvm" not in profile
+
+
+def test_tokenize_folds_plurals_and_drops_stopwords():
+    assert _relevance.tokenize("The Libraries of tools and a class") == ["library", "tool", "class"]
+
+
+def test_stem_memo_is_bounded():
+    assert _relevance._stem.cache_info().maxsize == _relevance.STEM_CACHE_SIZE
+
+
+def _bm25(texts, profile):
+    """Plain-Python BM25 over the same terms, for comparison."""
+    docs = []
+    for text in texts:
+        words = _relevance.tokenize(text)
+        docs.append(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+    lengths = [len(_relevance.tokenize(t)) for t in texts]
+    avg = max(sum(lengths) / len(texts), 1.0)
+    scores = []
+    for doc, length in zip(docs, lengths):
+        total = 0.0
+        for term, weight in profile.items():
+            tf = doc.count(term)
+            if not tf:
+                continue
+            df = sum(term in d for d in docs)
+            idf = math.log1p((len(texts) - df + 0.5) / (df + 0.5))
+            norm = _relevance.K1 * (1 - _relevance.B + _relevance.B * length / avg)
+            total += weight * idf * tf * (_relevance.K1 + 1) / (tf + norm)
+        scores.append(total)
+    return scores
+
+
+def test_score_matches_reference_bm25(profile):
+    texts = [
+        "A new Rust compiler backend",
+        "Vector databases compared: five databases benchmarked",
+        "Crypto tokens surge again",
+        "Rust jobs board launches for Rust developers",
+        "Gardening tips for the autumn",
+    ]
+    assert _relevance.score(texts, profile).tolist() == pytest.approx(_bm25(texts, profile))
+
+
+def test_relevance_scales_to_best_match(profile):
+    texts = ["Rust compilers", "Vector databases", "Crypto tokens", "Knitting"]
+    rel = _relevance.relevance(_relevance.score(texts, profile))
+    assert rel.max() == 1.0
+    assert rel[3] == 0.0
+    assert rel[2] < 0
+
+
+def test_annotate_adds_relevance_to_items(profile):
+    results = {
+        "hackernews": {"items": [{"title": "Rust compiler internals", "body_md": ""},
+                                 {"title": "Crypto tokens", "body_md": ""}]},
+        "youtube": {"channels": [{"videos": [{"title": "Vector databases explained"}]}]},
+        "xkcd": {"title": "Rust"},
+    }
+    assert _relevance.annotate(results, profile) == 3
+    hn = results["hackernews"]["items"]
+    assert hn[0]["relevance"] > 0 > hn[1]["relevance"]
+    assert results["youtube"]["channels"][0]["videos"][0]["relevance"] > 0
+    assert "relevance" not in results["xkcd"]
+
+
+def test_rank_keeps_original_order(profile):
+    texts = ["Knitting", "Crypto tokens", "Vector databases", "Rust compilers"]
+    assert _relevance.rank(texts, profile, 2) == [2, 3]
+    assert _relevance.rank(texts, profile, 3) == [0, 2, 3]
@@ -0,0 +1,132 @@
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import _state
+from _state import StateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path / ".state.db"))
+
+
+def test_imports_legacy_json_state(tmp_path):
+    (tmp_path / ".github_trending_state.json").write_text(json.dumps(
+        {"blog_id": "post-7", "served": ["Owner/Repo", "a/b"]}))
+    (tmp_path / ".xkcd_state.json").write_text(json.dumps({"comic_num": 3000}))
+    (tmp_path / ".arxiv_state.json").write_text(json.dumps(
+        {"announced": "2026-10-16", "seen": {"2610.00001": "2026-10-16"}}))
+
+    store = StateStore(str(tmp_path / ".state.db"))
+    assert store.get("github_trending", "blog_id") == "post-7"
+    assert set(store.seen("github_trending", ["owner/repo", "a/b", "c/d"])) == {"owner/repo", "a/b"}
+    assert store.get("xkcd", "comic_num") == 3000
+    assert store.seen("arxiv", ["2610.00001"])["2610.00001"]["data"] == "2026-10-16"
+    assert store.get("arxiv", "cycle") == {"announced": "2026-10-16"}
+
+
+def test_legacy_import_runs_only_on_creation(tmp_path):
+    path = str(tmp_path / ".state.db")
+    StateStore(path)
+    (tmp_path / ".xkcd_state.json").write_text(json.dumps({"comic_num": 3000}))
+    assert StateStore(path).get("xkcd", "comic_num") is None
+
+
+def test_mark_seen_keeps_first_seen_and_data(store):
+    with store.transaction() as tx:
+        tx.mark_seen("arxiv", {"x": "first"}, now=100)
+    with store.transaction() as tx:
+        tx.mark_seen("arxiv", {"x": "second"}, now=200)
+    row = store.seen("arxiv", ["x"])["x"]
+    assert (row["first_seen"], row["last_seen"], row["data"]) == (100, 200, "first")
+
+
+def test_seen_handles_more_keys_than_one_statement(store):
+    keys = [f"k{i}" for i in range(_state._CHUNK * 2 + 1)]
+    store.mark_seen("hn", keys)
+    assert len(store.seen("hn", keys + ["missing"])) == len(keys)
+
+
+def test_failed_transaction_rolls_back(store):
+    with pytest.raises(RuntimeError):
+        with store.transaction() as tx:
+            tx.put("xkcd", "comic_num", 1)
+            raise RuntimeError
+    assert store.get("xkcd", "comic_num") is None
+
+
+def test_get_many_skips_stale_values_and_expire_drops_them(store):
+    store.put("github_repos", "old", 1)
+    with store.transaction() as tx:
+        tx.conn.execute("UPDATE kv SET updated_at = ?", (time.time() - 100,))
+    store.put("github_repos", "new", 2)
+    assert store.get_many("github_repos", ["old", "new"], max_age=50) == {"new": 2}
+    assert store.get_many("github_repos", ["old", "new"]) == {"old": 1, "new": 2}
+    with store.transaction() as tx:
+        assert tx.expire("github_repos", 50) == 1
+    assert store.get_many("github_repos", ["old", "new"]) == {"new": 2}
+
+
+def test_prune_drops_untouched_rows(store):
+    with store.transaction() as tx:
+        tx.mark_seen("hn", ["old"], now=time.time() - 100)
+        tx.mark_seen("hn", ["new"])
+    assert store.prune(retention=50) == 1
+    assert list(store.seen("hn", ["old", "new"])) == ["new"]
+
+
+def test_flag_seen_respects_grace(store):
+    items = [{"link": "https://example.org/a"}, {"link": "https://example.org/b"}]
+    with store.transaction() as tx:
+        tx.mark_seen("techmeme", [_state.item_key("techmeme", items[0])],
+                     now=time.time() - 1000)
+        assert _state.flag_seen(tx, "techmeme", items, grace=500) == 1
+    assert items[0]["previously_seen"] is True
+    assert "previously_seen" not in items[1]
+    with store.transaction() as tx:
+        assert _state.flag_seen(tx, "techmeme", [dict(i) for i in items[1:]], grace=500) == 0
+
+
+def test_reads_do_not_wait_for_a_writer(store):
+    store.put("xkcd", "comic_num", 1)
+    started, release = threading.Event(), threading.Event()
+
+    def writer():
+        with store.transaction() as tx:
+            tx.put("xkcd", "comic_num", 2)
+            started.set()
+            release.wait(5)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    started.wait(5)
+    try:
+        start = time.time()
+        assert store.get("xkcd", "comic_num") == 1
+        assert time.time() - start < 1
+    finally:
+        release.set()
+        t.join()
+    assert store.get("xkcd", "comic_num") == 2
+
+
+def _increment(path, n):
+    store = StateStore.open(path)
+    for _ in range(n):
+        with store.transaction() as tx:
+            tx.put("test", "count", tx.get("test", "count", 0) + 1)
+
+
+def test_read_modify_write_is_serialized_across_processes(tmp_path):
+    path = str(tmp_path / ".state.db")
+    StateStore(path)
+    procs = [multiprocessing.Process(target=_increment, args=(path, 50)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert StateStore(path).get("test", "count") == 200
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import _util
+from conftest import SCRIPTS
+
+
+def test_abandon_remembers_only_running_threads(monkeypatch):
+    monkeypatch.setattr(_util, "_abandoned", set())
+    release = threading.Event()
+    pool = _util.thread_pool(2, "test")
+    pool.submit(release.wait, 5)
+    pool.submit(time.sleep, 0)
+    time.sleep(0.1)
+    _util.abandon(pool)
+    assert len(_util._abandoned) >= 1
+    assert all(t.name.startswith("test-") for t in _util._abandoned)
+    release.set()
+    time.sleep(0.1)
+
+    # Finished threads are dropped the next time a pool is abandoned
+    for _ in range(20):
+        idle = _util.thread_pool(1, "idle")
+        idle.submit(time.sleep, 0).result()
+        _util.abandon(idle)
+    time.sleep(0.1)
+    _util.abandon(_util.thread_pool(1, "empty"))
+    assert not _util._abandoned
+
+
+def test_exit_process_without_hung_threads_is_sys_exit(monkeypatch):
+    monkeypatch.setattr(_util, "_abandoned", set())
+    with pytest.raises(SystemExit) as exc:
+        _util.exit_process(3)
+    assert exc.value.code == 3
+
+
+HUNG = """
+import atexit, sys, threading, time
+sys.path.insert(0, {scripts!r})
+import _util
+atexit.register(lambda: print("exit handler ran", flush=True))
+pool = _util.thread_pool(1, "hung")
+pool.submit(threading.Event().wait)
+time.sleep(0.1)
+_util.abandon(pool)
+print("done", flush=True)
+_util.exit_process(4)
+"""
+
+
+def test_exit_process_does_not_wait_for_a_hung_thread():
+    start = time.time()
+    proc = subprocess.run([sys.executable, "-c", HUNG.format(scripts=str(SCRIPTS))],
+                          capture_output=True, text=True, timeout=30)
+    assert time.time() - start < 10
+    assert proc.returncode == 4
+    assert proc.stdout.split("\n")[:2] == ["done", "exit handler ran"]